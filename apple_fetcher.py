@@ -1,34 +1,31 @@
 import os
 import pandas as pd
 
-# Directory containing extracted CSV files
+from pipeline.matcher import KeywordMatcher, TEXT_COLUMNS
+from pipeline.metrics import run_metrics
+from pipeline.profiling import profiled
+from pipeline.reader import list_export_files, read_export_chunks
+from pipeline.sink import make_sink
+
+# Directory containing GDELT exports (extracted CSVs or the downloaded zips)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 csv_directory = os.path.join(SCRIPT_DIR, "zips")
 output_file = os.path.join(SCRIPT_DIR, "weekly_apple_news.csv")
+output_format = "csv"  # or "parquet" / "sqlite" (dataset weekly_apple_news next to this script)
+# Stage metrics of each run, served by the API's /metrics; set GDELT_PROFILE=cprofile to profile a run
+metrics_directory = os.path.join(SCRIPT_DIR, "metrics")
+profile_directory = os.path.join(SCRIPT_DIR, "profiles")
 
 # Keywords to filter Apple-related news
 apple_keywords = ["Apple", "AAPL", "Tim Cook", "iPhone", "Macbook"]
+apple_matcher = KeywordMatcher({"AAPL": apple_keywords})
 
-# Correct headers for the GDELT files (as you fookin' stated)
-headers = [
-    'GLOBALEVENTID', 'SQLDATE', 'MonthYear', 'Year', 'FractionDate', 'Actor1Code',
-    'Actor1Name', 'Actor1CountryCode', 'Actor1KnownGroupCode', 'Actor1EthnicCode',
-    'Actor1Religion1Code', 'Actor1Religion2Code', 'Actor1Type1Code', 'Actor1Type2Code',
-    'Actor1Type3Code', 'Actor2Code', 'Actor2Name', 'Actor2CountryCode', 'Actor2KnownGroupCode',
-    'Actor2EthnicCode', 'Actor2Religion1Code', 'Actor2Religion2Code', 'Actor2Type1Code',
-    'Actor2Type2Code', 'Actor2Type3Code', 'IsRootEvent', 'EventCode', 'EventBaseCode',
-    'EventRootCode', 'QuadClass', 'GoldsteinScale', 'NumMentions', 'NumSources',
-    'NumArticles', 'AvgTone', 'Actor1Geo_Type', 'Actor1Geo_FullName', 'Actor1Geo_CountryCode',
-    'Actor1Geo_ADM1Code', 'Actor1Geo_ADM2Code', 'Actor1Geo_Lat', 'Actor1Geo_Long',
-    'Actor1Geo_FeatureID', 'Actor2Geo_Type', 'Actor2Geo_FullName', 'Actor2Geo_CountryCode',
-    'Actor2Geo_ADM1Code', 'Actor2Geo_ADM2Code', 'Actor2Geo_Lat', 'Actor2Geo_Long',
-    'Actor2Geo_FeatureID', 'ActionGeo_Type', 'ActionGeo_FullName', 'ActionGeo_CountryCode',
-    'ActionGeo_ADM1Code', 'ActionGeo_ADM2Code', 'ActionGeo_Lat', 'ActionGeo_Long',
-    'ActionGeo_FeatureID', 'DATEADDED', 'SOURCEURL'
-]
+# Text columns searched for the keywords (instead of the whole row)
+text_columns = TEXT_COLUMNS
 
 # Columns to keep for sentiment aggregation (we’ll use 'AvgTone' for sentiment score)
 columns_to_keep = ['SQLDATE', 'AvgTone']
+columns_to_read = columns_to_keep + text_columns
 
 def extract_weekly_sentiment(data, week_start_date):
     """ Aggregate sentiment data for the week and add the timestamp """
@@ -40,7 +37,8 @@ def extract_weekly_sentiment(data, week_start_date):
         # Aggregate sentiment (AvgTone) for the week
         aggregated_data = {
             "Week": week_start_date,
-            "AvgTone": data["AvgTone"].mean(),  # Average sentiment score for the week
+            # AvgTone is read as float32; average in float64 so rounding does not build up over the week
+            "AvgTone": data["AvgTone"].astype('float64').mean(),  # Average sentiment score for the week
             "Count": len(data)  # Number of articles for the week
         }
         return pd.DataFrame([aggregated_data])
@@ -51,18 +49,18 @@ def extract_weekly_sentiment(data, week_start_date):
 def process_csv_file(file_path):
     """ Process a single CSV file to filter Apple-related news and retain relevant columns """
     try:
-        # Load the CSV file with the correct headers
+        # Load only the columns we need, with explicit dtypes
         print(f"Reading file: {file_path}")
-        data = pd.read_csv(file_path, sep='\t', names=headers, on_bad_lines='skip', encoding='utf-8')
-
-        # Filter rows containing Apple-related keywords in Actor1Name or Actor2Name
-        filtered_data = data[
-            data.apply(lambda row: any(keyword.lower() in str(row).lower() for keyword in apple_keywords), axis=1)
-        ]
+        filtered_chunks = []
+        for data in read_export_chunks(file_path, columns_to_read):
+            # Filter rows containing Apple-related keywords in the text columns
+            filtered_data = data[apple_matcher.first_match(data, text_columns).notna()]
+            if not filtered_data.empty:
+                filtered_chunks.append(filtered_data[columns_to_keep].dropna())
 
         # Select relevant columns if the filtered data is not empty
-        if not filtered_data.empty:
-            return filtered_data[columns_to_keep].dropna()
+        if filtered_chunks:
+            return pd.concat(filtered_chunks, ignore_index=True)
         else:
             return pd.DataFrame()  # Empty DataFrame if no Apple-related data found
     except Exception as e:
@@ -72,11 +70,15 @@ def process_csv_file(file_path):
 def process_directory(directory, output_file):
     """ Process CSV files in chunks of 7 and write weekly aggregated results incrementally """
     # Ensure output file exists and has the correct header structure
-    if not os.path.exists(output_file):
+    if output_format == "csv" and not os.path.exists(output_file):
         pd.DataFrame(columns=["Week", "AvgTone", "Count"]).to_csv(output_file, index=False)
 
+    # Weekly rows are buffered and the output is appended once at the end
+    sink = make_sink(output_format, os.path.dirname(output_file), os.path.basename(output_file),
+                     "weekly_apple_news")
+
     # Sort files in chronological order (based on filename)
-    files = sorted(f for f in os.listdir(directory) if f.endswith(".CSV"))
+    files = list_export_files(directory)
     weekly_batch = []
     week_start_date = None
 
@@ -96,13 +98,17 @@ def process_directory(directory, output_file):
                 week_start_date = filename[:8]  # Extract week start date from filename (YYYYMMDD)
                 weekly_data = extract_weekly_sentiment(combined_data, week_start_date)
                 if not weekly_data.empty:
-                    weekly_data.to_csv(output_file, mode='a', index=False, header=False)
-                    print(f"Appended weekly data for week starting {week_start_date} to {output_file}")
+                    sink.append("AAPL", weekly_data)
+                    print(f"Queued weekly data for week starting {week_start_date}")
 
             # Reset batch for the next week
             weekly_batch = []
 
+    if sink.flush():
+        print(f"Appended weekly data to {sink.path('AAPL')}")
+
 # Process all files in the directory
-process_directory(csv_directory, output_file)
+with profiled("apple", profile_directory=profile_directory), run_metrics("apple", metrics_directory):
+    process_directory(csv_directory, output_file)
 
 print(f"Weekly aggregated sentiment data saved incrementally to {output_file}")
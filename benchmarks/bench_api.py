@@ -0,0 +1,109 @@
+"""
+Latency of the FastAPI query endpoints on synthetic weekly outputs for many
+tickers, measured in-process with FastAPI's TestClient (so it includes the
+ASGI stack but not the network).
+
+Usage: python benchmarks/bench_api.py [--tickers 500] [--weeks 520] [--requests 2000]
+"""
+import argparse
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "../fastApi"))
+
+from fastapi.testclient import TestClient
+
+
+def write_outputs(directory, tickers, weeks, rng):
+    """One weekly_{ticker}_news.csv per ticker in the WeeklyStore view layout."""
+    sundays = pd.date_range("2015-01-04", periods=weeks, freq="W-SUN")
+    for i in range(tickers):
+        ticker = f"T{i:03d}"
+        pd.DataFrame({
+            'SQLDATE': sundays, 'Ticker': ticker, 'AvgTone': rng.normal(0, 2, weeks),
+            'Count': rng.integers(1, 500, weeks), 'ToneStd': rng.uniform(1, 5, weeks),
+            'ToneMin': rng.uniform(-10, -5, weeks), 'ToneMax': rng.uniform(5, 10, weeks),
+        }).to_csv(os.path.join(directory, f"weekly_{ticker}_news.csv"), index=False)
+
+
+def percentiles(label, client, paths):
+    times = []
+    for path in paths:
+        start = time.perf_counter()
+        response = client.get(path)
+        times.append(time.perf_counter() - start)
+        assert response.status_code == 200, (path, response.status_code)
+    times = np.array(times) * 1000
+    print(f"{label:<34} p50 {np.percentile(times, 50):6.2f}ms  p99 {np.percentile(times, 99):6.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--weeks", type=int, default=520)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pick = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_outputs(tmp, args.tickers, args.weeks, rng)
+        start = time.perf_counter()
+        main_module = importlib.import_module("main")
+        main_module.DOWNLOAD_FOLDER = tmp
+        main_module.catalog.output_directory = tmp
+        main_module.catalog.refresh(force=True)
+        main_module.sentiment_index.refresh()
+        print(f"Loaded {args.tickers} tickers x {args.weeks} weeks in {time.perf_counter() - start:.2f}s")
+
+        index = main_module.sentiment_index
+        ticker = lambda: f"T{pick.randrange(args.tickers):03d}"
+        times = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            index.records(f"T{pick.randrange(args.tickers):03d}", "2024-11-01")
+            times.append(time.perf_counter() - start)
+        times = np.array(times) * 1000
+        print(f"{'index lookup only, last 8 weeks':<34} p50 {np.percentile(times, 50):6.3f}ms  "
+              f"p99 {np.percentile(times, 99):6.3f}ms")
+
+        start = time.perf_counter()
+        main_module.load_tone_matrix()
+        print(f"Built the tone matrix in {(time.perf_counter() - start) * 1000:.1f}ms")
+        matrix = main_module.tone_matrix
+        for label, query in [("matrix ranking only", lambda: matrix.ranking(limit=20)),
+                             ("matrix z-scores only", lambda: matrix.zscores()),
+                             ("matrix rolling only", lambda: matrix.rolling(ticker()))]:
+            times = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                query()
+                times.append(time.perf_counter() - start)
+            times = np.array(times) * 1e6
+            print(f"{label:<34} p50 {np.percentile(times, 50):6.1f}us  p99 {np.percentile(times, 99):6.1f}us")
+
+        client = TestClient(main_module.app)
+        percentiles("/tone/rank, 20 most negative", client, ["/tone/rank?limit=20"] * args.requests)
+        percentiles("/tone/anomalies", client, ["/tone/anomalies"] * args.requests)
+        percentiles("/list, page of 50", client,
+                    [f"/list?offset={pick.randrange(args.tickers)}&limit=50" for _ in range(args.requests)])
+        percentiles("/file (whole CSV)", client,
+                    [f"/file/{ticker()}" for _ in range(args.requests)])
+        percentiles("/sentiment, last 8 weeks", client,
+                    [f"/sentiment/{ticker()}?start=2024-11-01" for _ in range(args.requests)])
+        percentiles("/sentiment, 3 tickers, AvgTone", client,
+                    [f"/sentiment?tickers={ticker()},{ticker()},{ticker()}&start=2024-11-01&fields=AvgTone"
+                     for _ in range(args.requests)])
+
+
+if __name__ == "__main__":
+    main()
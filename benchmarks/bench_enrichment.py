@@ -0,0 +1,61 @@
+"""
+Time keyword enrichment of tickers.txt against the local Wikidata stand-in
+(tests/wikidata_stub.py): one request at a time as enricher.py used to,
+concurrent with a cold cache, a rerun with a warm cache, and an incremental
+run after a ticker is added.
+
+Usage: python benchmarks/bench_enrichment.py [--latency 0.05] [--workers 8] [--rate 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+from pipeline.enrichment import ResponseCache, WikidataClient, enrich, parse_ticker_line
+from tests.wikidata_stub import start_stub
+
+tickers_file = os.path.join(SCRIPT_DIR, "../tickers.txt")
+
+
+def timed(label, companies, client, existing=None, workers=1):
+    start = time.perf_counter()
+    lines, looked_up = enrich(companies, client, existing, workers)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:7.2f}s  {looked_up:4d} looked up, {client.requests_made:4d} requests")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds per response")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=50.0)
+    args = parser.parse_args()
+
+    with open(tickers_file, "r", encoding="utf-8") as f:
+        companies = [parsed for parsed in (parse_ticker_line(line) for line in f) if parsed]
+    server, api_url = start_stub(latency=args.latency)
+    print(f"{len(companies)} companies, stub latency {args.latency * 1000:.0f}ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial = timed("serial, no cache", companies, WikidataClient(api_url, rate=0, workers=1))
+
+        cache = ResponseCache(tmp)
+        concurrent = timed(f"{args.workers} workers, cold cache", companies,
+                           WikidataClient(api_url, cache, args.rate, args.workers), workers=args.workers)
+        timed(f"{args.workers} workers, warm cache", companies,
+              WikidataClient(api_url, cache, args.rate, args.workers), workers=args.workers)
+
+        existing = {c[1]: (c[0], line) for c, line in zip(companies, concurrent)}
+        timed("incremental, 1 new ticker", companies + [("Example Newco", "NEWC")],
+              WikidataClient(api_url, cache, args.rate, args.workers), existing, args.workers)
+        print(f"identical output: {serial == concurrent}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
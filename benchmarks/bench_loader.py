@@ -0,0 +1,62 @@
+"""
+Compare the original untyped 58-column pd.read_csv with the projected,
+typed loader in pipeline.reader and with reading the same columns back
+from the columnar event cache (pipeline.cache) on a synthetic daily export.
+
+Usage: python benchmarks/bench_loader.py [--rows 200000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+from pipeline.cache import EventCache
+from pipeline.reader import DEFAULT_ENGINE, load_export
+from pipeline.schema import V1_HEADERS
+from synthetic import synthetic_export, write_export
+
+columns_to_read = ['SQLDATE', 'AvgTone', 'Actor1Name', 'Actor2Name']
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    df = fn()
+    elapsed = time.perf_counter() - start
+    size = df.memory_usage(deep=True).sum() / 1e6
+    print(f"{label:<32} {elapsed:7.2f}s {size:9.1f} MB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "20250101.export.CSV")
+        write_export(synthetic_export(args.rows, ["APPLE INC", "MICROSOFT"]), path)
+
+        base = timed("read_csv, 58 columns, untyped", lambda: pd.read_csv(
+            path, sep='\t', names=V1_HEADERS, on_bad_lines='skip', encoding='utf-8', low_memory=False))
+        timed("load_export, 58 columns, c", lambda: load_export(path, engine='c'))
+        c = timed("load_export, 4 columns, c", lambda: load_export(path, columns_to_read, engine='c'))
+        print(f"  speedup {base / c:.1f}x")
+        if DEFAULT_ENGINE == 'pyarrow':
+            arrow = timed("load_export, 4 columns, pyarrow", lambda: load_export(path, columns_to_read))
+            print(f"  speedup {base / arrow:.1f}x")
+
+            cache = EventCache(os.path.join(tmp, "event_cache"))
+            cache.build(path)
+            cached = timed("event cache, 4 columns", lambda: pd.concat(
+                list(cache.read_chunks(path, columns_to_read)), ignore_index=True))
+            print(f"  speedup {base / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare the per-ticker `df['combined'].apply(...)` loop used by the V2/V3
+filters with the shared KeywordMatcher (all_matches over the actor
+columns) on a synthetic daily export.
+
+Usage: python benchmarks/bench_matcher.py [--rows 200000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+from pipeline.keywords import load_enriched_keywords
+from pipeline.matcher import KeywordMatcher
+from synthetic import COMMON_ACTORS
+
+enriched_keywords_file = os.path.join(SCRIPT_DIR, "../enriched_keywords.txt")
+actor_columns = ['Actor1Name', 'Actor2Name']
+
+
+def synthetic_export(enriched, rows, seed=0):
+    """Build a DataFrame with the columns the filters read, using realistic actor names."""
+    rng = random.Random(seed)
+    company_names = [kw.upper() for info in enriched.values() for kw in info['keywords'][:3]]
+
+    def actor():
+        roll = rng.random()
+        if roll < 0.25:
+            return None
+        if roll < 0.30:
+            return rng.choice(company_names)
+        return rng.choice(COMMON_ACTORS)
+
+    return pd.DataFrame({
+        'SQLDATE': [20250101 + rng.randrange(7) for _ in range(rows)],
+        'Actor1Name': [actor() for _ in range(rows)],
+        'Actor2Name': [actor() for _ in range(rows)],
+        'AvgTone': [rng.uniform(-10, 10) for _ in range(rows)],
+    })
+
+
+def combined_actor_text(df):
+    """The lowercase 'Actor1Name Actor2Name' text the original filters matched against."""
+    return (df['Actor1Name'].fillna('') + ' ' + df['Actor2Name'].fillna('')).str.lower()
+
+
+def legacy_per_ticker(df, enriched):
+    """The original V3 loop: one full apply pass over the file per ticker."""
+    pairs = {}
+    for ticker, info in enriched.items():
+        keywords = info['keywords']
+        mask = df['combined'].apply(lambda text: any(kw.lower() in text for kw in keywords))
+        if mask.any():
+            pairs[ticker] = set(df.index[mask])
+    return pairs
+
+
+def matcher_single_pass(df, enriched):
+    matcher = KeywordMatcher(enriched)
+    pairs = matcher.all_matches(df, actor_columns, columns=['SQLDATE', 'AvgTone'])
+    return {ticker: set(group.index) for ticker, group in pairs.groupby('Ticker')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    enriched = load_enriched_keywords(enriched_keywords_file)
+    df = synthetic_export(enriched, args.rows, args.seed)
+    df['combined'] = combined_actor_text(df)
+    print(f"{len(df)} rows, {len(enriched)} tickers, "
+          f"{sum(len(info['keywords']) for info in enriched.values())} keywords")
+
+    start = time.perf_counter()
+    new = matcher_single_pass(df, enriched)
+    matcher_time = time.perf_counter() - start
+    print(f"KeywordMatcher (single pass): {matcher_time:.2f}s")
+
+    start = time.perf_counter()
+    old = legacy_per_ticker(df, enriched)
+    legacy_time = time.perf_counter() - start
+    print(f"Per-ticker apply loop:        {legacy_time:.2f}s")
+
+    print(f"Speedup: {legacy_time / matcher_time:.1f}x")
+    print(f"Identical (row, ticker) pairs: {old == new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measure the persistent actor-name index (pipeline.name_index) on a
+Zipf-distributed stream of actor names: KeywordMatcher.all_matches
+without an index, with a cold index (first run) and with the index saved
+by that run (every later run), plus first_match with the saved index.
+
+Usage: python benchmarks/bench_name_index.py [--days 10] [--rows 100000] [--names 50000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+from pipeline.keywords import load_enriched_keywords
+from pipeline.matcher import KeywordMatcher
+from pipeline.name_index import NameIndex, keywords_fingerprint
+from synthetic import COMMON_ACTORS
+
+enriched_keywords_file = os.path.join(SCRIPT_DIR, "../enriched_keywords.txt")
+actor_columns = ['Actor1Name', 'Actor2Name']
+
+
+def name_vocabulary(enriched, size, rng):
+    """Common actors and company names first (the head of the distribution), then a long tail."""
+    companies = [kw.upper() for info in enriched.values() for kw in info['keywords'][:2]]
+    head = COMMON_ACTORS + companies
+    tail = [f"{rng.choice(['MINISTER', 'OFFICIAL', 'PROTESTER', 'FIRM', 'MAYOR'])} {i}"
+            for i in range(max(size - len(head), 0))]
+    return np.array(head + tail, dtype=object)
+
+
+def synthetic_days(vocabulary, days, rows, rng):
+    """Actor names drawn with Zipf(1.2) popularity; a quarter of the slots are empty, as in GDELT."""
+    for day in range(days):
+        frame = {'SQLDATE': np.full(rows, 20250101 + day), 'AvgTone': rng.uniform(-10, 10, rows)}
+        for column in actor_columns:
+            ranks = np.minimum(rng.zipf(1.2, rows), len(vocabulary)) - 1
+            names = vocabulary[ranks]
+            names[rng.random(rows) < 0.25] = None
+            frame[column] = names
+        yield pd.DataFrame(frame)
+
+
+def per_name(matcher, frames):
+    return sum(len(matcher.all_matches(df, actor_columns, columns=['SQLDATE', 'AvgTone'])) for df in frames)
+
+
+def first_per_name(matcher, frames):
+    return sum(int(matcher.first_match(df, actor_columns).notna().sum()) for df in frames)
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    pairs = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:7.2f}s  {pairs} pairs")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--names", type=int, default=50_000)
+    args = parser.parse_args()
+
+    enriched = load_enriched_keywords(enriched_keywords_file)
+    fingerprint = keywords_fingerprint(enriched_keywords_file)
+    rng = np.random.default_rng(0)
+    frames = list(synthetic_days(name_vocabulary(enriched, args.names, rng), args.days, args.rows, rng))
+    print(f"{args.days} days x {args.rows} rows, {args.names} distinct names, {len(enriched)} tickers")
+
+    base = timed("per name, no index", lambda: per_name(KeywordMatcher(enriched), frames))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "name_index.pkl")
+        cold = NameIndex(fingerprint)
+        elapsed = timed("per name, cold index", lambda: per_name(KeywordMatcher(enriched, cold), frames))
+        print(f"  speedup {base / elapsed:.1f}x, hit rate {cold.stats()['hit_rate']:.1%}")
+        cold.save(path)
+
+        warm = NameIndex.load(path, fingerprint)
+        elapsed = timed("per name, index from last run", lambda: per_name(KeywordMatcher(enriched, warm), frames))
+        print(f"  speedup {base / elapsed:.1f}x, hit rate {warm.stats()['hit_rate']:.1%}")
+
+        elapsed = timed("first match, index from last run",
+                        lambda: first_per_name(KeywordMatcher(enriched, warm), frames))
+        print(f"  speedup {base / elapsed:.1f}x (rows with a match)")
+
+
+if __name__ == "__main__":
+    main()
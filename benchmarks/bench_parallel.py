@@ -0,0 +1,72 @@
+"""
+Time the weekly aggregation of a month of synthetic daily exports with
+pipeline.parallel.aggregate_files at several worker counts, and check that
+every run merges to the same weekly state as the serial one.
+
+Usage: python benchmarks/bench_parallel.py [--days 30] [--rows 50000] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+from pipeline.parallel import aggregate_files
+from pipeline.weekly import combine_partials
+from synthetic import synthetic_export, write_export
+
+enriched = {
+    'AAPL': {'company': 'Apple Inc.', 'keywords': ['apple']},
+    'MSFT': {'company': 'Microsoft', 'keywords': ['microsoft']},
+}
+
+
+def run(paths, workers):
+    start = time.perf_counter()
+    partials = []
+    for path, partial, error in aggregate_files(paths, enriched, workers):
+        if error is not None:
+            raise error
+        partials.append(partial)
+    merged = combine_partials(pd.concat(partials, ignore_index=True))
+    elapsed = time.perf_counter() - start
+    return elapsed, merged.sort_values(['Ticker', 'Week']).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        first = date(2025, 1, 1)
+        for i in range(args.days):
+            day = int((first + timedelta(days=i)).strftime("%Y%m%d"))
+            path = os.path.join(tmp, f"{day}.export.CSV")
+            write_export(synthetic_export(args.rows, ["APPLE INC", "MICROSOFT"], day=day, seed=i), path)
+            paths.append(path)
+        print(f"{args.days} files x {args.rows} rows, {os.cpu_count()} CPUs")
+
+        baseline = None
+        for workers in args.workers:
+            elapsed, merged = run(paths, workers)
+            if baseline is None:
+                baseline = (elapsed, merged)
+            same = (merged[['Ticker', 'Week', 'Count']].equals(baseline[1][['Ticker', 'Week', 'Count']])
+                    and np.allclose(merged['ToneSum'], baseline[1]['ToneSum']))
+            print(f"workers={workers:<3} {elapsed:7.2f}s  speedup {baseline[0] / elapsed:4.1f}x  "
+                  f"{'identical' if same else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+Benchmark the ingest -> filter -> aggregate pipeline on synthetic exports.
+
+A scratch copy of the scripts is fed with generated GDELT exports: v1
+daily files and v2 15-minute slices are downloaded from a local HTTP
+server, then V1 (500_GDELT_fetcher.py), V2, V3 and apple_fetcher.py are
+each measured twice in their own process:
+
+- stage by stage (parse, match, aggregate, write), replaying the calls
+  the script makes chunk by chunk, with rows per second for each stage;
+- end to end, running the unmodified script.
+
+Peak RSS is taken per process. Every run is appended to a JSON results
+file together with the commit and the settings, and compared with the
+previous run recorded there.
+
+Usage: python benchmarks/bench_pipeline.py [--days 7] [--rows 50000] [--companies 50]
+           [--distinct-actors 5000] [--skew 1.1] [--variants v1 v2 v3 apple] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.join(SCRIPT_DIR, "..")
+sys.path.insert(0, REPO_DIR)
+
+from pipeline.downloader import download_many, file_md5, load_manifest, make_session
+from pipeline.keywords import load_enriched_keywords
+from pipeline.matcher import TEXT_COLUMNS, KeywordMatcher
+from pipeline.reader import list_export_files, read_export_chunks
+from pipeline.sink import CsvSink, make_sink
+from pipeline.weekly import ACTOR_COLUMNS, WeeklyStore, combine_partials, partial_aggregates
+from synthetic import export_name, synthetic_export, write_export
+
+results_file = os.path.join(SCRIPT_DIR, "results.json")
+enriched_keywords_file = os.path.join(REPO_DIR, "enriched_keywords.txt")
+
+# Script of each variant, relative to the repo (and scratch) root
+VARIANTS = {
+    'v1': "filters/500_GDELT_fetcher.py",
+    'v2': "filters/500_GDELT_fetcherV2.py",
+    'v3': "filters/500_GDELT_fetcherV3.py",
+    'apple': "apple_fetcher.py",
+}
+STAGES = ['parse', 'match', 'aggregate', 'write']
+# Outputs and progress files the scripts leave in the scratch tree, removed before each run
+SCRIPT_OUTPUTS = ["company_outputs", "company_outputs1", "aggregate_store", "name_index.pkl",
+                  "last_week.txt", "last_processed_week.txt", "weekly_apple_news.csv",
+                  "weekly_updates.jsonl", "bench_outputs", "metrics"]
+
+
+# ---------- Scratch tree ----------
+def build_tree(tree, args):
+    """Copy the scripts into tree and generate the exports the local server hands out."""
+    shutil.copytree(os.path.join(REPO_DIR, "pipeline"), os.path.join(tree, "pipeline"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(os.path.join(tree, "filters"))
+    for script in VARIANTS.values():
+        shutil.copy(os.path.join(REPO_DIR, script), os.path.join(tree, script))
+    shutil.copy(enriched_keywords_file, os.path.join(tree, "enriched_keywords.txt"))
+
+    enriched = load_enriched_keywords(enriched_keywords_file)
+    # GDELT spells actor names in upper case
+    companies = [info['company'].upper() for info in list(enriched.values())[:args.companies]]
+    served = os.path.join(tree, "served")
+    os.makedirs(os.path.join(served, "v1"))
+    os.makedirs(os.path.join(served, "v2"))
+    first = date(2025, 1, 6)
+    for i in range(args.days):
+        day = int((first + timedelta(days=i)).strftime("%Y%m%d"))
+        write_export(synthetic_export(args.rows, companies, args.company_share, day, seed=i,
+                                      distinct_actors=args.distinct_actors, skew=args.skew),
+                     os.path.join(served, "v1", export_name(day)))
+    day = int(first.strftime("%Y%m%d"))
+    for i in range(args.slices):
+        slice_time = (i * 15 // 60) * 10000 + (i * 15 % 60) * 100
+        write_export(synthetic_export(max(args.rows // 96, 1), companies, args.company_share, day, seed=1000 + i,
+                                      version=2, distinct_actors=args.distinct_actors, skew=args.skew,
+                                      slice_time=slice_time),
+                     os.path.join(served, "v2", export_name(day, 2, slice_time)))
+    for version in ("v1", "v2"):
+        write_manifest(os.path.join(served, version))
+    return served
+
+
+def write_manifest(directory):
+    """md5sums and filesizes listings, as GDELT publishes next to the exports."""
+    names = sorted(os.listdir(directory))
+    with open(os.path.join(directory, "md5sums"), "w") as f:
+        f.writelines(f"{file_md5(os.path.join(directory, name))} {name}\n" for name in names)
+    with open(os.path.join(directory, "filesizes"), "w") as f:
+        f.writelines(f"{os.path.getsize(os.path.join(directory, name))} {name}\n" for name in names)
+
+
+def clean_outputs(tree):
+    for name in SCRIPT_OUTPUTS:
+        path = os.path.join(tree, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+# ---------- Download ----------
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def bench_download(served, target, workers):
+    """Fetch every export in served through pipeline.downloader from a local HTTP server."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=served))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    os.makedirs(target, exist_ok=True)
+    try:
+        names = [n for n in sorted(os.listdir(served)) if n.endswith(".zip")]
+        session = make_session(workers)
+        start = time.perf_counter()
+        manifest = load_manifest(session, base_url)
+        jobs = [(name, base_url + name, os.path.join(target, name)) for name in names]
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            results = download_many(jobs, workers=workers, session=session, manifest=manifest)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+    size = sum(os.path.getsize(os.path.join(served, n)) for n in names)
+    return {
+        'seconds': elapsed, 'files': len(names), 'failed': sum(not ok for ok in results.values()),
+        'megabytes': size / 1e6, 'megabytes_per_second': size / 1e6 / elapsed if elapsed else None,
+    }
+
+
+# ---------- Stage timings (run in a child process per variant) ----------
+class StageTimer:
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        yield
+        self.seconds[name] += time.perf_counter() - start
+
+    def chunks(self, file_path, columns):
+        """read_export_chunks, with the time spent producing each chunk counted as 'parse'."""
+        chunks = read_export_chunks(file_path, columns)
+        while True:
+            with self.stage('parse'):
+                df = next(chunks, None)
+            if df is None:
+                return
+            yield df
+
+
+def stages_v1(timer, files, tree):
+    """filters/500_GDELT_fetcher.py: ticker symbols anywhere in the text columns, first match wins."""
+    with open(os.path.join(tree, "enriched_keywords.txt"), "r") as f:
+        tickers = [line.strip().split(',')[0].strip().upper() for line in f if line.strip()]
+    sink = make_sink("csv", os.path.join(tree, "bench_outputs"), "weekly_{ticker}_news.csv", "weekly_news")
+    batch = []
+    for file_path in files:
+        for data in timer.chunks(file_path, ['SQLDATE', 'AvgTone'] + TEXT_COLUMNS):
+            with timer.stage('match'):
+                matcher = KeywordMatcher({ticker: [ticker.lower()] for ticker in tickers})
+                data['Ticker'] = matcher.first_match(data, TEXT_COLUMNS)
+                batch.append(data[data['Ticker'].notna()][['SQLDATE', 'AvgTone', 'Ticker']].dropna())
+    with timer.stage('aggregate'):
+        data = pd.concat(batch, ignore_index=True)
+        data['SQLDATE'] = pd.to_datetime(data['SQLDATE'], format='%Y%m%d', errors='coerce')
+        weekly = (data.groupby('Ticker').agg(AvgTone=('AvgTone', 'mean'), Count=('SQLDATE', 'count'))
+                  .reset_index().assign(Week=os.path.basename(files[0])[:8]))
+    with timer.stage('write'):
+        sink.append_grouped(weekly[['Week', 'Ticker', 'AvgTone', 'Count']])
+        sink.flush()
+
+
+def stages_v2(timer, files, tree):
+    """filters/500_GDELT_fetcherV2.py: enriched keywords on the actor names, raw rows per ticker."""
+    matcher = KeywordMatcher(load_enriched_keywords(os.path.join(tree, "enriched_keywords.txt")))
+    sink = make_sink("csv", os.path.join(tree, "bench_outputs"), "{ticker}_news.csv", "news")
+    for file_path in files:
+        for df in timer.chunks(file_path, ['SQLDATE', 'AvgTone'] + ACTOR_COLUMNS):
+            with timer.stage('match'):
+                pairs = matcher.all_matches(df, ACTOR_COLUMNS, columns=['SQLDATE', 'AvgTone'])
+            with timer.stage('aggregate'):
+                for ticker, rows in pairs.groupby('Ticker', sort=False):
+                    sink.append(ticker, rows[['SQLDATE', 'AvgTone']])
+        with timer.stage('write'):
+            sink.flush()
+
+
+def stages_v3(timer, files, tree):
+    """filters/500_GDELT_fetcherV3.py: enriched keywords, mergeable weekly state, views regenerated."""
+    matcher = KeywordMatcher(load_enriched_keywords(os.path.join(tree, "enriched_keywords.txt")))
+    partials = []
+    for file_path in files:
+        for df in timer.chunks(file_path, ['SQLDATE', 'AvgTone'] + ACTOR_COLUMNS):
+            with timer.stage('match'):
+                pairs = matcher.all_matches(df, ACTOR_COLUMNS, columns=['SQLDATE', 'AvgTone'])
+            with timer.stage('aggregate'):
+                if not pairs.empty:
+                    partials.append(partial_aggregates(pairs))
+    with timer.stage('aggregate'):
+        merged = combine_partials(pd.concat(partials, ignore_index=True))
+    with timer.stage('write'):
+        out = os.path.join(tree, "bench_outputs")
+        WeeklyStore(os.path.join(out, "state"), out).upsert(merged)
+
+
+def stages_apple(timer, files, tree):
+    """apple_fetcher.py: a handful of Apple keywords over all text columns, one weekly row."""
+    matcher = KeywordMatcher({"AAPL": ["Apple", "AAPL", "Tim Cook", "iPhone", "Macbook"]})
+    sink = CsvSink(os.path.join(tree, "bench_outputs"), "weekly_apple_news.csv")
+    batch = []
+    for file_path in files:
+        for data in timer.chunks(file_path, ['SQLDATE', 'AvgTone'] + TEXT_COLUMNS):
+            with timer.stage('match'):
+                filtered = data[matcher.first_match(data, TEXT_COLUMNS).notna()]
+                if not filtered.empty:
+                    batch.append(filtered[['SQLDATE', 'AvgTone']].dropna())
+    with timer.stage('aggregate'):
+        data = pd.concat(batch, ignore_index=True)
+        weekly = pd.DataFrame([{"Week": os.path.basename(files[0])[:8], "AvgTone": data["AvgTone"].mean(),
+                                "Count": len(data)}])
+    with timer.stage('write'):
+        sink.append("AAPL", weekly)
+        sink.flush()
+
+
+STAGE_RUNNERS = {'v1': stages_v1, 'v2': stages_v2, 'v3': stages_v3, 'apple': stages_apple}
+
+
+def run_stages_child(variant, tree):
+    """Entry point of the child process: time the stages of one variant, print them as JSON."""
+    zips = os.path.join(tree, "zips")
+    files = [os.path.join(zips, f) for f in list_export_files(zips)]
+    timer = StageTimer()
+    STAGE_RUNNERS[variant](timer, files, tree)
+    print(json.dumps(timer.seconds))
+
+
+# ---------- Child processes ----------
+def peak_rss_mb(rusage):
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return rusage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+def run_measured(command, cwd):
+    """Run command, returning (seconds, peak RSS in MB, stdout) of that process alone."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    stdout, stderr = proc.stdout.read(), proc.stderr.read()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{stderr[-2000:]}")
+    return elapsed, peak_rss_mb(rusage), stdout
+
+
+def bench_variant(variant, tree, rows):
+    clean_outputs(tree)
+    _, stage_rss, stdout = run_measured(
+        [sys.executable, os.path.abspath(__file__), "--child", variant, "--tree", tree], tree)
+    seconds = json.loads(stdout.strip().splitlines()[-1])
+    stages = {stage: {'seconds': s, 'rows_per_second': rows / s if s else None} for stage, s in seconds.items()}
+
+    clean_outputs(tree)
+    elapsed, script_rss, _ = run_measured([sys.executable, VARIANTS[variant]], tree)
+    return {
+        'stages': stages, 'stages_peak_rss_mb': stage_rss,
+        'script': {'seconds': elapsed, 'rows_per_second': rows / elapsed, 'peak_rss_mb': script_rss},
+    }
+
+
+# ---------- Results ----------
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_runs(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_runs(path, runs):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(runs, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def metrics(run):
+    """Flatten a run to {metric name: seconds or MB} for comparison."""
+    flat = {'download_v1.seconds': run['download']['v1']['seconds'],
+            'download_v2.seconds': run['download']['v2']['seconds']}
+    for variant, result in run['variants'].items():
+        for stage, timing in result['stages'].items():
+            flat[f"{variant}.{stage}.seconds"] = timing['seconds']
+        flat[f"{variant}.script.seconds"] = result['script']['seconds']
+        flat[f"{variant}.script.peak_rss_mb"] = result['script']['peak_rss_mb']
+    return flat
+
+
+def print_comparison(run, previous):
+    if previous is None:
+        return
+    print(f"\nCompared with {previous.get('commit')} ({previous['timestamp']}):")
+    if previous['config'] != run['config']:
+        print("  (different settings; numbers are not directly comparable)")
+    old, new = metrics(previous), metrics(run)
+    for name, value in new.items():
+        if old.get(name):
+            print(f"  {name:<32} {old[name]:9.3f} -> {value:9.3f}  ({value / old[name]:5.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=7, help="v1 daily exports")
+    parser.add_argument("--slices", type=int, default=8, help="v2 15-minute slices (download only)")
+    parser.add_argument("--rows", type=int, default=50_000, help="rows per daily export")
+    parser.add_argument("--companies", type=int, default=50, help="company names mixed into the actors")
+    parser.add_argument("--company-share", type=float, default=0.02)
+    parser.add_argument("--distinct-actors", type=int, default=5000, help="long-tail actor names")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the name draw (0 = uniform)")
+    parser.add_argument("--workers", type=int, default=4, help="download workers")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--output", default=results_file, help="JSON file the run is appended to")
+    parser.add_argument("--label", default="", help="free-form note stored with the run")
+    parser.add_argument("--child", choices=list(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument("--tree", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_stages_child(args.child, args.tree)
+        return
+
+    config = {k: getattr(args, k) for k in ("days", "slices", "rows", "companies", "company_share",
+                                            "distinct_actors", "skew", "workers")}
+    rows = args.days * args.rows
+    with tempfile.TemporaryDirectory() as tree:
+        start = time.perf_counter()
+        served = build_tree(tree, args)
+        print(f"Generated {args.days} x {args.rows} rows and {args.slices} slices "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        download = {
+            'v1': bench_download(os.path.join(served, "v1"), os.path.join(tree, "zips"), args.workers),
+            'v2': bench_download(os.path.join(served, "v2"), os.path.join(tree, "zips_v2"), args.workers),
+        }
+        for version, result in download.items():
+            print(f"download {version}: {result['files']} files, {result['megabytes']:.1f} MB in "
+                  f"{result['seconds']:.2f}s ({result['megabytes_per_second']:.1f} MB/s)")
+
+        variants = {}
+        for variant in args.variants:
+            variants[variant] = result = bench_variant(variant, tree, rows)
+            stages = "  ".join(f"{stage} {t['seconds']:6.2f}s" for stage, t in result['stages'].items())
+            print(f"{variant:<6} {stages}  | script {result['script']['seconds']:6.2f}s "
+                  f"{result['script']['rows_per_second']:9.0f} rows/s  peak RSS {result['script']['peak_rss_mb']:.0f} MB")
+
+    run = {
+        'commit': current_commit(), 'label': args.label,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': config,
+        'environment': {'python': platform.python_version(), 'pandas': pd.__version__,
+                        'cpus': os.cpu_count(), 'platform': platform.platform()},
+        'download': download, 'variants': variants,
+    }
+    runs = load_runs(args.output)
+    previous = next((r for r in reversed(runs) if set(r['variants']) >= set(variants)), None)
+    runs.append(run)
+    save_runs(args.output, runs)
+    print(f"\nResults appended to {args.output}")
+    print_comparison(run, previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Synthetic GDELT v1 daily exports and v2 15-minute slices for the benchmarks."""
+import bisect
+import itertools
+import os
+import random
+import zipfile
+
+import pandas as pd
+
+from pipeline.schema import HEADERS, V1_HEADERS
+
+
+# Typical non-company actors that dominate a GDELT export
+COMMON_ACTORS = [
+    "UNITED STATES", "POLICE", "PRESIDENT", "GOVERNMENT", "CHINA", "RUSSIA",
+    "SCHOOL", "COMPANY", "STUDENT", "MILITARY", "CONGRESS", "PRIME MINISTER",
+    "UNITED KINGDOM", "JUDGE", "BUSINESS", "COMMUNITY", "HOSPITAL", "ISRAEL",
+]
+PLACES = [
+    ("New York, New York, United States", "US", "USNY"),
+    ("Washington, District of Columbia, United States", "US", "USDC"),
+    ("London, London, City of, United Kingdom", "UK", "UKH9"),
+    ("Beijing, Beijing, China", "CH", "CH22"),
+    ("Moscow, Moskva, Russia", "RS", "RS48"),
+    ("Cupertino, California, United States", "US", "USCA"),
+]
+SITES = ["reuters.com", "nytimes.com", "bbc.co.uk", "cnbc.com", "localnews.example.org"]
+# Building blocks for the long tail of distinct actor names in a real file
+NAME_PLACES = ["OHIO", "TEXAS", "LAGOS", "KARACHI", "MANILA", "BRAZIL", "KENYA", "QUEBEC",
+               "BAVARIA", "GAZA", "KERALA", "SYDNEY", "YUKON", "ATHENS", "LIMA", "OSLO"]
+NAME_ROLES = ["POLICE", "MINISTRY", "COURT", "UNIVERSITY", "SENATOR", "MAYOR", "FARMER",
+              "ACTIVIST", "UNION", "BANK", "ARMY", "PARLIAMENT", "RESIDENT", "DOCTOR"]
+
+
+def actor_names(count, seed=0):
+    """count distinct made-up actor names ("KENYA FARMER 12", ...)."""
+    rng = random.Random(seed)
+    names = [f"{place} {role}" for place, role in itertools.product(NAME_PLACES, NAME_ROLES)]
+    rng.shuffle(names)
+    extra = (f"{rng.choice(NAME_PLACES)} {rng.choice(NAME_ROLES)} {i}" for i in itertools.count())
+    return (names + [next(extra) for _ in range(max(count - len(names), 0))])[:count]
+
+
+def _picker(rng, names, skew):
+    """Draw from names uniformly (skew 0) or Zipf-like, the i-th name with weight 1/(i+1)**skew."""
+    if not skew:
+        return lambda: rng.choice(names)
+    cumulative = list(itertools.accumulate(1.0 / (i + 1) ** skew for i in range(len(names))))
+    return lambda: names[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+
+
+def synthetic_export(rows, company_names=(), company_share=0.05, day=20250101, seed=0,
+                     version=1, distinct_actors=0, skew=0.0, slice_time=0):
+    """
+    Build a full export DataFrame for one day: the 58 columns of a GDELT 1.0
+    daily export, or the 61 of 2.0 with version=2.
+    company_share of the actor names are drawn from company_names, the rest
+    from COMMON_ACTORS (or left empty), mimicking a real daily file.
+    distinct_actors adds that many long-tail names to COMMON_ACTORS, and
+    skew > 0 draws both lists Zipf-like instead of uniformly.
+    version=2 stamps DATEADDED as YYYYMMDDHHMMSS (slice_time is HHMMSS),
+    as in a GDELT 2.0 15-minute slice.
+    """
+    rng = random.Random(seed)
+    company_names = list(company_names)
+    common = COMMON_ACTORS + actor_names(distinct_actors, seed) if distinct_actors else COMMON_ACTORS
+    pick_common = _picker(rng, common, skew)
+    pick_company = _picker(rng, company_names, skew) if company_names else None
+    date_added = day * 1_000_000 + slice_time if version == 2 else day
+
+    def actor():
+        roll = rng.random()
+        if roll < 0.25:
+            return None
+        if company_names and roll < 0.25 + company_share:
+            return pick_company()
+        return pick_common()
+
+    def place():
+        return rng.choice(PLACES)
+
+    records = []
+    for i in range(rows):
+        a1, a2 = actor(), actor()
+        g1, g2, g3 = place(), place(), place()
+        event = rng.choice(["010", "020", "042", "051", "112", "190"])
+        records.append({
+            'GLOBALEVENTID': 400000000 + i, 'SQLDATE': day, 'MonthYear': day // 100,
+            'Year': day // 10000, 'FractionDate': round(day // 10000 + 0.0027, 4),
+            'Actor1Code': 'USA' if a1 else None, 'Actor1Name': a1,
+            'Actor1CountryCode': 'USA' if a1 else None,
+            'Actor2Code': 'USA' if a2 else None, 'Actor2Name': a2,
+            'Actor2CountryCode': 'USA' if a2 else None,
+            'IsRootEvent': rng.randrange(2), 'EventCode': event, 'EventBaseCode': event,
+            'EventRootCode': event[:2], 'QuadClass': rng.randrange(1, 5),
+            'GoldsteinScale': rng.choice([-10.0, -2.0, 0.0, 1.9, 3.4, 7.0]),
+            'NumMentions': rng.randrange(1, 20), 'NumSources': rng.randrange(1, 5),
+            'NumArticles': rng.randrange(1, 20), 'AvgTone': rng.uniform(-10, 10),
+            'Actor1Geo_Type': 3, 'Actor1Geo_FullName': g1[0], 'Actor1Geo_CountryCode': g1[1],
+            'Actor1Geo_ADM1Code': g1[2], 'Actor1Geo_Lat': 40.7, 'Actor1Geo_Long': -74.0,
+            'Actor2Geo_Type': 3, 'Actor2Geo_FullName': g2[0], 'Actor2Geo_CountryCode': g2[1],
+            'Actor2Geo_ADM1Code': g2[2], 'Actor2Geo_Lat': 38.9, 'Actor2Geo_Long': -77.0,
+            'ActionGeo_Type': 3, 'ActionGeo_FullName': g3[0], 'ActionGeo_CountryCode': g3[1],
+            'ActionGeo_ADM1Code': g3[2], 'ActionGeo_Lat': 51.5, 'ActionGeo_Long': -0.1,
+            'DATEADDED': date_added,
+            'SOURCEURL': f"https://www.{rng.choice(SITES)}/news/{day}/story-{rng.randrange(rows // 4 + 1)}.html",
+        })
+    return pd.DataFrame.from_records(records, columns=HEADERS if version == 2 else V1_HEADERS)
+
+
+def export_name(day, version=1, slice_time=0):
+    """File name GDELT publishes the export under: YYYYMMDD.export.CSV.zip, or YYYYMMDDHHMMSS... for 2.0."""
+    stamp = f"{day}{slice_time:06d}" if version == 2 else f"{day}"
+    return f"{stamp}.export.CSV.zip"
+
+
+def write_export(df, path):
+    """
+    Write df as a tab-separated, header-less export like GDELT publishes;
+    a path ending in .zip gets a zip archive holding the CSV.
+    """
+    if not path.endswith(".zip"):
+        df.to_csv(path, sep='\t', header=False, index=False)
+        return
+    member = os.path.basename(path)[:-len(".zip")]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(member, df.to_csv(sep='\t', header=False, index=False))
@@ -0,0 +1,132 @@
+import argparse
+import os
+import signal
+import sys
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from pipeline.downloader import DEFAULT_WORKERS, TIMESTAMP_FORMAT
+from pipeline.events import EventLog
+from pipeline.keywords import load_enriched_keywords, select_keywords_file
+from pipeline.metrics import METRICS, run_metrics, save_snapshot
+from pipeline.name_index import NameIndex, keywords_fingerprint
+from pipeline.orchestrator import POLL_SECONDS, PipelineDaemon, contiguous_through
+from pipeline.profiling import PROFILERS, profiled
+from pipeline.reader import list_export_files
+from pipeline.sink import make_sink
+from pipeline.state import DOWNLOADED, FAILED, PROCESSED, PipelineState
+from pipeline.weekly import WeeklyStore, aggregation_columns
+
+# ---------- Configuration ----------
+base_url = "http://data.gdeltproject.org/events/"
+download_folder = os.path.join(SCRIPT_DIR, "zips")
+os.makedirs(download_folder, exist_ok=True)
+output_directory = os.path.join(SCRIPT_DIR, "company_outputs")
+state_directory = os.path.join(SCRIPT_DIR, "aggregate_store")
+output_format = "csv"  # or "parquet" (dataset partitioned by ticker) or "sqlite" (one indexed table)
+# Optional aggregation modes besides the per-event tone: "mention", "article", "goldstein"
+aggregations = []
+# Which days are downloaded / processed; replaces the two progress files below
+pipeline_state_file = os.path.join(SCRIPT_DIR, "pipeline_state.db")
+enriched_keywords_file = os.path.join(SCRIPT_DIR, "enriched_keywords.txt")
+pruned_keywords_file = os.path.join(SCRIPT_DIR, "pruned_keywords.txt")
+name_index_file = os.path.join(SCRIPT_DIR, "name_index.pkl")
+# Upserted weeks, followed by the API's live feed (/events, /ws)
+event_log_file = os.path.join(SCRIPT_DIR, "weekly_updates.jsonl")
+metrics_directory = os.path.join(SCRIPT_DIR, "metrics")
+profile_directory = os.path.join(SCRIPT_DIR, "profiles")
+# Progress files of fetcher/GDELT.py and the V3 filter: imported on first start and
+# kept up to date, so the scripts can still be run by hand without redoing work
+last_downloaded_file = os.path.join(SCRIPT_DIR, "last_downloaded_week.txt")
+last_processed_week_file = os.path.join(SCRIPT_DIR, "last_processed_week.txt")
+DEFAULT_FIRST_DAY = "20250101"
+
+# ---------- Progress files ----------
+def read_progress_file(path, length):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            value = f.read().strip()[:length]
+            if len(value) == length and value.isdigit():
+                return value
+    return None
+
+def import_legacy_state(state):
+    """
+    First start: take over from the cron scripts. Exports already in the
+    download folder are processed up to last_processed_week.txt and only
+    downloaded after it; days are planned from the earliest of them (or
+    last_downloaded_week.txt). This is the only time the folder is listed.
+    """
+    last_processed = read_progress_file(last_processed_week_file, 8) or "00000000"
+    rows = []
+    for name in list_export_files(download_folder):
+        day = name[:8]
+        rows.append((day, PROCESSED if day <= last_processed else DOWNLOADED, os.path.join(download_folder, name)))
+    state.mark_many(rows)
+    starts = [day for day, _, _ in rows] + [read_progress_file(last_downloaded_file, 8) or DEFAULT_FIRST_DAY]
+    state.set_meta("first_day", min(starts))
+    print(f"Imported {len(rows)} exports from {download_folder}; planning from {min(starts)}")
+
+def write_progress_files(state, first_day):
+    """
+    Mirror the state into the scripts' progress files: the V3 filter skips
+    exports up to the last one processed before anything still pending, the
+    fetcher resumes after the contiguous run of downloaded days.
+    """
+    statuses = state.statuses()
+    today = datetime.now().strftime("%Y%m%d")
+    pending = min((day for day, status in statuses.items() if status in (DOWNLOADED, FAILED)), default="99999999")
+    processed = max((day for day, status in statuses.items() if status == PROCESSED and day < pending), default=None)
+    if processed:
+        with open(last_processed_week_file, "w") as f:
+            f.write(processed)
+    downloaded = contiguous_through(statuses, first_day, today, (DOWNLOADED, PROCESSED))
+    next_day = datetime.strptime(downloaded, "%Y%m%d") + timedelta(days=1) if downloaded else \
+        datetime.strptime(first_day, "%Y%m%d")
+    with open(last_downloaded_file, "w") as f:
+        f.write(next_day.strftime(TIMESTAMP_FORMAT))
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download GDELT daily exports and aggregate each one as soon as it arrives.")
+    parser.add_argument("--workers", type=int, default=1, help="filter processes (default: one, in-process)")
+    parser.add_argument("--download-workers", type=int, default=DEFAULT_WORKERS, help="parallel downloads")
+    parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS, help="time between polls")
+    parser.add_argument("--once", action="store_true", help="poll a single time, finish the queue and exit")
+    parser.add_argument("--profile", choices=PROFILERS, help="profile the run and save the result")
+    args = parser.parse_args()
+
+    state = PipelineState(pipeline_state_file)
+    if state.get_meta("first_day") is None:
+        import_legacy_state(state)
+    first_day = state.get_meta("first_day")
+
+    keywords_file = select_keywords_file(enriched_keywords_file, pruned_keywords_file)
+    enriched = load_enriched_keywords(keywords_file)
+    name_index = NameIndex.load(name_index_file, keywords_fingerprint(keywords_file))
+    sink = make_sink(output_format, output_directory, "weekly_{ticker}_news.csv", "weekly_news")
+    store = WeeklyStore(state_directory, output_directory, sink, EventLog(event_log_file), source="daily")
+
+    def checkpoint():
+        name_index.save(name_index_file)
+        write_progress_files(state, first_day)
+        save_snapshot(METRICS.snapshot(), os.path.join(metrics_directory, "daemon.json"))
+        print(f"Checkpoint: {state.counts()}")
+
+    daemon = PipelineDaemon(state, base_url, download_folder, enriched, store, first_day,
+                            workers=args.workers, download_workers=args.download_workers,
+                            name_index=name_index, checkpoint=checkpoint,
+                            columns=aggregation_columns(aggregations))
+    # SIGTERM (systemd, docker stop) and Ctrl-C finish the current downloads and the queue
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: daemon.stopping.set())
+
+    with profiled("daemon", args.profile, profile_directory), run_metrics("daemon", metrics_directory):
+        daemon.run(args.poll_seconds, once=args.once)
+    state.close()
+
+if __name__ == "__main__":
+    main()
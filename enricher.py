@@ -1,48 +1,44 @@
-import pandas as pd
-import requests
-from rapidfuzz import fuzz
-
-def get_wikidata_aliases(company_name):
-    """Fetch official aliases from Wikidata"""
-    url = f"https://www.wikidata.org/w/api.php?action=wbsearchentities&search={company_name}&language=en&format=json"
-    try:
-        response = requests.get(url).json()
-        return [result["display"]["label"] for result in response.get("search", [])]
-    except:
-        return []
-
-def expand_keywords(row):
-    company, ticker = row.split(':')
-    base_keywords = [
-        company.strip(),
-        ticker.strip(),
-        company.replace(" ", ""),       # "Honeywell" → "Honeywell"
-        company.split()[0],             # First word ("3M" → "3M")
-        company.lower(),                # Lowercase
-        company.upper()                 # Uppercase
-    ]
-    
-    # Add Wikidata aliases
-    base_keywords += get_wikidata_aliases(company.strip())
-    
-    # Custom enrichment rules
-    enhancements = {
-        "Apple Inc.": ["iPhone", "MacBook", "Tim Cook"],
-        "Microsoft": ["Azure", "Xbox", "Satya Nadella"],
-        "Tesla, Inc.": ["Cybertruck", "Gigafactory", "Elon Musk"]
-    }
-    base_keywords += enhancements.get(company.strip(), [])
-    
-    # Remove duplicates
-    unique_keys = list(set(str(k) for k in base_keywords if k))
-    return f"{company.strip()}:{ticker.strip()}:" + ":".join(unique_keys)
-
-# Process file
-with open('tickers.txt', 'r') as f:
-    lines = [line.strip() for line in f if line.strip()]
-    
-enriched_data = [expand_keywords(line) for line in lines]
-
-# Save to new file
-with open('enriched_keywords.txt', 'w') as f:
-    f.write("\n".join(enriched_data))
+import argparse
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from pipeline.enrichment import (DEFAULT_RATE, DEFAULT_TTL, DEFAULT_WORKERS, WIKIDATA_API, ResponseCache,
+                                 WikidataClient, enrich, parse_ticker_line, read_enriched_lines)
+
+tickers_file = os.path.join(SCRIPT_DIR, "tickers.txt")
+enriched_keywords_file = os.path.join(SCRIPT_DIR, "enriched_keywords.txt")
+# Wikidata responses, reused until they are older than the TTL
+cache_directory = os.path.join(SCRIPT_DIR, "wikidata_cache")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build enriched_keywords.txt from tickers.txt with Wikidata aliases.")
+    parser.add_argument("--full", action="store_true",
+                        help="look up every ticker again instead of only the ones new in tickers.txt")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent lookups")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="max requests per second")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="seconds a cached response stays valid")
+    parser.add_argument("--api-url", default=WIKIDATA_API,
+                        help="Wikidata API endpoint (or a local stand-in such as tests/wikidata_stub.py)")
+    args = parser.parse_args()
+
+    # Process file
+    with open(tickers_file, 'r', encoding='utf-8') as f:
+        companies = [parsed for parsed in (parse_ticker_line(line) for line in f if line.strip()) if parsed]
+
+    existing = {} if args.full else read_enriched_lines(enriched_keywords_file)
+    client = WikidataClient(args.api_url, ResponseCache(cache_directory, args.ttl), args.rate, args.workers)
+    enriched_data, looked_up = enrich(companies, client, existing, args.workers)
+
+    # Save to new file
+    tmp_file = f"{enriched_keywords_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(enriched_data))
+    os.replace(tmp_file, enriched_keywords_file)
+    print(f"Enriched keywords saved to {enriched_keywords_file}: {len(enriched_data)} companies, "
+          f"{looked_up} looked up ({client.requests_made} requests, {client.cache_hits} from cache)")
+
+if __name__ == "__main__":
+    main()
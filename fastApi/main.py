@@ -1,36 +1,421 @@
+import asyncio
+import json
 import os
-import glob
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
-from datetime import datetime
+import sys
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pipeline.bulk import iter_ndjson, iter_zip, ticker_csv_members
+from pipeline.catalog import OutputCatalog
+from pipeline.database import DEFAULT_MIN_COUNT, WeeklyDatabase, records
+from pipeline.events import EventHub, EventTail
+from pipeline.http_cache import (MIN_COMPRESS_BYTES, CompressedFiles, choose_encoding, file_validators,
+                                 is_not_modified, variant_etag)
+from pipeline.metrics import METRICS, load_snapshots, render_prometheus
+from pipeline.sentiment_index import SentimentIndex, normalize_date
+from pipeline.tone_matrix import DEFAULT_WINDOW, ToneMatrix
+
+try:
+    import pyarrow as pa
+except ImportError:  # only needed for format=arrow
+    pa = None
 
 # Config
 DOWNLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../company_outputs")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Weekly upserts published by the filter stage (see pipeline.events)
+EVENT_LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../weekly_updates.jsonl")
+EVENT_POLL_SECONDS = 0.2
+HEARTBEAT_SECONDS = 15
+# Snapshots of the last fetcher/filter runs (see pipeline.metrics), served next to the API's own
+METRICS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../metrics")
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Live feed: one follower of the event log fans out to every /events and /ws client
+event_hub = EventHub()
+
+@asynccontextmanager
+async def lifespan(app):
+    tail = EventTail(EVENT_LOG_FILE)
+    # Built after the tail is positioned, so no upsert falls between the two
+    load_tone_matrix()
+    follower = asyncio.create_task(event_hub.follow(tail, EVENT_POLL_SECONDS))
+    yield
+    follower.cancel()
+
+class RequestMetrics:
+    """ASGI middleware counting requests by route and status, timed until the body is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The route template, not the raw path, so /file/{ticker} is one series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            METRICS.observe('api_request_seconds', time.perf_counter() - start, route=route)
+            METRICS.inc('api_requests_total', route=route, status=str(status))
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestMetrics)
 
-@app.get("/list")
-def list_available_files():
+# Metadata of the weekly outputs, built at startup and kept current on change
+catalog = OutputCatalog(DOWNLOAD_FOLDER)
+# Weekly outputs held in memory for /sentiment; reloaded when the files change
+sentiment_index = SentimentIndex(catalog)
+# gzip/br bodies of /file, compressed once per file version
+compressed_files = CompressedFiles()
+# Weekly table written by the filters with output_format = "sqlite" (see pipeline.sink)
+weekly_database = WeeklyDatabase(DOWNLOAD_FOLDER)
+# (ticker x week) AvgTone/Count for the /tone endpoints; kept current by the live feed
+tone_matrix = ToneMatrix()
+event_hub.add_listener(tone_matrix.apply)
+
+def weekly_source():
     """
-    Returns a list of available GDELT CSV files.
+    Where /sentiment, /bulk and the tone matrix read the weekly rows: the CSV
+    views, or the SQLite table when the filters write no CSVs
+    (output_format = "sqlite"). Both answer has_ticker, records and frame.
     """
-    csv_files = sorted(
-        glob.glob(os.path.join(DOWNLOAD_FOLDER, "weekly_*_news.csv")),
-        key=os.path.getmtime,
-        reverse=True
-    )
+    if not sentiment_index.tickers() and weekly_database.available():
+        return weekly_database
+    return sentiment_index
 
-    return {"files": [os.path.basename(f) for f in csv_files]}
+def load_tone_matrix():
+    columns = ['Ticker', 'SQLDATE', 'AvgTone', 'Count']
+    source = weekly_source()
+    tickers = source.tickers()
+    if tickers:
+        tone_matrix.load(source.frame(tickers, fields=columns))
+    print(f"Tone matrix: {len(tone_matrix.tickers)} tickers x {tone_matrix.weeks} weeks")
+
+@app.get("/list")
+def list_available_files(offset: int = Query(0, ge=0), limit: int = Query(None, ge=1)):
+    """
+    Returns the available GDELT CSV files, newest first, with their size,
+    modification time, row count and last week covered. Use offset/limit to page.
+    """
+    total, files = catalog.page(offset, limit)
+    return {"total": total, "offset": offset, "limit": limit, "files": files}
 
 @app.get("/file/{ticker}")
-def get_specific_file(ticker: str):
+def get_specific_file(ticker: str, request: Request):
     """
     Allows downloading a specific GDELT file by name.
+    Supports conditional requests (ETag / If-None-Match, Last-Modified /
+    If-Modified-Since -> 304), byte ranges (Range / If-Range) so pollers can
+    fetch only what was appended, and gzip/br for full downloads.
     """
     filename = f"weekly_{ticker}_news.csv"
     file_path = os.path.join(DOWNLOAD_FOLDER,filename)
     if not os.path.exists(file_path):
+        # With the SQLite output there are no files; the CSV is a view of the table
+        if weekly_database.available() and weekly_database.has_ticker(ticker):
+            return Response(weekly_database.csv(ticker), media_type="text/csv",
+                            headers={"Content-Disposition": f'attachment; filename="{filename}"',
+                                     "Cache-Control": "no-cache"})
         raise HTTPException(status_code=404, detail="File not found.")
-    
-    return FileResponse(file_path, media_type="application/zip", filename=filename)
+
+    stat = os.stat(file_path)
+    etag, last_modified = file_validators(stat)
+    # Ranges always address the uncompressed bytes
+    encoding = None
+    if "range" not in request.headers and stat.st_size >= MIN_COMPRESS_BYTES:
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": variant_etag(etag, encoding),
+        "Last-Modified": last_modified,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(request.headers, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        # FileResponse serves Range/If-Range requests against these validators
+        return FileResponse(file_path, media_type="text/csv", filename=filename, headers=headers)
+
+    headers["Content-Encoding"] = encoding
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return Response(compressed_files.get(file_path, etag, encoding), media_type="text/csv", headers=headers)
+
+# ---------- Sentiment queries ----------
+def parse_query(start, end, fields):
+    """Validate the shared query parameters; dates become YYYY-MM-DD, fields a list (or None)."""
+    try:
+        start = normalize_date(start) if start else None
+        end = normalize_date(end) if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD or YYYYMMDD.")
+    fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    return start, end, fields
+
+def check_fields(source, ticker, fields):
+    columns = weekly_database.columns() if source is weekly_database else source.get(ticker).columns
+    unknown = [f for f in fields or [] if f not in columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+def tabular_response(source, tickers, start, end, fields, format):
+    """CSV or Arrow IPC stream of the selected rows."""
+    df = source.frame(tickers, start, end, fields)
+    if format == "csv":
+        return Response(df.to_csv(index=False), media_type="text/csv")
+    if pa is None:
+        raise HTTPException(status_code=406, detail="Arrow output is not available on this server.")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+@app.get("/sentiment/{ticker}")
+def get_sentiment(ticker: str, start: str = None, end: str = None, fields: str = None,
+                  format: str = Query("json", pattern="^(json|csv|arrow)$")):
+    """
+    Weekly sentiment of one ticker between start and end (inclusive), optionally
+    only the given comma-separated fields, as JSON, CSV or Arrow.
+    """
+    start, end, fields = parse_query(start, end, fields)
+    source = weekly_source()
+    if not source.has_ticker(ticker):
+        raise HTTPException(status_code=404, detail="Ticker not found.")
+    check_fields(source, ticker, fields)
+    if format != "json":
+        return tabular_response(source, [ticker], start, end, fields, format)
+    return JSONResponse({"ticker": ticker, "rows": source.records(ticker, start, end, fields)})
+
+@app.get("/sentiment")
+def get_sentiment_many(tickers: str, start: str = None, end: str = None, fields: str = None,
+                       format: str = Query("json", pattern="^(json|csv|arrow)$")):
+    """
+    Weekly sentiment of several comma-separated tickers; JSON is keyed by ticker,
+    CSV and Arrow are one table with a Ticker column.
+    """
+    start, end, fields = parse_query(start, end, fields)
+    tickers = [t.strip() for t in tickers.split(",") if t.strip()]
+    source = weekly_source()
+    missing = [t for t in tickers if not source.has_ticker(t)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tickers not found: {', '.join(missing)}")
+    for ticker in tickers:
+        check_fields(source, ticker, fields)
+    if format != "json":
+        if fields and "Ticker" not in fields:
+            fields = ["Ticker"] + fields
+        return tabular_response(source, tickers, start, end, fields, format)
+    return JSONResponse({"tickers": {t: source.records(t, start, end, fields) for t in tickers}})
+
+# ---------- Weekly database ----------
+def require_database():
+    if not weekly_database.available():
+        raise HTTPException(status_code=404, detail='No weekly database; run the filter with output_format = "sqlite".')
+
+def database_response(df, format, **fields):
+    """CSV of df, or JSON with its rows next to the given fields."""
+    if format == "csv":
+        return Response(df.to_csv(index=False), media_type="text/csv")
+    return JSONResponse({**fields, "rows": records(df)})
+
+@app.get("/weekly/{ticker}")
+def get_weekly(ticker: str, start: str = None, end: str = None, fields: str = None,
+               format: str = Query("json", pattern="^(json|csv)$")):
+    """
+    Weekly rows of one ticker from the SQLite output, between start and end
+    (inclusive), optionally only the given comma-separated fields.
+    """
+    require_database()
+    start, end, fields = parse_query(start, end, fields)
+    if not weekly_database.has_ticker(ticker):
+        raise HTTPException(status_code=404, detail="Ticker not found.")
+    try:
+        df = weekly_database.ticker_rows(ticker, start, end, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return database_response(df, format, ticker=ticker)
+
+@app.get("/week")
+def get_week(week: str = None, fields: str = None, format: str = Query("json", pattern="^(json|csv)$")):
+    """
+    Every ticker's row for one week (the week-ending Sunday, YYYY-MM-DD or
+    YYYYMMDD; default the latest week) from the SQLite output.
+    """
+    require_database()
+    week, _, fields = parse_query(week, None, fields)
+    week = week or weekly_database.latest_week()
+    try:
+        df = weekly_database.week_rows(week, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return database_response(df, format, week=week)
+
+@app.get("/rank")
+def get_rank(week: str = None, by: str = "AvgTone", order: str = Query("asc", pattern="^(asc|desc)$"),
+             limit: int = Query(20, ge=1, le=1000), min_count: int = Query(DEFAULT_MIN_COUNT, ge=0),
+             format: str = Query("json", pattern="^(json|csv)$")):
+    """
+    Tickers ranked by a column (default AvgTone, most negative first) for one
+    week (default the latest), among those with at least min_count events,
+    e.g. /rank?limit=20 for this week's 20 most negative tickers. Their full
+    rows from the SQLite output; /tone/rank ranks AvgTone the same way from
+    memory, with the weekly change.
+    """
+    require_database()
+    week, _, _ = parse_query(week, None, None)
+    week = week or weekly_database.latest_week()
+    try:
+        df = weekly_database.ranking(week, by, order == "desc", limit, min_count)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return database_response(df, format, week=week, by=by, order=order)
+
+# ---------- Cross-sectional tone ----------
+def tone_week(week):
+    week, _, _ = parse_query(week, None, None)
+    return week
+
+@app.get("/tone/rank")
+def get_tone_rank(week: str = None, order: str = Query("asc", pattern="^(asc|desc)$"),
+                  limit: int = Query(20, ge=1, le=1000), min_count: int = Query(DEFAULT_MIN_COUNT, ge=0)):
+    """
+    Tickers ranked by AvgTone in one week (default the latest), most negative
+    first unless order=desc, among those with at least min_count events (as
+    /rank), with the change from the week before.
+    """
+    try:
+        week, rows = tone_matrix.ranking(tone_week(week), limit, order == "desc", min_count)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"week": week, "rows": rows}
+
+@app.get("/tone/zscores")
+def get_tone_zscores(week: str = None, window: int = Query(DEFAULT_WINDOW, ge=2, le=520),
+                     min_count: int = Query(1, ge=0)):
+    """
+    Every ticker's AvgTone in one week against its previous `window` weeks:
+    their mean and standard deviation, the z-score and the weekly change.
+    """
+    try:
+        week, rows = tone_matrix.cross_section(tone_week(week), window, min_count)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"week": week, "window": window, "rows": rows}
+
+@app.get("/tone/anomalies")
+def get_tone_anomalies(week: str = None, window: int = Query(DEFAULT_WINDOW, ge=2, le=520),
+                       threshold: float = Query(2.0, gt=0), min_count: int = Query(1, ge=0)):
+    """Tickers whose AvgTone z-score in one week is at least threshold in size, largest first."""
+    try:
+        week, rows = tone_matrix.anomalies(tone_week(week), window, threshold, min_count)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"week": week, "window": window, "threshold": threshold, "rows": rows}
+
+@app.get("/tone/rolling/{ticker}")
+def get_tone_rolling(ticker: str, window: int = Query(DEFAULT_WINDOW, ge=2, le=520)):
+    """Weekly AvgTone of one ticker with its rolling mean and standard deviation over `window` weeks."""
+    rows = tone_matrix.rolling(ticker, window)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Ticker not found.")
+    return {"ticker": ticker, "window": window, "rows": rows}
+
+# ---------- Bulk export ----------
+@app.get("/bulk")
+def get_bulk(tickers: str = "all", since: str = None,
+             format: str = Query("zip", pattern="^(zip|ndjson)$")):
+    """
+    Every requested ticker in one streamed response: a zip of the weekly CSVs
+    or newline-delimited JSON rows. tickers is a comma-separated list or "all";
+    since (YYYY-MM-DD or YYYYMMDD) keeps only the weeks from that date on.
+    The response is built while it is sent, one ticker at a time.
+    """
+    since, _, _ = parse_query(since, None, None)
+    source = weekly_source()
+    if tickers.strip().lower() == "all":
+        selected = source.tickers()
+    else:
+        selected = [t.strip() for t in tickers.split(",") if t.strip()]
+        missing = [t for t in selected if not source.has_ticker(t)]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Tickers not found: {', '.join(missing)}")
+    if format == "ndjson":
+        return StreamingResponse(iter_ndjson(source, selected, since), media_type="application/x-ndjson")
+    stamps = catalog.stamps() if source is sentiment_index else None
+    return StreamingResponse(iter_zip(ticker_csv_members(source, selected, since, stamps)),
+                             media_type="application/zip",
+                             headers={"Content-Disposition": 'attachment; filename="weekly_news.zip"'})
+
+# ---------- Live updates ----------
+def parse_tickers(tickers):
+    """Comma-separated tickers to a list, or None (all tickers) when empty."""
+    return [t.strip() for t in tickers.split(",") if t.strip()] if tickers else None
+
+@app.get("/events")
+async def stream_events(tickers: str = None):
+    """
+    Server-sent events: one `weekly` event (JSON data) per (ticker, week)
+    aggregate upserted by the filter stage, optionally only for the given
+    comma-separated tickers.
+    """
+    queue = event_hub.subscribe(parse_tickers(tickers))
+
+    async def stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line so proxies do not close an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: weekly\ndata: {json.dumps(event)}\n\n"
+        finally:
+            event_hub.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws")
+async def websocket_events(websocket: WebSocket, tickers: str = None):
+    """The same events as /events, one JSON message each, over a WebSocket."""
+    await websocket.accept()
+    queue = event_hub.subscribe(parse_tickers(tickers))
+    try:
+        while True:
+            await websocket.send_json(await queue.get())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        event_hub.unsubscribe(queue)
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus metrics: this API's requests (job="api") and the stage
+    durations, rows, bytes and per-ticker matches of the last run of each
+    fetcher/filter job.
+    """
+    METRICS.set('api_catalog_files', len(catalog.entries))
+    METRICS.set('api_event_subscribers', event_hub.subscriber_count)
+    sources = [(METRICS.snapshot(), {'job': 'api'})]
+    sources += [(snapshot, {'job': job}) for job, snapshot in load_snapshots(METRICS_DIRECTORY).items()]
+    return Response(render_prometheus(sources), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -1,15 +1,57 @@
+import argparse
 import os
+import sys
+import time
+import pandas as pd
 import requests
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pipeline.downloader import (DEFAULT_WORKERS, TIMESTAMP_FORMAT, ChecksumError, DownloadState,
+                                 download_many, download_to_file, gdelt_file_job, load_manifest,
+                                 make_session)
+from pipeline.events import EventLog
+from pipeline.keywords import load_enriched_keywords, select_keywords_file
+from pipeline.matcher import KeywordMatcher
+from pipeline.metrics import METRICS, run_metrics, save_snapshot
+from pipeline.profiling import PROFILERS, profiled
+from pipeline.sink import make_sink
+from pipeline.weekly import WeeklyStore, aggregation_columns, match_export, partial_aggregates
+
 
 base_url = "http://data.gdeltproject.org/events/"
-#base_url = "http://data.gdeltproject.org/gdeltv2/"
+base_url_v2 = "http://data.gdeltproject.org/gdeltv2/"
 # Use the same file to track last processed timestamp
 last_processed_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../last_downloaded_week.txt")
 download_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../zips")
+# One line per completed file, so an interrupted backfill resumes where it stopped
+download_state_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../downloaded_files.txt")
 os.makedirs(download_folder, exist_ok=True)
-TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+# GDELT 2.0 incremental mode: 15-minute slices are kept apart from the daily
+# v1 exports so the daily filters never count them twice
+slice_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../zips_v2")
+last_slice_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../last_downloaded_slice.txt")
+# Slices GDELT never published (404 while a later slice exists), one per line
+missing_slices_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../missing_slices.txt")
+enriched_keywords_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../enriched_keywords.txt")
+# Written by prune_keywords.py; preferred while it is newer than the full keyword file
+pruned_keywords_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../pruned_keywords.txt")
+output_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../company_outputs")
+# Shared with the V3 filter's defaults, so the API serves either; a store only ever takes
+# one of the two modes (see WeeklyStore), since slices and daily exports hold the same events
+state_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../aggregate_store")
+output_format = "csv"  # or "parquet" (dataset partitioned by ticker) or "sqlite" (one indexed table)
+# Upserted weeks, followed by the API's live feed (/events, /ws)
+event_log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../weekly_updates.jsonl")
+# Stage metrics of each run, served by the API's /metrics; opt-in profiles of a run
+metrics_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../metrics")
+profile_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../profiles")
+SLICE_MINUTES = 15
+POLL_SECONDS = 60
+# Optional aggregation modes of the incremental mode: "mention", "article", "goldstein"
+aggregations = []
 
 
 # ---------- Utility Functions ----------
@@ -36,51 +78,189 @@ def update_last_processed_date(file_path, dt):
     with open(file_path, "w") as f:
         f.write(dt.strftime(TIMESTAMP_FORMAT))
 
-def download_gdelt_file(base_url, dt, download_folder):
+def download_gdelt_file(base_url, dt, download_folder, session=None, manifest=None):
     """
     Attempts to download a GDELT CSV file for the given datetime.
-    The file URL is constructed as: {base_url}{YYYYMMDDHHMMSS}.export.CSV
-    Saves the file in the download_folder with a filename 'gdelt_{YYYYMMDDHHMMSS}.export.CSV'
+    The file URL is constructed as: {base_url}{YYYYMMDD}.export.CSV.zip
+    Saves the file in the download_folder with a filename '{YYYYMMDDHHMMSS}.export.CSV.zip'
+    The file is streamed to disk and checked against the md5sums/filesizes manifest.
     Returns True if downloaded successfully, False otherwise.
     """
-    date_str = dt.strftime("%Y%m%d")
-    file_url = f"{base_url}{date_str}.export.CSV.zip"
+    date_str, file_url, file_name = gdelt_file_job(base_url, dt, download_folder)
     print(f"Attempting to download: {file_url}")
-    
-    response = requests.get(file_url)
-    if response.status_code == 200:
-        timestamp_str = dt.strftime(TIMESTAMP_FORMAT)
-        file_name = os.path.join(download_folder, f"{timestamp_str}.export.CSV.zip")
-        with open(file_name, "wb") as f:
-            f.write(response.content)
-        print(f"Downloaded: {file_name}")
-        return True
-    else:
-        print(f"File not found for {date_str} (Status code: {response.status_code})")
+
+    session = session or requests.Session()
+    expected = (manifest or {}).get(file_url.rsplit("/", 1)[-1])
+    try:
+        if download_to_file(session, file_url, file_name, expected):
+            print(f"Downloaded: {file_name}")
+            return True
+    except (requests.RequestException, ChecksumError) as e:
+        print(f"Error downloading {file_url}: {e}")
         return False
+    print(f"File not found for {date_str}")
+    return False
 
-def download_new_gdelt_files(base_url, last_processed_file, download_folder, interval_minutes=15):
+def download_new_gdelt_files(base_url, last_processed_file, download_folder, interval_minutes=15,
+                             workers=DEFAULT_WORKERS, state_file=download_state_file):
     """
     Downloads GDELT CSV files starting from the last processed date up to the current time.
-    Only files that haven't been downloaded yet are attempted.
-    Updates the last_processed_file with the last downloaded timestamp.
+    Days are fetched in parallel by `workers` threads over one pooled session, and
+    days already recorded in state_file are skipped.
+    Updates the last_processed_file with the first day that is still missing, so the
+    next run starts there.
     """
     last_date = get_last_processed_date(last_processed_file)
-    current_date = last_date
     now = datetime.now()
-    
+
+    days = []
+    current_date = last_date
     while current_date <= now:
-        download_gdelt_file(base_url, current_date, download_folder)
+        days.append(current_date)
         current_date += timedelta(days=1)
-        now = datetime.now()  # Update 'now' to keep up with real time
-        
-    # Update the last processed date (set to the last timestamp that was attempted)
-    update_last_processed_date(last_processed_file, current_date - timedelta(minutes=interval_minutes))
+
+    state = DownloadState(state_file)
+    jobs = [gdelt_file_job(base_url, day, download_folder) for day in days]
+    with make_session(workers) as session:
+        manifest = load_manifest(session, base_url)
+        download_many(jobs, state, workers=workers, session=session, manifest=manifest)
+
+    # Advance over the contiguous run of completed days
+    next_date = current_date
+    for day, (name, _, _) in zip(days, jobs):
+        if not state.is_done(name):
+            next_date = day
+            break
+    if next_date == current_date:
+        # Everything is in; as before, resume just before the next slot
+        next_date = current_date - timedelta(minutes=interval_minutes)
+    update_last_processed_date(last_processed_file, next_date)
     print("Download completed up to current time.")
 
+# ---------- GDELT 2.0 Incremental Mode ----------
+
+def get_latest_slice(session, base_url_v2):
+    """
+    Reads {base_url_v2}lastupdate.txt, whose lines are "<size> <md5> <url>".
+    Returns (slice datetime, export url, {'size', 'md5'}) for the export line,
+    or None if the feed is unavailable.
+    """
+    try:
+        response = session.get(f"{base_url_v2}lastupdate.txt", timeout=30)
+    except requests.RequestException as e:
+        print(f"Error fetching lastupdate.txt: {e}")
+        return None
+    if response.status_code != 200:
+        print(f"lastupdate.txt not available (Status code: {response.status_code})")
+        return None
+    for line in response.text.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[2].endswith(".export.CSV.zip"):
+            size, md5, url = parts
+            slice_dt = datetime.strptime(url.rsplit("/", 1)[-1][:14], TIMESTAMP_FORMAT)
+            return slice_dt, url, {"size": int(size), "md5": md5.lower()}
+    return None
+
+def download_new_slices(session, base_url_v2, last_slice_file, slice_folder, missing_file=missing_slices_file):
+    """
+    Downloads every 15-minute export slice published since the one recorded in
+    last_slice_file, up to the one announced in lastupdate.txt. On the first
+    run only the latest slice is fetched.
+    GDELT 2.0 has slices that were never published: a slice older than the
+    latest one that the server does not have is recorded in missing_file and
+    skipped. Failed downloads, and a latest slice that is not served yet,
+    stop the run there and are retried on the next poll.
+    Returns the downloaded file paths in time order and updates last_slice_file
+    to the last slice that is in place (or known to be missing).
+    """
+    latest = get_latest_slice(session, base_url_v2)
+    if latest is None:
+        return []
+    latest_dt, latest_url, latest_expected = latest
+
+    if os.path.exists(last_slice_file):
+        slice_dt = get_last_processed_date(last_slice_file) + timedelta(minutes=SLICE_MINUTES)
+    else:
+        slice_dt = latest_dt
+    if slice_dt > latest_dt:
+        return []
+
+    os.makedirs(slice_folder, exist_ok=True)
+    jobs = []
+    while slice_dt <= latest_dt:
+        name = slice_dt.strftime(TIMESTAMP_FORMAT)
+        jobs.append((name, f"{base_url_v2}{name}.export.CSV.zip",
+                     os.path.join(slice_folder, f"{name}.export.CSV.zip")))
+        slice_dt += timedelta(minutes=SLICE_MINUTES)
+    # Only the newest slice has a checksum in lastupdate.txt
+    manifest = {latest_url.rsplit("/", 1)[-1]: latest_expected}
+    results = download_many(jobs, workers=min(DEFAULT_WORKERS, len(jobs)), session=session, manifest=manifest)
+
+    latest_name = latest_dt.strftime(TIMESTAMP_FORMAT)
+    downloaded = []
+    for name, _, file_name in jobs:
+        found = results.get(name)
+        if found is False and name < latest_name:
+            print(f"Slice {name} was never published, skipping it")
+            with open(missing_file, "a") as f:
+                f.write(name + "\n")
+        elif not found:
+            break
+        else:
+            downloaded.append(file_name)
+        update_last_processed_date(last_slice_file, datetime.strptime(name, TIMESTAMP_FORMAT))
+    return downloaded
+
+def process_slice(file_path, matcher, store):
+    """Filters one slice for tickers and upserts it into the weekly aggregate store."""
+    columns = aggregation_columns(aggregations)
+    partials = [partial_aggregates(pairs) for pairs in match_export(file_path, matcher, columns) if not pairs.empty]
+    if not partials:
+        return []
+    return store.upsert(pd.concat(partials, ignore_index=True))
+
+def run_incremental(base_url_v2, last_slice_file, slice_folder, keywords_file, output_directory,
+                    state_directory=state_directory, poll_seconds=POLL_SECONDS, once=False):
+    """
+    Polls lastupdate.txt, pulls each new 15-minute export slice, matches it
+    against the enriched keywords and updates the weekly aggregates of the
+    tickers it mentions. Runs until interrupted unless once is True.
+    Refuses to start on a store the daily V3 batch or daemon has written.
+    """
+    matcher = KeywordMatcher(load_enriched_keywords(keywords_file))
+    sink = make_sink(output_format, output_directory, "weekly_{ticker}_news.csv", "weekly_news")
+    store = WeeklyStore(state_directory, output_directory, sink, EventLog(event_log_file), source="slices")
+    with make_session() as session:
+        while True:
+            for file_path in download_new_slices(session, base_url_v2, last_slice_file, slice_folder):
+                try:
+                    tickers = process_slice(file_path, matcher, store)
+                    print(f"Processed slice {os.path.basename(file_path)}: updated {len(tickers)} tickers")
+                except Exception as e:
+                    print(f"Error processing {file_path}: {e}")
+            # This mode never finishes, so the metrics are published after every poll
+            save_snapshot(METRICS.snapshot(), os.path.join(metrics_directory, "fetcher_incremental.json"))
+            if once:
+                return
+            time.sleep(poll_seconds)
+
 # ---------- Main Script ----------
 
 if __name__ == "__main__":
-        
-    download_new_gdelt_files(base_url, last_processed_file, download_folder)
+    parser = argparse.ArgumentParser(description="Download GDELT event exports.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="poll GDELT 2.0 for 15-minute slices and update the weekly outputs")
+    parser.add_argument("--once", action="store_true", help="with --incremental, poll a single time")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parallel daily downloads")
+    parser.add_argument("--profile", choices=PROFILERS, help="profile the run and save the result")
+    args = parser.parse_args()
+
+    job = "fetcher_incremental" if args.incremental else "fetcher"
+    with profiled(job, args.profile, profile_directory), run_metrics(job, metrics_directory):
+        if args.incremental:
+            run_incremental(base_url_v2, last_slice_file, slice_folder,
+                            select_keywords_file(enriched_keywords_file, pruned_keywords_file),
+                            output_directory, once=args.once)
+        else:
+            download_new_gdelt_files(base_url, last_processed_file, download_folder, workers=args.workers)
 
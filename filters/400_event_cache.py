@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------- Configuration ----------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+from pipeline.cache import EventCache
+from pipeline.reader import list_export_files
+
+csv_directory = os.path.join(SCRIPT_DIR, "../zips")
+event_cache_directory = os.path.join(SCRIPT_DIR, "../event_cache")
+
+# ---------- Conversion ----------
+def cache_file(file_path):
+    """Build the cache file of one export if it is missing or stale. Returns an error message or None."""
+    try:
+        EventCache(event_cache_directory).ensure(file_path)
+    except Exception as e:
+        return str(e)
+    return None
+
+def update_cache(workers=1):
+    """
+    Convert every export in csv_directory that has no up-to-date cache file.
+    Exports whose checksum did not change are skipped, so after the first
+    run this only converts newly downloaded days.
+    """
+    cache = EventCache(event_cache_directory)
+    paths = [os.path.join(csv_directory, f) for f in list_export_files(csv_directory)]
+    stale = [p for p in paths if not cache.is_fresh(p)]
+    print(f"{len(paths)} exports, {len(stale)} to convert")
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, error in zip(stale, pool.map(cache_file, stale)):
+                if error:
+                    print(f"Error caching {path}: {error}")
+    else:
+        for path in stale:
+            error = cache_file(path)
+            if error:
+                print(f"Error caching {path}: {error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert GDELT exports to the columnar event cache.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="convert files in this many worker processes (default: serial)")
+    args = parser.parse_args()
+    update_cache(args.workers)
@@ -1,76 +1,64 @@
 import os
-import pandas as pd
+import sys
 
 # Set up directories
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+from pipeline.keywords import load_enriched_keywords, select_keywords_file
+from pipeline.matcher import KeywordMatcher
+from pipeline.metrics import run_metrics
+from pipeline.name_index import NameIndex, keywords_fingerprint
+from pipeline.profiling import profiled
+from pipeline.reader import list_export_files, read_export_chunks
+from pipeline.sink import make_sink
+
 csv_directory = os.path.join(SCRIPT_DIR, "../zips")
 output_directory = os.path.join(SCRIPT_DIR, "../company_outputs")
 os.makedirs(output_directory, exist_ok=True)
+output_format = "csv"  # or "parquet" (dataset partitioned by ticker) or "sqlite" (one indexed table)
 enriched_keywords_file = os.path.join(SCRIPT_DIR, "../enriched_keywords.txt")
+# Written by prune_keywords.py; preferred while it is newer than the full keyword file
+pruned_keywords_file = os.path.join(SCRIPT_DIR, "../pruned_keywords.txt")
+enriched_keywords_file = select_keywords_file(enriched_keywords_file, pruned_keywords_file)
+# Actor name -> tickers lookups kept across runs; discarded when the keyword file changes
+name_index_file = os.path.join(SCRIPT_DIR, "../name_index.pkl")
+# Stage metrics of each run, served by the API's /metrics; set GDELT_PROFILE=cprofile to profile a run
+metrics_directory = os.path.join(SCRIPT_DIR, "../metrics")
+profile_directory = os.path.join(SCRIPT_DIR, "../profiles")
 
-# Define GDELT CSV headers
-headers = [
-    'GLOBALEVENTID', 'SQLDATE', 'MonthYear', 'Year', 'FractionDate', 'Actor1Code',
-    'Actor1Name', 'Actor1CountryCode', 'Actor1KnownGroupCode', 'Actor1EthnicCode',
-    'Actor1Religion1Code', 'Actor1Religion2Code', 'Actor1Type1Code', 'Actor1Type2Code',
-    'Actor1Type3Code', 'Actor2Code', 'Actor2Name', 'Actor2CountryCode', 'Actor2KnownGroupCode',
-    'Actor2EthnicCode', 'Actor2Religion1Code', 'Actor2Religion2Code', 'Actor2Type1Code',
-    'Actor2Type2Code', 'Actor2Type3Code', 'IsRootEvent', 'EventCode', 'EventBaseCode',
-    'EventRootCode', 'QuadClass', 'GoldsteinScale', 'NumMentions', 'NumSources',
-    'NumArticles', 'AvgTone', 'Actor1Geo_Type', 'Actor1Geo_FullName', 'Actor1Geo_CountryCode',
-    'Actor1Geo_ADM1Code', 'Actor1Geo_ADM2Code', 'Actor1Geo_Lat', 'Actor1Geo_Long',
-    'Actor1Geo_FeatureID', 'Actor2Geo_Type', 'Actor2Geo_FullName', 'Actor2Geo_CountryCode',
-    'Actor2Geo_ADM1Code', 'Actor2Geo_ADM2Code', 'Actor2Geo_Lat', 'Actor2Geo_Long',
-    'Actor2Geo_FeatureID', 'ActionGeo_Type', 'ActionGeo_FullName', 'ActionGeo_CountryCode',
-    'ActionGeo_ADM1Code', 'ActionGeo_ADM2Code', 'ActionGeo_Lat', 'ActionGeo_Long',
-    'ActionGeo_FeatureID', 'DATEADDED', 'SOURCEURL'
-]
 columns_to_keep = ['SQLDATE', 'AvgTone']
+actor_columns = ['Actor1Name', 'Actor2Name']
+columns_to_read = columns_to_keep + actor_columns
 
-# Load enriched keywords for each company.
+# Load enriched keywords for each company and build the matcher once.
 # Each line format: CompanyName:TICKER:keyword1:keyword2:...:keywordN
-company_keywords = {}
-with open(enriched_keywords_file, 'r', encoding='utf-8') as f:
-    for line in f:
-        parts = line.strip().split(':')
-        if len(parts) >= 2:
-            # First part is company name, second is ticker, rest are keywords.
-            ticker = parts[1].strip()
-            keywords = [p.strip() for p in parts[2:] if p.strip()]  # leave them as strings
-            company_keywords[ticker] = keywords
-
-# Process each GDELT CSV file
-files = sorted(f for f in os.listdir(csv_directory) if f.endswith(".CSV"))
-for file in files:
-    file_path = os.path.join(csv_directory, file)
-    print(f"Processing file: {file_path}")
-    try:
-        df = pd.read_csv(file_path, sep='\t', names=headers, on_bad_lines='skip', encoding='utf-8', low_memory=False)
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        continue
+company_keywords = load_enriched_keywords(enriched_keywords_file)
+name_index = NameIndex.load(name_index_file, keywords_fingerprint(enriched_keywords_file))
+matcher = KeywordMatcher(company_keywords, name_index)
 
-    # Create a combined text column from Actor1Name and Actor2Name for easier matching
-    df['combined'] = df['Actor1Name'].fillna('') + ' ' + df['Actor2Name'].fillna('')
-    df['combined'] = df['combined'].str.lower()
-
-    # Loop through each company based on enriched keywords
-    for ticker, keywords in company_keywords.items():
-        # Create a mask: row is selected if any keyword is found in the combined text
-        mask = df['combined'].apply(lambda text: any(keyword.lower() in text for keyword in keywords))
-        filtered = df[mask]
-        if not filtered.empty:
-            # Select only the columns we need
-            result = filtered[columns_to_keep].copy()
-            output_file = os.path.join(output_directory, f"{ticker}_news.csv")
-            # If file doesn't exist, write header; else, append
-            if not os.path.exists(output_file):
-                result.to_csv(output_file, index=False)
-            else:
-                result.to_csv(output_file, mode='a', index=False, header=False)
-            print(f"Appended {len(result)} rows for {ticker} from {file}")
-    # Clean up
-    del df['combined']
+# Process each GDELT export, one chunk at a time; matched rows are
+# buffered per ticker and written once, at the end of the run
+sink = make_sink(output_format, output_directory, "{ticker}_news.csv", "news")
+with profiled("filter_v2", profile_directory=profile_directory), run_metrics("filter_v2", metrics_directory):
+    files = list_export_files(csv_directory)
+    for file in files:
+        file_path = os.path.join(csv_directory, file)
+        print(f"Processing file: {file_path}")
+        try:
+            chunks = read_export_chunks(file_path, columns_to_read)
+            for df in chunks:
+                # Match each distinct actor name once and split the matches into (row, ticker) pairs
+                pairs = matcher.all_matches(df, actor_columns, columns=columns_to_keep)
+                for ticker, filtered in pairs.groupby('Ticker', sort=False):
+                    # Select only the columns we need
+                    sink.append(ticker, filtered[columns_to_keep])
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+    for ticker, rows in sink.flush().items():
+        print(f"Appended {rows} rows for {ticker} from {len(files)} files")
 
+name_index.save(name_index_file)
+stats = name_index.stats()
+print(f"Name index: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)")
 print("Processing completed.")
-
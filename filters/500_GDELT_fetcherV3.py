@@ -1,52 +1,53 @@
+import argparse
 import os
+import sys
 import pandas as pd
 
 # ---------- Configuration ----------
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, ".."))
+
+from pipeline.cache import EventCache
+from pipeline.events import EventLog
+from pipeline.keywords import load_enriched_keywords, select_keywords_file
+from pipeline.sink import make_sink
+from pipeline.matcher import KeywordMatcher
+from pipeline.metrics import run_metrics
+from pipeline.name_index import NameIndex, keywords_fingerprint
+from pipeline.parallel import aggregate_files, contiguous_prefix
+from pipeline.profiling import PROFILERS, profiled
+from pipeline.reader import list_export_files
+from pipeline.weekly import WeeklyStore, aggregation_columns, match_export, partial_aggregates
+
 csv_directory = os.path.join(SCRIPT_DIR, "../zips")
 output_directory = os.path.join(SCRIPT_DIR, "../company_outputs")
 os.makedirs(output_directory, exist_ok=True)
+# Mergeable weekly state; the CSVs in output_directory are regenerated from it
+state_directory = os.path.join(SCRIPT_DIR, "../aggregate_store")
+# Upserted weeks, followed by the API's live feed (/events, /ws)
+event_log_file = os.path.join(SCRIPT_DIR, "../weekly_updates.jsonl")
+output_format = "csv"  # or "parquet" (dataset partitioned by ticker) or "sqlite" (one indexed table)
+# Columnar copy of the exports, read instead of the raw files with --cache (needs pyarrow)
+event_cache_directory = os.path.join(SCRIPT_DIR, "../event_cache")
+# Stage metrics of each run, served by the API's /metrics; opt-in profiles of a run
+metrics_directory = os.path.join(SCRIPT_DIR, "../metrics")
+profile_directory = os.path.join(SCRIPT_DIR, "../profiles")
 
 enriched_keywords_file = os.path.join(SCRIPT_DIR, "../enriched_keywords.txt")
+# Written by prune_keywords.py; preferred while it is newer than the full keyword file
+pruned_keywords_file = os.path.join(SCRIPT_DIR, "../pruned_keywords.txt")
+enriched_keywords_file = select_keywords_file(enriched_keywords_file, pruned_keywords_file)
 last_week_file = os.path.join(SCRIPT_DIR, "../last_processed_week.txt")
+# Actor name -> tickers lookups kept across runs; discarded when the keyword file changes
+name_index_file = os.path.join(SCRIPT_DIR, "../name_index.pkl")
 
-# Define GDELT CSV headers (as provided)
-headers = [
-    'GLOBALEVENTID', 'SQLDATE', 'MonthYear', 'Year', 'FractionDate', 'Actor1Code',
-    'Actor1Name', 'Actor1CountryCode', 'Actor1KnownGroupCode', 'Actor1EthnicCode',
-    'Actor1Religion1Code', 'Actor1Religion2Code', 'Actor1Type1Code', 'Actor1Type2Code',
-    'Actor1Type3Code', 'Actor2Code', 'Actor2Name', 'Actor2CountryCode', 'Actor2KnownGroupCode',
-    'Actor2EthnicCode', 'Actor2Religion1Code', 'Actor2Religion2Code', 'Actor2Type1Code',
-    'Actor2Type2Code', 'Actor2Type3Code', 'IsRootEvent', 'EventCode', 'EventBaseCode',
-    'EventRootCode', 'QuadClass', 'GoldsteinScale', 'NumMentions', 'NumSources',
-    'NumArticles', 'AvgTone', 'Actor1Geo_Type', 'Actor1Geo_FullName', 'Actor1Geo_CountryCode',
-    'Actor1Geo_ADM1Code', 'Actor1Geo_ADM2Code', 'Actor1Geo_Lat', 'Actor1Geo_Long',
-    'Actor1Geo_FeatureID', 'Actor2Geo_Type', 'Actor2Geo_FullName', 'Actor2Geo_CountryCode',
-    'Actor2Geo_ADM1Code', 'Actor2Geo_ADM2Code', 'Actor2Geo_Lat', 'Actor2Geo_Long',
-    'Actor2Geo_FeatureID', 'ActionGeo_Type', 'ActionGeo_FullName', 'ActionGeo_CountryCode',
-    'ActionGeo_ADM1Code', 'ActionGeo_ADM2Code', 'ActionGeo_Lat', 'ActionGeo_Long',
-    'ActionGeo_FeatureID', 'DATEADDED', 'SOURCEURL'
-]
-columns_to_keep = ['SQLDATE', 'AvgTone']  # We only need these for aggregation
+# Tone is always averaged per event; add "mention" / "article" (tone weighted by NumMentions /
+# NumArticles) or "goldstein" (GoldsteinScale mean/std). Enabling one later only fills new
+# weeks; run with --refilter to backfill it
+aggregations = []
+columns_to_keep = aggregation_columns(aggregations)  # We only need these for aggregation
 
 # ---------- Utility Functions ----------
-def load_enriched_keywords(file_path):
-    """
-    Load enriched keywords from file.
-    Each line: CompanyName:TICKER:keyword1:keyword2:...:keywordN
-    Returns a dictionary mapping ticker to a dict with 'company' and 'keywords'.
-    """
-    enriched = {}
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            parts = line.strip().split(':')
-            if len(parts) >= 2:
-                company = parts[0].strip()
-                ticker = parts[1].strip()
-                keywords = [p.strip() for p in parts[2:] if p.strip()]
-                enriched[ticker] = {'company': company, 'keywords': keywords}
-    return enriched
-
 def get_last_processed_week():
     """Return the last processed week (as a string YYYYMMDD) from file, or default if missing."""
     if os.path.exists(last_week_file):
@@ -58,79 +59,121 @@ def update_last_processed_week(week):
     with open(last_week_file, "w") as f:
         f.write(week)
 
-def process_csv_file(file_path):
-    """Load a single GDELT CSV file with forced headers."""
-    try:
-        df = pd.read_csv(file_path, sep='\t', names=headers, on_bad_lines='skip', encoding='utf-8', low_memory=False)
-        return df
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return pd.DataFrame()
+def process_csv_file(file_path, matcher, cache=None):
+    """
+    Match a single GDELT export (CSV or CSV.zip) chunk by chunk, yielding (row, ticker) pairs.
+    Read errors propagate, so the caller can stop before a file that was not read completely.
+    """
+    yield from match_export(file_path, matcher, columns_to_keep, cache)
+
+def load_name_index():
+    return NameIndex.load(name_index_file, keywords_fingerprint(enriched_keywords_file))
+
+def print_name_index_stats(name_index):
+    stats = name_index.stats()
+    print(f"Name index: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['hit_rate']:.1%} hit rate), {stats['size']} names, {stats['evictions']} evicted")
+
+def process_files_parallel(new_files, enriched, last_week, workers, cache_directory=None, name_index=None):
+    """
+    Aggregate new_files in `workers` processes. Returns the partial aggregates
+    and the last processed date, counting only the files before the first
+    failure (and before that file's date), so nothing is committed twice.
+    """
+    paths = [os.path.join(csv_directory, f) for f in new_files]
+    finished = {}
+    for path, partial, error in aggregate_files(paths, enriched, workers, cache_directory, name_index,
+                                                columns_to_keep):
+        if error is not None:
+            print(f"Error processing {path}: {error}")
+        else:
+            print(f"Processed file: {path}")
+            finished[path] = partial
+
+    done = contiguous_prefix(paths, finished)
+    if len(done) < len(paths):
+        gap_date = new_files[len(done)][:8]
+        done = [p for p in done if os.path.basename(p)[:8] < gap_date]
+        print(f"Stopping before {gap_date}; later files will be processed on the next run")
+
+    partials = [finished[p] for p in done if not finished[p].empty]
+    max_file_date = os.path.basename(done[-1])[:8] if done else last_week
+    return partials, max_file_date
 
 # ---------- Main Processing ----------
-def process_new_files(enriched, last_week):
+def process_new_files(enriched, last_week, workers=1, use_cache=False):
     # List and filter CSV files based on filename date (YYYYMMDD at start)
-    files = sorted(f for f in os.listdir(csv_directory) if f.endswith(".CSV"))
+    files = list_export_files(csv_directory)
     new_files = [f for f in files if f[:8] > last_week]
     if not new_files:
         print("No new files to process.")
         return last_week
 
-    # Dictionary to accumulate DataFrames per company (by ticker)
-    company_data = {ticker: [] for ticker in enriched.keys()}
-    max_file_date = last_week  # To update last processed week
-
-    # Process each new file
-    for file in new_files:
-        file_date = file[:8]  # Extract date from filename
-        if file_date > max_file_date:
-            max_file_date = file_date
-        file_path = os.path.join(csv_directory, file)
-        print(f"Processing file: {file_path}")
-        df = process_csv_file(file_path)
-        if df.empty:
-            continue
-
-        # Create a combined text field for matching
-        df['combined'] = (df['Actor1Name'].fillna('') + " " + df['Actor2Name'].fillna('')).str.lower()
-
-        # For each company, filter rows where any enriched keyword appears in the combined text
-        for ticker, info in enriched.items():
-            keywords = info['keywords']
-            mask = df['combined'].apply(lambda text: any(kw.lower() in text for kw in keywords))
-            filtered = df[mask]
-            if not filtered.empty:
-                # Keep only columns needed for aggregation
-                filtered = filtered[columns_to_keep].copy()
-                company_data[ticker].append(filtered)
-
-    # For each company, if any data was collected, aggregate weekly
-    for ticker, dfs in company_data.items():
-        if dfs:
-            combined_df = pd.concat(dfs, ignore_index=True)
-            # Convert SQLDATE to datetime (assuming it's in YYYYMMDD format)
-            combined_df['SQLDATE'] = pd.to_datetime(combined_df['SQLDATE'], format='%Y%m%d', errors='coerce')
-            combined_df.dropna(subset=['SQLDATE'], inplace=True)
-            combined_df.set_index('SQLDATE', inplace=True)
-            # Resample by week (using mean for AvgTone and count for articles)
-            agg_df = combined_df.resample('W')['AvgTone'].agg(['mean', 'count']).reset_index()
-            agg_df.rename(columns={'mean': 'AvgTone', 'count': 'Count'}, inplace=True)
-            agg_df.insert(1, 'Ticker', ticker)
-            # Append aggregated data to file for this ticker
-            output_file = os.path.join(output_directory, f"weekly_{ticker}_news.csv")
-            write_header = not os.path.exists(output_file)
-            agg_df.to_csv(output_file, mode='a', index=False, header=write_header)
-            print(f"Aggregated data for {ticker} saved to {output_file}")
-        else:
-            print(f"No new data for {ticker} in this batch.")
+    cache_directory = event_cache_directory if use_cache else None
+    name_index = load_name_index()
+    if workers > 1:
+        partials, max_file_date = process_files_parallel(new_files, enriched, last_week, workers,
+                                                         cache_directory, name_index)
+    else:
+        cache = EventCache(cache_directory) if use_cache else None
+        matcher = KeywordMatcher(enriched, name_index)
+        # (file, partial aggregates of its chunks) of every file read completely, in order
+        finished = []
+
+        # Process each new file; like the parallel path, stop at the first one that fails
+        for file in new_files:
+            file_path = os.path.join(csv_directory, file)
+            print(f"Processing file: {file_path}")
+            try:
+                # Each row is scanned once; matches come back as (row, ticker) pairs
+                file_partials = [partial_aggregates(pairs) for pairs in process_csv_file(file_path, matcher, cache)
+                                 if not pairs.empty]
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+                gap_date = file[:8]  # Extract date from filename
+                finished = [(f, p) for f, p in finished if f[:8] < gap_date]
+                print(f"Stopping before {gap_date}; later files will be processed on the next run")
+                break
+            finished.append((file, file_partials))
+
+        partials = [partial for _, file_partials in finished for partial in file_partials]
+        # To update last processed week: only files that were read completely count
+        max_file_date = finished[-1][0][:8] if finished else last_week
+        name_index.save(name_index_file)
+        print_name_index_stats(name_index)
+
+    # Fold the batch into the weekly store; weeks already on disk are merged, not duplicated
+    if partials:
+        sink = make_sink(output_format, output_directory, "weekly_{ticker}_news.csv", "weekly_news")
+        store = WeeklyStore(state_directory, output_directory, sink, EventLog(event_log_file), source="daily")
+        for ticker in store.upsert(pd.concat(partials, ignore_index=True)):
+            print(f"Aggregated data for {ticker} saved to {sink.path(ticker)}")
+    else:
+        print("No new data in this batch.")
 
     return max_file_date
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate weekly per-ticker tone from GDELT exports.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="process files in this many worker processes (default: serial)")
+    parser.add_argument("--cache", action="store_true",
+                        help="read exports from the columnar event cache, building it where stale")
+    parser.add_argument("--refilter", action="store_true",
+                        help="drop the weekly store and re-aggregate every export (e.g. after editing keywords)")
+    parser.add_argument("--profile", choices=PROFILERS, help="profile the run and save the result")
+    args = parser.parse_args()
+
     enriched = load_enriched_keywords(enriched_keywords_file)
-    last_week = get_last_processed_week()
+    if args.refilter:
+        sink = make_sink(output_format, output_directory, "weekly_{ticker}_news.csv", "weekly_news")
+        WeeklyStore(state_directory, output_directory, sink).clear()
+        last_week = "00000000"
+    else:
+        last_week = get_last_processed_week()
     print(f"Last processed week: {last_week}")
-    new_last_week = process_new_files(enriched, last_week)
+    with profiled("filter_v3", args.profile, profile_directory), run_metrics("filter_v3", metrics_directory):
+        new_last_week = process_new_files(enriched, last_week, workers=args.workers, use_cache=args.cache)
     update_last_processed_week(new_last_week)
     print(f"Updated last processed week to {new_last_week}")
 
@@ -0,0 +1 @@
+"""Shared building blocks for the GDELT fetcher, filter scripts and API."""
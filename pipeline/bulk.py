@@ -0,0 +1,81 @@
+import io
+import json
+import zipfile
+
+# Bytes read from disk (and handed to the client) at a time
+STREAM_BLOCK = 1 << 16
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that zipfile writes into and the generator drains."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(members):
+    """
+    Stream a zip archive of members, an iterable of (name, iterable of
+    bytes blocks), as it is built. Only the block being compressed and the
+    central directory (one small record per member) are held in memory.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, blocks in members:
+            with archive.open(name, mode="w") as member:
+                for block in blocks:
+                    member.write(block)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    # Central directory, written on close
+    yield buffer.drain()
+
+
+def file_blocks(path, block_size=STREAM_BLOCK):
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def ticker_csv_members(index, tickers, since=None, stamps=None):
+    """
+    (file name, blocks) per ticker for iter_zip: the file on disk as is
+    (stamps being the OutputCatalog's), or only the weeks from since
+    (YYYY-MM-DD) on, from index (a SentimentIndex or WeeklyDatabase).
+    """
+    stamps = stamps or {}
+    for ticker in tickers:
+        name = f"weekly_{ticker}_news.csv"
+        if since is None and ticker in stamps:
+            yield name, file_blocks(stamps[ticker][0])
+            continue
+        frame = index.frame([ticker], start=since)
+        yield name, [frame.to_csv(index=False).encode("utf-8")]
+
+
+def iter_ndjson(index, tickers, since=None):
+    """One JSON object per weekly row, ticker by ticker, as UTF-8 lines."""
+    for ticker in tickers:
+        records = index.records(ticker, start=since) or []
+        lines = [json.dumps(record) for record in records]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
@@ -0,0 +1,149 @@
+import os
+
+from pipeline.downloader import file_md5
+from pipeline.metrics import timed_chunks
+from pipeline.reader import CHUNK_SIZE, _arrow_type, _pandas_type, read_export_chunks
+from pipeline.schema import dtypes_for
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for the event cache
+    pa = None
+    ds = None
+    pq = None
+
+# The columns any filter or query reads; everything else in an export is dropped
+CACHE_COLUMNS = [
+    'SQLDATE', 'Actor1Name', 'Actor2Name', 'GoldsteinScale', 'NumMentions', 'NumSources',
+    'NumArticles', 'AvgTone', 'Actor1Geo_FullName', 'Actor2Geo_FullName', 'ActionGeo_FullName',
+    'SOURCEURL',
+]
+# Heavily repeated names, stored dictionary-encoded (categoricals in pandas)
+DICTIONARY_COLUMNS = [
+    'Actor1Name', 'Actor2Name', 'Actor1Geo_FullName', 'Actor2Geo_FullName', 'ActionGeo_FullName',
+]
+
+# Keys of the Parquet file metadata that record which source a cache file was built from
+SOURCE_KEYS = (b'source_size', b'source_mtime', b'source_md5')
+
+
+def _cache_schema():
+    fields = []
+    for column, dtype in dtypes_for(CACHE_COLUMNS).items():
+        if column in DICTIONARY_COLUMNS:
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(column, _arrow_type(dtype)))
+    return pa.schema(fields)
+
+
+class EventCache:
+    """
+    Columnar copy of the raw exports: one {day}.parquet per export in
+    cache_directory with only CACHE_COLUMNS, typed and with the name
+    columns dictionary-encoded.
+
+    Each cache file records the size, mtime and MD5 of the export it was
+    built from. A cache file is reused while the export's size and mtime are
+    unchanged, or while its MD5 still matches (e.g. after the zip was copied),
+    and rebuilt otherwise.
+    """
+
+    def __init__(self, cache_directory):
+        if pq is None:
+            raise ImportError("EventCache requires pyarrow")
+        self.cache_directory = cache_directory
+        os.makedirs(cache_directory, exist_ok=True)
+        self.schema = _cache_schema()
+
+    def cache_path(self, source):
+        name = os.path.basename(source)
+        for suffix in (".zip", ".CSV"):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+        return os.path.join(self.cache_directory, f"{name}.parquet")
+
+    def _recorded(self, source):
+        path = self.cache_path(source)
+        if not os.path.exists(path):
+            return None
+        metadata = pq.read_schema(path).metadata or {}
+        if not all(key in metadata for key in SOURCE_KEYS):
+            return None
+        return {key: metadata[key].decode() for key in SOURCE_KEYS}
+
+    def is_fresh(self, source):
+        """True if the cache file of source exists and was built from its current contents."""
+        recorded = self._recorded(source)
+        if recorded is None:
+            return False
+        stat = os.stat(source)
+        if (recorded[b'source_size'] == str(stat.st_size)
+                and recorded[b'source_mtime'] == str(stat.st_mtime_ns)):
+            return True
+        return (recorded[b'source_size'] == str(stat.st_size)
+                and recorded[b'source_md5'] == file_md5(source))
+
+    def build(self, source):
+        """Parse source once and (re)write its cache file. Returns the number of rows."""
+        stat = os.stat(source)
+        schema = self.schema.with_metadata({
+            b'source_size': str(stat.st_size),
+            b'source_mtime': str(stat.st_mtime_ns),
+            b'source_md5': file_md5(source),
+        })
+        path = self.cache_path(source)
+        # Dot-prefixed so a half-written file is never picked up by scan()
+        tmp_path = os.path.join(self.cache_directory, f".{os.path.basename(path)}.tmp")
+        rows = 0
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            for chunk in read_export_chunks(source, CACHE_COLUMNS):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+        os.replace(tmp_path, path)
+        return rows
+
+    def ensure(self, source):
+        """Build the cache file of source if it is missing or stale. Returns True if it was rebuilt."""
+        if self.is_fresh(source):
+            return False
+        rows = self.build(source)
+        print(f"Cached {source} ({rows} rows)")
+        return True
+
+    def update(self, sources):
+        """Bring the cache files of all sources up to date. Returns the rebuilt sources."""
+        return [source for source in sources if self.ensure(source)]
+
+    def read_chunks(self, source, columns=None, chunksize=CHUNK_SIZE):
+        """
+        Yield DataFrames of at most chunksize rows from the cache file of
+        source, reading only columns. Same shape as read_export_chunks.
+        """
+        columns = list(columns) if columns is not None else list(CACHE_COLUMNS)
+        yield from timed_chunks(self._batches(source, columns, chunksize), 'cache_read')
+
+    def _batches(self, source, columns, chunksize):
+        with pq.ParquetFile(self.cache_path(source)) as parquet:
+            for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas(types_mapper=_pandas_type)
+
+    def scan(self, columns=None, start=None, end=None, filter=None):
+        """
+        Query the whole cache as one dataset. Only columns are read, and the
+        SQLDATE range [start, end] (YYYYMMDD ints) plus any extra pyarrow
+        filter expression are pushed down to the Parquet row groups.
+        """
+        dataset = ds.dataset(self.cache_directory, format='parquet', schema=self.schema)
+        expression = filter
+        if start is not None:
+            bound = ds.field('SQLDATE') >= start
+            expression = bound if expression is None else expression & bound
+        if end is not None:
+            bound = ds.field('SQLDATE') <= end
+            expression = bound if expression is None else expression & bound
+        table = dataset.to_table(columns=columns, filter=expression)
+        return table.to_pandas(types_mapper=_pandas_type)
+
@@ -0,0 +1,117 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# weekly_{ticker}_news.csv, as written by WeeklyStore / the V1 filter
+VIEW_FILE = re.compile(r"^weekly_(?P<ticker>.+)_news\.csv$")
+
+# How often (at most) a request stats the output directory
+CHECK_SECONDS = 1.0
+# Appending to a file in place does not change the directory's mtime, so
+# every file is re-stat'ed at least this often as well
+RESCAN_SECONDS = 30.0
+
+
+def _describe(path):
+    """Row count and last week covered of a weekly output, reading only its date column."""
+    try:
+        dates = pd.read_csv(path, usecols=['SQLDATE'])['SQLDATE']
+    except (OSError, ValueError) as e:
+        print(f"Could not read {path}: {e}")
+        return None, None
+    last_week = pd.to_datetime(dates, errors='coerce').max()
+    return len(dates), None if pd.isna(last_week) else last_week.strftime('%Y-%m-%d')
+
+
+class OutputCatalog:
+    """
+    Metadata of the weekly_{ticker}_news.csv files in output_directory:
+    file name, size, modification time, row count and last week covered.
+
+    Built once, then kept current cheaply: a request stats only the
+    directory (at most every check_seconds) and the files are re-stat'ed
+    when its mtime moved, or every rescan_seconds. Only new or changed files
+    are opened. version increases whenever anything changed, so other
+    in-memory views of the outputs (see SentimentIndex) can follow along.
+    """
+
+    def __init__(self, output_directory, check_seconds=CHECK_SECONDS, rescan_seconds=RESCAN_SECONDS):
+        self.output_directory = output_directory
+        self.check_seconds = check_seconds
+        self.rescan_seconds = rescan_seconds
+        self.version = 0
+        self.entries = {}
+        self.listing = []
+        self._stamps = {}
+        self._directory_mtime = None
+        self._checked = 0.0
+        self._scanned = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Re-scan the directory if it changed (or force). Returns True if any entry changed."""
+        with self._lock:
+            now = time.monotonic()
+            self._checked = now
+            try:
+                directory_mtime = os.stat(self.output_directory).st_mtime_ns
+            except FileNotFoundError:
+                directory_mtime = None
+            unchanged = directory_mtime == self._directory_mtime and now - self._scanned < self.rescan_seconds
+            if unchanged and not force:
+                return False
+            self._directory_mtime = directory_mtime
+            self._scanned = now
+            return self._scan()
+
+    def _scan(self):
+        seen = {}
+        if self._directory_mtime is not None:
+            for entry in os.scandir(self.output_directory):
+                match = VIEW_FILE.match(entry.name)
+                if match and entry.is_file():
+                    stat = entry.stat()
+                    seen[match.group('ticker')] = (entry.path, stat.st_size, stat.st_mtime_ns)
+        if seen == self._stamps:
+            return False
+
+        entries = {t: e for t, e in self.entries.items() if t in seen}
+        for ticker, stamp in seen.items():
+            if self._stamps.get(ticker) == stamp:
+                continue
+            path, size, mtime_ns = stamp
+            rows, last_week = _describe(path)
+            entries[ticker] = {
+                'file': os.path.basename(path),
+                'ticker': ticker,
+                'size': size,
+                'modified': datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc).isoformat(),
+                'rows': rows,
+                'last_week': last_week,
+            }
+        self._stamps = seen
+        self.entries = entries
+        # Newest first, as /list has always returned them
+        self.listing = sorted(entries.values(), key=lambda e: (seen[e['ticker']][2], e['file']), reverse=True)
+        self.version += 1
+        return True
+
+    def maybe_refresh(self):
+        if time.monotonic() - self._checked >= self.check_seconds:
+            self.refresh()
+
+    def stamps(self):
+        """{ticker: (path, size, mtime_ns)}; replaced, never modified, on each change."""
+        return self._stamps
+
+    def page(self, offset=0, limit=None):
+        """(total, entries[offset:offset + limit]) of the newest-first listing."""
+        self.maybe_refresh()
+        listing = self.listing
+        end = None if limit is None else offset + limit
+        return len(listing), listing[offset:end]
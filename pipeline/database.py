@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from pipeline.sink import SQLITE_FILE
+
+# Rankings without a count floor are dominated by tickers with one or two events
+DEFAULT_MIN_COUNT = 5
+
+
+def records(df):
+    """JSON-ready rows of df; NaN becomes None (null)."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class WeeklyDatabase:
+    """
+    Read side of the weekly table a SqliteSink writes ({output_directory}/gdelt.db):
+    a ticker's weeks through the (Ticker, SQLDATE) index, every ticker of
+    one week through the SQLDATE index, and rankings of one week by any
+    numeric column, without opening a file per ticker.
+
+    Every query opens its own read-only connection, so API threads never
+    share one and the writer is never blocked. Column names given by
+    callers are checked against the table before they reach SQL; unknown
+    ones raise ValueError.
+    """
+
+    def __init__(self, output_directory, table='weekly_news'):
+        self.path = os.path.join(output_directory, SQLITE_FILE)
+        self.table = table
+
+    def _connect(self):
+        return closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True))
+
+    def _query(self, sql, params=()):
+        with self._connect() as db:
+            return pd.read_sql_query(sql, db, params=params)
+
+    def available(self):
+        """True once a filter has written the table."""
+        if not os.path.exists(self.path):
+            return False
+        return bool(self.columns())
+
+    def columns(self):
+        with self._connect() as db:
+            return [row[1] for row in db.execute(f'PRAGMA table_info("{self.table}")')]
+
+    def _select(self, fields):
+        columns = self.columns()
+        if not fields:
+            return ", ".join(f'"{c}"' for c in columns)
+        unknown = [f for f in fields if f not in columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return ", ".join(f'"{f}"' for f in fields)
+
+    def tickers(self):
+        with self._connect() as db:
+            return [row[0] for row in db.execute(f'SELECT DISTINCT Ticker FROM "{self.table}" ORDER BY Ticker')]
+
+    def has_ticker(self, ticker):
+        with self._connect() as db:
+            row = db.execute(f'SELECT 1 FROM "{self.table}" WHERE Ticker = ? LIMIT 1', (ticker,)).fetchone()
+        return row is not None
+
+    def latest_week(self):
+        """The most recent week (YYYY-MM-DD) in the table, or None."""
+        with self._connect() as db:
+            return db.execute(f'SELECT MAX(SQLDATE) FROM "{self.table}"').fetchone()[0]
+
+    def ticker_rows(self, ticker, start=None, end=None, fields=None):
+        """Weeks of ticker between start and end (YYYY-MM-DD, inclusive), oldest first."""
+        return self._query(
+            f'SELECT {self._select(fields)} FROM "{self.table}" '
+            f'WHERE Ticker = ? AND SQLDATE >= ? AND SQLDATE <= ? ORDER BY SQLDATE',
+            (ticker, start or "", end or "9999-12-31"))
+
+    def records(self, ticker, start=None, end=None, fields=None):
+        """JSON-ready weeks of ticker between start and end, or None; as SentimentIndex.records."""
+        if not self.has_ticker(ticker):
+            return None
+        return records(self.ticker_rows(ticker, start, end, fields))
+
+    def frame(self, tickers, start=None, end=None, fields=None):
+        """Weeks of several tickers as one DataFrame, in the order given; as SentimentIndex.frame."""
+        df = self._query(
+            f'SELECT {self._select(fields)}, Ticker AS _ticker FROM "{self.table}" '
+            f'WHERE Ticker IN (SELECT value FROM json_each(?)) AND SQLDATE >= ? AND SQLDATE <= ? '
+            f'ORDER BY Ticker, SQLDATE',
+            (json.dumps(list(tickers)), start or "", end or "9999-12-31"))
+        order = pd.Categorical(df.pop('_ticker'), categories=list(dict.fromkeys(tickers)))
+        return df.iloc[order.argsort(kind='stable')].reset_index(drop=True)
+
+    def all_rows(self, fields=None):
+        """The whole table, by ticker and week."""
+        return self._query(f'SELECT {self._select(fields)} FROM "{self.table}" ORDER BY Ticker, SQLDATE')
+
+    def week_rows(self, week, fields=None):
+        """Every ticker's row for one week (YYYY-MM-DD), by ticker."""
+        return self._query(f'SELECT {self._select(fields)} FROM "{self.table}" WHERE SQLDATE = ? ORDER BY Ticker',
+                           (week,))
+
+    def ranking(self, week, by='AvgTone', descending=False, limit=20, min_count=DEFAULT_MIN_COUNT):
+        """
+        The limit tickers with the lowest (or, descending, highest) value of
+        column by in week, among those with at least min_count events; ties
+        go by ticker. The same floor and order as ToneMatrix.ranking.
+        """
+        columns = self.columns()
+        if by not in columns:
+            raise ValueError(f"Unknown column: {by}")
+        order = "DESC" if descending else "ASC"
+        return self._query(
+            f'SELECT {self._select(None)} FROM "{self.table}" '
+            f'WHERE SQLDATE = ? AND Count >= ? AND "{by}" IS NOT NULL ORDER BY "{by}" {order}, Ticker LIMIT ?',
+            (week, min_count, limit))
+
+    def csv(self, ticker):
+        """weekly_{ticker}_news.csv, generated from the table on demand."""
+        return self.ticker_rows(ticker).to_csv(index=False)
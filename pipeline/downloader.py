@@ -0,0 +1,192 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from pipeline.metrics import METRICS
+
+# Parallel downloads; GDELT serves static files, a handful of workers is plenty
+DEFAULT_WORKERS = 8
+REQUEST_TIMEOUT = 60
+CHUNK_BYTES = 1 << 20
+# Daily exports are saved as {YYYYMMDDHHMMSS}.export.CSV.zip
+TIMESTAMP_FORMAT = "%Y%m%d%H%M%S"
+
+
+def gdelt_file_job(base_url, dt, download_folder):
+    """
+    Returns the (name, url, file_name) download job for the daily export of dt.
+    The file URL is constructed as: {base_url}{YYYYMMDD}.export.CSV.zip
+    and it is saved as '{YYYYMMDDHHMMSS}.export.CSV.zip' in download_folder.
+    """
+    date_str = dt.strftime("%Y%m%d")
+    file_url = f"{base_url}{date_str}.export.CSV.zip"
+    timestamp_str = dt.strftime(TIMESTAMP_FORMAT)
+    file_name = os.path.join(download_folder, f"{timestamp_str}.export.CSV.zip")
+    return date_str, file_url, file_name
+
+
+def make_session(pool_size=DEFAULT_WORKERS, retries=3):
+    """
+    Build a requests.Session whose connection pool is large enough for
+    pool_size concurrent workers, retrying transient server errors.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504),
+                  allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class DownloadState:
+    """
+    Per-file completion log. Each finished file name is appended as one line,
+    so after a crash only the files missing from the log are fetched again.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self.completed = set()
+        if os.path.exists(file_path):
+            with open(file_path, "r") as f:
+                self.completed = {line.strip() for line in f if line.strip()}
+
+    def is_done(self, name):
+        return name in self.completed
+
+    def mark_done(self, name):
+        with self._lock:
+            if name in self.completed:
+                return
+            with open(self.file_path, "a") as f:
+                f.write(name + "\n")
+            self.completed.add(name)
+
+
+class ChecksumError(Exception):
+    """A downloaded file does not match the size or MD5 in the GDELT manifest."""
+
+
+def load_manifest(session, base_url, timeout=REQUEST_TIMEOUT):
+    """
+    Fetch GDELT's `md5sums` and `filesizes` listings next to the exports.
+    Returns a dict mapping file name to {'md5': ..., 'size': ...}; either key
+    may be missing, and the dict is empty when the server has no manifest.
+    """
+    manifest = {}
+    for listing, key in (("md5sums", "md5"), ("filesizes", "size")):
+        try:
+            response = session.get(f"{base_url}{listing}", timeout=timeout)
+        except requests.RequestException as e:
+            print(f"Could not fetch {listing}: {e}")
+            continue
+        if response.status_code != 200:
+            continue
+        for line in response.text.splitlines():
+            parts = line.split()
+            if len(parts) != 2:
+                continue
+            # md5sums is "<md5> <name>", filesizes is "<size> <name>"
+            value, name = parts
+            manifest.setdefault(name, {})[key] = value.lower() if key == "md5" else int(value)
+    return manifest
+
+
+def file_md5(file_name):
+    """Hex MD5 of a file, read in CHUNK_BYTES blocks."""
+    digest = hashlib.md5()
+    with open(file_name, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_valid_file(file_name, expected):
+    """True if file_name exists and matches the expected size and MD5 (when known)."""
+    if not expected or not os.path.exists(file_name):
+        return False
+    if "size" in expected and os.path.getsize(file_name) != expected["size"]:
+        return False
+    if "md5" in expected and file_md5(file_name) != expected["md5"]:
+        return False
+    return True
+
+
+def download_to_file(session, url, file_name, expected=None, timeout=REQUEST_TIMEOUT):
+    """
+    Stream url to file_name. The body is written in chunks to a temporary
+    '.part' file, checked against expected size/MD5 and then atomically
+    renamed, so file_name is never left truncated. A file that is already
+    present and valid is not downloaded again.
+    Returns True if the file is in place, False if the server had no file.
+    Raises ChecksumError when the download does not match the manifest.
+    """
+    if is_valid_file(file_name, expected):
+        return True
+
+    with METRICS.stage('download') as record, session.get(url, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            return False
+        part_name = f"{file_name}.part"
+        digest = hashlib.md5()
+        size = 0
+        try:
+            with open(part_name, "wb") as f:
+                for block in response.iter_content(chunk_size=CHUNK_BYTES):
+                    f.write(block)
+                    digest.update(block)
+                    size += len(block)
+            expected = expected or {}
+            if "size" in expected and size != expected["size"]:
+                raise ChecksumError(f"got {size} bytes, expected {expected['size']}")
+            if "md5" in expected and digest.hexdigest() != expected["md5"]:
+                raise ChecksumError(f"MD5 {digest.hexdigest()} != {expected['md5']}")
+            os.replace(part_name, file_name)
+            record.bytes = size
+        finally:
+            if os.path.exists(part_name):
+                os.remove(part_name)
+    return True
+
+
+def download_many(jobs, state=None, workers=DEFAULT_WORKERS, session=None, manifest=None):
+    """
+    Download jobs, a list of (name, url, file_name) tuples, with a bounded
+    thread pool sharing one pooled session. Jobs already recorded in state
+    are skipped and every success is recorded as soon as it finishes.
+    Files are verified against manifest (see load_manifest), keyed by the
+    last path segment of the URL.
+    Returns a dict mapping each attempted name to True (file in place),
+    False (the server had no file) or None (the download failed).
+    """
+    session = session or make_session(workers)
+    manifest = manifest or {}
+    pending = [job for job in jobs if state is None or not state.is_done(job[0])]
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(download_to_file, session, url, file_name,
+                               manifest.get(url.rsplit("/", 1)[-1])): (name, url, file_name)
+                   for name, url, file_name in pending}
+        for future in as_completed(futures):
+            name, url, file_name = futures[future]
+            try:
+                ok = future.result()
+            except (requests.RequestException, ChecksumError) as e:
+                print(f"Error downloading {url}: {e}")
+                results[name] = None
+                continue
+            if ok:
+                if state is not None:
+                    state.mark_done(name)
+                print(f"Downloaded: {file_name}")
+            else:
+                print(f"File not found: {url}")
+            results[name] = ok
+    return results
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from pipeline.downloader import make_session
+
+WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+# Wikimedia asks API clients to identify themselves
+USER_AGENT = "GDELT-MicroService keyword enricher (https://github.com/TOYSOLDIER12/GDELT-MicroService)"
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 10.0               # requests per second across all workers
+DEFAULT_TTL = 30 * 24 * 3600      # aliases change rarely; refetch monthly
+REQUEST_TIMEOUT = 30
+
+# Hand-picked extras for a few companies
+ENHANCEMENTS = {
+    "Apple Inc.": ["iPhone", "MacBook", "Tim Cook"],
+    "Microsoft": ["Azure", "Xbox", "Satya Nadella"],
+    "Tesla, Inc.": ["Cybertruck", "Gigafactory", "Elon Musk"]
+}
+
+
+class ResponseCache:
+    """
+    On-disk cache of API responses, one JSON file per request, valid for
+    ttl seconds after it was fetched.
+    """
+
+    def __init__(self, directory, ttl=DEFAULT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("fetched", 0) > self.ttl:
+            return None
+        return entry.get("response")
+
+    def put(self, key, response):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "fetched": time.time(), "response": response}, f)
+        os.replace(tmp_path, path)
+
+
+class RateLimiter:
+    """Spaces calls to wait() at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate=DEFAULT_RATE):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class WikidataClient:
+    """
+    wbsearchentities lookups over one pooled session, rate limited and
+    answered from a ResponseCache when a fresh copy is on disk.
+    api_url can point at a local stand-in of the Wikidata API.
+    """
+
+    def __init__(self, api_url=WIKIDATA_API, cache=None, rate=DEFAULT_RATE, workers=DEFAULT_WORKERS):
+        self.api_url = api_url
+        self.cache = cache
+        self.limiter = RateLimiter(rate)
+        self.session = make_session(workers)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.requests_made = 0
+        self.cache_hits = 0
+
+    def search(self, company_name):
+        """The raw wbsearchentities response for company_name."""
+        key = f"wbsearchentities:en:{company_name}"
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+        self.limiter.wait()
+        self.requests_made += 1
+        params = {"action": "wbsearchentities", "search": company_name, "language": "en", "format": "json"}
+        response = self.session.get(self.api_url, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        if self.cache is not None:
+            self.cache.put(key, data)
+        return data
+
+    def aliases(self, company_name):
+        """Labels of the entities Wikidata finds for company_name ([] on error)."""
+        try:
+            data = self.search(company_name)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error fetching Wikidata aliases for {company_name}: {e}")
+            return []
+        aliases = []
+        for result in data.get("search", []):
+            label = result.get("display", {}).get("label")
+            # The API returns {"value": ..., "language": ...}; older responses a plain string
+            if isinstance(label, dict):
+                label = label.get("value")
+            if label:
+                aliases.append(label)
+        return aliases
+
+
+def parse_ticker_line(line):
+    """'Company Name: TICKER' -> (company, ticker), or None if malformed."""
+    parts = line.strip().split(':')
+    if len(parts) < 2 or not parts[0].strip() or not parts[1].strip():
+        return None
+    return parts[0].strip(), parts[1].strip()
+
+
+def expand_keywords(company, ticker, aliases):
+    """
+    Name variants, ticker, Wikidata aliases and hand-picked extras, without
+    duplicates and in that order. Returns the enriched line
+    "Company Name:Ticker:kw1:kw2:...".
+    """
+    keywords = [
+        company,
+        ticker,
+        company.replace(" ", ""),
+        company.split()[0],
+        company.lower(),
+        company.upper()
+    ]
+    keywords += aliases
+    keywords += ENHANCEMENTS.get(company, [])
+
+    seen = set()
+    unique_keywords = []
+    for kw in keywords:
+        kw = str(kw)
+        if kw and kw not in seen:
+            unique_keywords.append(kw)
+            seen.add(kw)
+    return f"{company}:{ticker}:" + ":".join(unique_keywords)
+
+
+def read_enriched_lines(file_path):
+    """{ticker: (company, line)} of an existing enriched keyword file."""
+    existing = {}
+    if not os.path.exists(file_path):
+        return existing
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split(':')
+            if len(parts) >= 2:
+                existing[parts[1].strip()] = (parts[0].strip(), line.rstrip("\n"))
+    return existing
+
+
+def enrich(companies, client, existing=None, workers=DEFAULT_WORKERS):
+    """
+    Enriched lines for companies, a list of (company, ticker), in order.
+    Tickers already in existing (see read_enriched_lines) under the same
+    company name are reused as they are; only the others are looked up,
+    workers at a time. Returns (lines, number of companies looked up).
+    """
+    existing = existing or {}
+    todo = [(company, ticker) for company, ticker in companies
+            if existing.get(ticker, (None,))[0] != company]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        aliases = dict(zip(todo, pool.map(lambda c: client.aliases(c[0]), todo)))
+
+    lines = []
+    for company, ticker in companies:
+        if (company, ticker) in aliases:
+            lines.append(expand_keywords(company, ticker, aliases[(company, ticker)]))
+        else:
+            lines.append(existing[ticker][1])
+    return lines, len(todo)
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import math
+import os
+import threading
+from datetime import datetime, timezone
+
+# The writer starts a new log (keeping one old generation) past this size
+MAX_LOG_BYTES = 16 << 20
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE = 1000
+
+
+def _json_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, 'item'):  # NumPy scalars
+        return value.item()
+    return value
+
+
+class EventLog:
+    """
+    Append-only JSON-lines file that carries weekly-aggregate updates from
+    the filter stage to the API process. Each upserted (ticker, week) is one
+    line; a reader (see EventTail) follows the file as it grows.
+    """
+
+    def __init__(self, path, max_bytes=MAX_LOG_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def publish(self, ticker, view_rows):
+        """Append one event per row of a WeeklyStore view (SQLDATE, AvgTone, Count, ...)."""
+        published = datetime.now(timezone.utc).isoformat()
+        lines = []
+        for row in view_rows.to_dict('records'):
+            event = {'ticker': ticker, 'week': row.pop('SQLDATE').strftime('%Y-%m-%d'), 'published': published}
+            row.pop('Ticker', None)
+            event.update({k: _json_value(v) for k, v in row.items()})
+            lines.append(json.dumps(event) + "\n")
+        if not lines:
+            return
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, f"{self.path}.1")
+            # One write per batch so a reader never sees half a batch of lines
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+
+
+class EventTail:
+    """
+    Follows an EventLog from its current end. read_new() returns the events
+    appended since the last call and notices when the writer started a new
+    file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._inode = None
+        self._position = 0
+        self._partial = b""
+        if os.path.exists(path):
+            stat = os.stat(path)
+            self._inode = stat.st_ino
+            self._position = stat.st_size
+
+    def read_new(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        events = []
+        if stat.st_ino != self._inode or stat.st_size < self._position:
+            # Rotated or recreated: finish the old generation, then read the new file from its start
+            rotated = f"{self.path}.1"
+            if self._inode is not None and os.path.exists(rotated) and os.stat(rotated).st_ino == self._inode:
+                events.extend(self._read(rotated))
+            self._inode = stat.st_ino
+            self._position = 0
+            self._partial = b""
+        if stat.st_size == self._position:
+            return events
+        events.extend(self._read(self.path))
+        return events
+
+    def _read(self, path):
+        with open(path, "rb") as f:
+            f.seek(self._position)
+            data = f.read()
+        self._position += len(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            if line.strip():
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    print(f"Skipping malformed event line in {self.path}")
+        return events
+
+
+class EventHub:
+    """
+    Fans events out to asyncio subscribers, each interested in a set of
+    tickers (or all of them). Slow subscribers lose their oldest events
+    rather than holding up the others.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._listeners = []
+
+    def subscribe(self, tickers=None):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        self._subscribers[queue] = set(tickers) if tickers else None
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.pop(queue, None)
+
+    def add_listener(self, callback):
+        """Call callback(events) with every batch read by follow(), before the subscribers get them."""
+        self._listeners.append(callback)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event):
+        for queue, tickers in list(self._subscribers.items()):
+            if tickers is not None and event.get('ticker') not in tickers:
+                continue
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def follow(self, tail, poll_seconds):
+        """Publish everything appended to tail's log, checking every poll_seconds (runs until cancelled)."""
+        while True:
+            events = tail.read_new()
+            for listener in self._listeners if events else ():
+                try:
+                    listener(events)
+                except Exception as e:
+                    print(f"Event listener failed: {e}")
+            for event in events:
+                self.publish(event)
+            await asyncio.sleep(poll_seconds)
@@ -0,0 +1,111 @@
+import gzip
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:  # br is only offered when the brotli package is installed
+    brotli = None
+
+# Below this size the headers cost more than compression saves
+MIN_COMPRESS_BYTES = 1024
+# Compressed bodies kept in memory, keyed by file and version
+COMPRESSED_ENTRIES = 64
+
+
+def file_validators(stat):
+    """Strong ETag and Last-Modified value for a file, from its size and mtime."""
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    return etag, formatdate(stat.st_mtime, usegmt=True)
+
+
+def variant_etag(etag, encoding):
+    """ETag of the encoded representation: "abc" -> "abc-gzip"."""
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def _strip_variant(tag):
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for encoding in ("gzip", "br"):
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def is_not_modified(headers, etag, mtime):
+    """
+    True if a conditional GET can be answered with 304: If-None-Match lists
+    etag (in any encoding, or '*'), or, without If-None-Match,
+    If-Modified-Since is not older than mtime (seconds).
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [_strip_variant(t) for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have whole-second resolution
+    return int(mtime) <= since
+
+
+def choose_encoding(accept_encoding):
+    """Pick 'br' (if available) or 'gzip' from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class CompressedFiles:
+    """
+    LRU of compressed file bodies keyed by (path, etag, encoding), so a file is
+    compressed once per version no matter how often it is polled.
+    """
+
+    def __init__(self, max_entries=COMPRESSED_ENTRIES):
+        self.max_entries = max_entries
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, etag, encoding):
+        key = (path, etag, encoding)
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+                return body
+        with open(path, "rb") as f:
+            raw = f.read()
+        body = brotli.compress(raw) if encoding == "br" else gzip.compress(raw, compresslevel=6)
+        with self._lock:
+            self._bodies[key] = body
+            # Older versions of the same file are never asked for again
+            for stale in [k for k in self._bodies if k[0] == path and k[1] != etag]:
+                del self._bodies[stale]
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+        return body
@@ -0,0 +1,33 @@
+import os
+
+
+def load_enriched_keywords(file_path):
+    """
+    Load enriched keywords from file.
+    Each line: CompanyName:TICKER:keyword1:keyword2:...:keywordN
+    Returns a dictionary mapping ticker to a dict with 'company' and 'keywords'.
+    """
+    enriched = {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split(':')
+            if len(parts) >= 2:
+                company = parts[0].strip()
+                ticker = parts[1].strip()
+                keywords = [p.strip() for p in parts[2:] if p.strip()]
+                enriched[ticker] = {'company': company, 'keywords': keywords}
+    return enriched
+
+
+def select_keywords_file(enriched_file, pruned_file):
+    """
+    The keyword file the filters should use: pruned_file (written by
+    prune_keywords.py) when it exists and is at least as new as
+    enriched_file, otherwise enriched_file itself.
+    """
+    if not os.path.exists(pruned_file):
+        return enriched_file
+    if os.path.exists(enriched_file) and os.path.getmtime(pruned_file) < os.path.getmtime(enriched_file):
+        print(f"Ignoring {pruned_file}: older than {enriched_file}, run prune_keywords.py again")
+        return enriched_file
+    return pruned_file
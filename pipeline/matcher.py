@@ -0,0 +1,168 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from pipeline.metrics import METRICS
+
+# Free-text columns of a GDELT export that can mention a company
+TEXT_COLUMNS = [
+    'Actor1Name', 'Actor2Name', 'SOURCEURL',
+    'Actor1Geo_FullName', 'Actor2Geo_FullName', 'ActionGeo_FullName'
+]
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over every enriched keyword of every ticker.
+
+    The automaton is built once from the output of load_enriched_keywords and
+    scans a text a single time, returning all tickers whose keywords occur in
+    it. Matching is case-insensitive substring matching, i.e. the same rule as
+    `kw.lower() in text.lower()` in the original per-ticker loops.
+
+    With a NameIndex (see pipeline.name_index), column values are looked up
+    there first, so a name seen in an earlier chunk, file or run is not
+    scanned again.
+    """
+
+    def __init__(self, enriched, name_index=None):
+        # Accepts both {ticker: {'company', 'keywords'}} and {ticker: [keywords]}
+        self.tickers = list(enriched.keys())
+        self.name_index = name_index
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [frozenset()]
+
+        for idx, ticker in enumerate(self.tickers):
+            info = enriched[ticker]
+            keywords = info['keywords'] if isinstance(info, dict) else info
+            for kw in keywords:
+                kw = kw.lower()
+                if kw:
+                    self._add(kw, idx)
+        self._build_failure_links()
+
+    def _add(self, keyword, ticker_idx):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(frozenset())
+            state = nxt
+        self._out[state] = self._out[state] | {ticker_idx}
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                # A state also emits every keyword that ends at its failure state
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def match(self, text):
+        """Return a tuple of every ticker with a keyword in text, in keyword-file order."""
+        return tuple(self.tickers[i] for i in self.match_indices(text))
+
+    def match_indices(self, text):
+        """Like match, but returns the sorted positions of the tickers in self.tickers."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = set()
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return sorted(found)
+
+    def _value_indices(self, value):
+        if self.name_index is None:
+            return self.match_indices(value)
+        return self.name_index.get(value, self.match_indices)
+
+    def _column_pairs(self, df, text_columns):
+        """
+        Match every text column and return two aligned arrays (row position,
+        ticker position), sorted and without duplicates. Each column is
+        factorized so a distinct value is scanned once; the fan-out back to
+        rows is done with NumPy on the code arrays.
+        """
+        n_tickers = max(len(self.tickers), 1)
+        keys = []
+        for col in text_columns:
+            codes, uniques = pd.factorize(df[col])
+            value_idx, ticker_idx = [], []
+            for code, value in enumerate(uniques):
+                for i in self._value_indices(str(value)):
+                    value_idx.append(code)
+                    ticker_idx.append(i)
+            if not value_idx:
+                continue
+            value_idx = np.asarray(value_idx, dtype=np.int64)
+            ticker_idx = np.asarray(ticker_idx, dtype=np.int64)
+
+            # value_idx is already sorted, so the matches of value c live in
+            # ticker_idx[starts[c]:starts[c] + counts[c]]
+            counts = np.bincount(value_idx, minlength=len(uniques))
+            starts = np.cumsum(counts) - counts
+            row_counts = np.where(codes >= 0, counts[codes], 0)
+            rows = np.repeat(np.arange(len(codes)), row_counts)
+            within = np.arange(len(rows)) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+            matched = ticker_idx[starts[codes[rows]] + within]
+            keys.append(rows * n_tickers + matched)
+
+        if not keys:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty
+        # Each column's keys are already sorted and unique, so a stable sort
+        # (a merge of sorted runs) plus dropping repeats is cheaper than np.unique
+        keys = np.sort(np.concatenate(keys), kind='stable')
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        return keys // n_tickers, keys % n_tickers
+
+    def first_match(self, df, text_columns=TEXT_COLUMNS):
+        """
+        For each row, return the first ticker (in keyword-file order) whose
+        keywords appear in any of text_columns, or None.
+        Returns a Series aligned with df.
+        """
+        with METRICS.stage('match') as record:
+            rows, ticker_idx = self._column_pairs(df, text_columns)
+            rows, first = np.unique(rows, return_index=True)
+            result = np.full(len(df), None, dtype=object)
+            result[rows] = np.asarray(self.tickers, dtype=object)[ticker_idx[first]]
+            record.rows_in, record.rows_out = len(df), len(rows)
+            self._count_matches(ticker_idx[first])
+        return pd.Series(result, index=df.index, name='Ticker')
+
+    def all_matches(self, df, text_columns=TEXT_COLUMNS, columns=None):
+        """
+        Return one row per (event, ticker) pair for every ticker whose keywords
+        appear in any of text_columns, with the ticker in a 'Ticker' column.
+        If columns is given, only those columns are kept.
+        """
+        with METRICS.stage('match') as record:
+            rows, ticker_idx = self._column_pairs(df, text_columns)
+            result = df if columns is None else df[list(columns)]
+            result = result.iloc[rows].copy()
+            result['Ticker'] = np.asarray(self.tickers, dtype=object)[ticker_idx]
+            record.rows_in, record.rows_out = len(df), len(result)
+            self._count_matches(ticker_idx)
+        return result
+
+    def _count_matches(self, ticker_idx):
+        counts = np.bincount(ticker_idx, minlength=len(self.tickers))
+        matched = np.flatnonzero(counts)
+        METRICS.count_matches([self.tickers[i] for i in matched], counts[matched])
+
@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Prefix of every exported metric name
+NAMESPACE = "gdelt"
+
+HELP = {
+    'stage_seconds': "Time spent in a pipeline stage",
+    'stage_seconds_max': "Longest single call of a pipeline stage",
+    'stage_rows_in_total': "Rows handed to a pipeline stage",
+    'stage_rows_out_total': "Rows produced by a pipeline stage",
+    'stage_bytes_total': "Bytes read or written by a pipeline stage",
+    'rows_rejected_total': "Export lines skipped for having the wrong number of fields",
+    'matches_total': "(event, ticker) matches per ticker",
+    'run_started_timestamp_seconds': "Start of the last run of a job",
+    'run_duration_seconds': "Wall time of the last run of a job",
+    'api_requests_total': "API requests by route and status",
+    'api_request_seconds': "API request latency by route",
+    'api_request_seconds_max': "Slowest API request by route",
+    'api_catalog_files': "Weekly output files the API serves",
+    'api_event_subscribers': "Open /events and /ws connections",
+    'daemon_queue_depth': "Downloaded files waiting for the filter",
+}
+
+
+class StageRecord:
+    """What a stage() block reports besides its duration; set the counts inside the block."""
+    __slots__ = ('rows_in', 'rows_out', 'bytes')
+
+    def __init__(self):
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes = None
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """
+    In-process registry of counters, gauges and duration summaries, each
+    keyed by name and labels. Thread-safe. A snapshot() is plain data, so
+    it can be returned from worker processes, merge()d into the parent, or
+    saved as JSON for the API's /metrics endpoint to serve (see
+    render_prometheus).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._summaries = {}  # (name, labels) -> [count, sum, max]
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            key = (name, _key(labels))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            summary = self._summaries.setdefault((name, _key(labels)), [0, 0.0, 0.0])
+            summary[0] += 1
+            summary[1] += seconds
+            summary[2] = max(summary[2], seconds)
+
+    @contextmanager
+    def stage(self, stage, **labels):
+        """
+        Time the block as one call of stage; rows_in, rows_out and bytes set
+        on the yielded StageRecord are counted as well.
+        """
+        record = StageRecord()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage, **labels)
+            for field in StageRecord.__slots__:
+                value = getattr(record, field)
+                if value:
+                    self.inc(f'stage_{field}_total', value, stage=stage, **labels)
+
+    def count_matches(self, tickers, counts):
+        """Add per-ticker match counts, given as two aligned sequences."""
+        with self._lock:
+            for ticker, count in zip(tickers, counts):
+                if count:
+                    key = ('matches_total', (('ticker', ticker),))
+                    self._counters[key] = self._counters.get(key, 0) + int(count)
+
+    def _snapshot(self):
+        return {
+            'counters': [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+            'gauges': [[name, dict(labels), value] for (name, labels), value in self._gauges.items()],
+            'summaries': [[name, dict(labels)] + list(s) for (name, labels), s in self._summaries.items()],
+        }
+
+    def _reset(self):
+        self._counters.clear()
+        self._gauges.clear()
+        self._summaries.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def drain(self):
+        """snapshot() and reset() in one step, for handing deltas from a worker to its parent."""
+        with self._lock:
+            snapshot = self._snapshot()
+            self._reset()
+        return snapshot
+
+    def merge(self, snapshot):
+        for name, labels, value in snapshot['counters']:
+            self.inc(name, value, **labels)
+        for name, labels, value in snapshot['gauges']:
+            self.set(name, value, **labels)
+        with self._lock:
+            for name, labels, count, total, longest in snapshot['summaries']:
+                summary = self._summaries.setdefault((name, _key(labels)), [0, 0.0, 0.0])
+                summary[0] += count
+                summary[1] += total
+                summary[2] = max(summary[2], longest)
+
+    def summary(self):
+        """Per-stage table (calls, seconds, rows in/out, MB) for the end of a script run."""
+        snapshot = self.snapshot()
+        totals = {}
+        for name, labels, count, total, _ in snapshot['summaries']:
+            if name == 'stage_seconds':
+                totals.setdefault(labels['stage'], {})['calls'] = count
+                totals[labels['stage']]['seconds'] = total
+        for name, labels, value in snapshot['counters']:
+            if name.startswith('stage_') and 'stage' in labels:
+                field = name[len('stage_'):-len('_total')]
+                totals.setdefault(labels['stage'], {})[field] = totals[labels['stage']].get(field, 0) + value
+        lines = [f"{'stage':<10} {'calls':>7} {'seconds':>9} {'rows in':>11} {'rows out':>11} {'MB':>9}"]
+        for stage, t in sorted(totals.items(), key=lambda item: -item[1].get('seconds', 0)):
+            lines.append(f"{stage:<10} {t.get('calls', 0):7d} {t.get('seconds', 0):9.2f} "
+                         f"{t.get('rows_in', 0):11d} {t.get('rows_out', 0):11d} {t.get('bytes', 0) / 1e6:9.1f}")
+        return "\n".join(lines)
+
+
+# The process-wide registry the pipeline modules record into
+METRICS = Metrics()
+
+
+def timed_chunks(chunks, stage, metrics=METRICS):
+    """Iterate chunks, timing the production of each one as a call of stage (rows_out = its length)."""
+    chunks = iter(chunks)
+    while True:
+        with metrics.stage(stage) as record:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                record.rows_out = len(chunk)
+        if chunk is None:
+            return
+        yield chunk
+
+
+@contextmanager
+def run_metrics(job, metrics_directory, metrics=METRICS):
+    """
+    Record the run of a script as job: start time and wall time, a stage
+    summary printed at the end, and a snapshot saved as
+    {metrics_directory}/{job}.json for the API's /metrics endpoint.
+    """
+    started = time.time()
+    try:
+        yield metrics
+    finally:
+        metrics.set('run_started_timestamp_seconds', started)
+        metrics.set('run_duration_seconds', time.time() - started)
+        print(metrics.summary())
+        save_snapshot(metrics.snapshot(), os.path.join(metrics_directory, f"{job}.json"))
+
+
+def save_snapshot(snapshot, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({'saved': datetime.now().isoformat(), 'metrics': snapshot}, f)
+    os.replace(tmp_path, path)
+
+
+def load_snapshots(metrics_directory):
+    """{job: snapshot} of every run snapshot saved in metrics_directory."""
+    snapshots = {}
+    if not os.path.isdir(metrics_directory):
+        return snapshots
+    for name in sorted(os.listdir(metrics_directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(metrics_directory, name), "r") as f:
+                snapshots[name[:-len(".json")]] = json.load(f)['metrics']
+        except (OSError, ValueError, KeyError):
+            print(f"Skipping unreadable metrics snapshot {name}")
+    return snapshots
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def render_prometheus(sources):
+    """
+    Prometheus text exposition of several snapshots, given as a list of
+    (snapshot, extra labels) pairs, e.g. ({...}, {'job': 'filter_v3'}).
+    Samples of one metric family are grouped under a single HELP/TYPE.
+    """
+    families = {}
+
+    def add(name, kind, labels, value):
+        families.setdefault(name, (kind, []))[1].append((labels, value))
+
+    for snapshot, extra in sources:
+        for name, labels, value in snapshot['counters']:
+            add(name, 'counter', {**extra, **labels}, value)
+        for name, labels, value in snapshot['gauges']:
+            add(name, 'gauge', {**extra, **labels}, value)
+        for name, labels, count, total, longest in snapshot['summaries']:
+            labels = {**extra, **labels}
+            add(name, 'summary', labels, (count, total))
+            add(f"{name}_max", 'gauge', labels, longest)
+
+    lines = []
+    for name in sorted(families):
+        kind, samples = families[name]
+        full = f"{NAMESPACE}_{name}"
+        lines.append(f"# HELP {full} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {full} {kind}")
+        for labels, value in samples:
+            if kind == 'summary':
+                lines.append(f"{full}_count{_format_labels(labels)} {value[0]}")
+                lines.append(f"{full}_sum{_format_labels(labels)} {value[1]:.6f}")
+            else:
+                lines.append(f"{full}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
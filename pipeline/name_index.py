@@ -0,0 +1,94 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+# Distinct actor names kept in memory (and on disk); least recently used ones are dropped first
+DEFAULT_MAX_NAMES = 500_000
+
+
+def keywords_fingerprint(file_path):
+    """SHA-256 of the keyword file; a saved index is only valid for the same fingerprint."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def normalize_name(name):
+    return name.strip().lower()
+
+
+class NameIndex:
+    """
+    LRU-bounded map from a normalized actor name to the positions of the
+    tickers it matches (see KeywordMatcher.match_indices), so each distinct
+    name is run through the matcher once instead of once per chunk or file.
+
+    The index is tied to a keyword-file fingerprint: load() starts empty
+    when enriched_keywords.txt has changed since the index was saved.
+    """
+
+    def __init__(self, fingerprint, max_size=DEFAULT_MAX_NAMES):
+        self.fingerprint = fingerprint
+        self.max_size = max_size
+        self._names = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._names)
+
+    def get(self, name, compute):
+        """Return the cached ticker positions of name, calling compute(name) on a miss."""
+        key = normalize_name(name)
+        found = self._names.get(key)
+        if found is not None:
+            self._names.move_to_end(key)
+            self.hits += 1
+            return found
+        self.misses += 1
+        found = tuple(compute(key))
+        self._names[key] = found
+        if len(self._names) > self.max_size:
+            self._names.popitem(last=False)
+            self.evictions += 1
+        return found
+
+    def stats(self):
+        """Hit/miss counters since the index was created or loaded."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'size': len(self._names),
+        }
+
+    def save(self, file_path):
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({'fingerprint': self.fingerprint, 'names': list(self._names.items())}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path, fingerprint, max_size=DEFAULT_MAX_NAMES):
+        """Load a saved index, or return an empty one if it is missing or was built for other keywords."""
+        index = cls(fingerprint, max_size)
+        if not os.path.exists(file_path):
+            return index
+        try:
+            with open(file_path, "rb") as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Ignoring unreadable name index {file_path}: {e}")
+            return index
+        if saved.get('fingerprint') != fingerprint:
+            print("Keyword file changed; starting a new name index")
+            return index
+        # Most recently used names come last, so the oldest are dropped if max_size shrank
+        index._names = OrderedDict(saved['names'][-max_size:])
+        return index
@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import requests
+
+from pipeline.downloader import (DEFAULT_WORKERS, ChecksumError, download_to_file, gdelt_file_job, load_manifest,
+                                 make_session)
+from pipeline.matcher import KeywordMatcher
+from pipeline.metrics import METRICS
+from pipeline.parallel import aggregate_file, collect, start_pool, submit_file
+from pipeline.state import DOWNLOADED, FAILED, MISSING, PROCESSED
+from pipeline.weekly import COLUMNS_TO_KEEP
+
+# Daily v1 exports appear once a day; polling more often only finds the newest one sooner
+POLL_SECONDS = 15 * 60
+# How long the filter thread waits for new work before checking for shutdown
+IDLE_SECONDS = 0.5
+
+
+def day_range(first_day, last_day):
+    """YYYYMMDD strings from first_day through last_day (both YYYYMMDD)."""
+    day = datetime.strptime(first_day, "%Y%m%d")
+    end = datetime.strptime(last_day, "%Y%m%d")
+    while day <= end:
+        yield day.strftime("%Y%m%d")
+        day += timedelta(days=1)
+
+
+def contiguous_through(statuses, first_day, last_day, done):
+    """The last day d such that every day from first_day to d has a status in done (None if first_day hasn't)."""
+    through = None
+    for day in day_range(first_day, last_day):
+        if statuses.get(day) not in done:
+            break
+        through = day
+    return through
+
+
+class PipelineDaemon:
+    """
+    Downloads GDELT daily exports and folds each one into the weekly store
+    as soon as it is on disk.
+
+    Every poll lists the days from first_day to today that the PipelineState
+    has not seen downloaded yet, and fetches them download_workers at a
+    time. A finished download goes straight onto an in-memory queue; a
+    filter thread takes files off it, matches and aggregates them (in
+    `workers` processes when workers > 1) and upserts each file's partial
+    aggregates. The state records every step, so a restart only re-queues
+    the files that were downloaded but not yet processed; the exports
+    directory is never listed.
+
+    A file is marked processed right after its upsert, so a crash between
+    the two can count that one file twice; the window is a single upsert.
+
+    checkpoint() is called from the filter thread whenever it runs out of
+    work after processing something, and once more at shutdown: the place
+    to save the name index, metrics and progress files. columns are the
+    export columns kept for aggregation (see pipeline.weekly.aggregation_columns).
+    """
+
+    def __init__(self, state, base_url, download_folder, enriched, store, first_day,
+                 workers=1, download_workers=DEFAULT_WORKERS, name_index=None, checkpoint=None,
+                 columns=COLUMNS_TO_KEEP):
+        self.state = state
+        self.base_url = base_url
+        self.download_folder = download_folder
+        self.enriched = enriched
+        self.store = store
+        self.first_day = first_day
+        self.workers = workers
+        self.download_workers = download_workers
+        self.name_index = name_index
+        self.checkpoint = checkpoint
+        self.columns = columns
+        self.queue = queue.Queue()
+        self.stopping = threading.Event()
+        self._filter_thread = None
+        os.makedirs(download_folder, exist_ok=True)
+
+    # ---------- Download side ----------
+    def plan(self, today=None):
+        """Days not yet downloaded (or processed), oldest first."""
+        today = today or datetime.now().strftime("%Y%m%d")
+        statuses = self.state.statuses()
+        return [day for day in day_range(self.first_day, today) if statuses.get(day) not in (DOWNLOADED, PROCESSED)]
+
+    def poll(self, session):
+        """Fetch every planned day; each file is queued for filtering as soon as it is complete."""
+        days = self.plan()
+        if not days:
+            return 0
+        manifest = load_manifest(session, self.base_url)
+        with ThreadPoolExecutor(max_workers=self.download_workers) as pool:
+            results = list(pool.map(lambda day: self._download(session, day, manifest), days))
+        downloaded = sum(results)
+        print(f"Poll: {len(days)} days planned, {downloaded} downloaded")
+        return downloaded
+
+    def _download(self, session, day, manifest):
+        _, url, file_name = gdelt_file_job(self.base_url, datetime.strptime(day, "%Y%m%d"), self.download_folder)
+        if self.stopping.is_set():
+            return False
+        try:
+            found = download_to_file(session, url, file_name, manifest.get(url.rsplit("/", 1)[-1]))
+        except (requests.RequestException, ChecksumError) as e:
+            print(f"Error downloading {url}: {e}")
+            self.state.mark(day, FAILED, error=str(e))
+            return False
+        if not found:
+            self.state.mark(day, MISSING)
+            return False
+        self.state.mark(day, DOWNLOADED, file_name)
+        self.queue.put((day, file_name))
+        return True
+
+    # ---------- Filter side ----------
+    def start(self):
+        """Re-queue files a previous run downloaded but did not process, and start the filter thread."""
+        for day, file_name in self.state.with_status(DOWNLOADED):
+            self.queue.put((day, file_name))
+        self._filter_thread = threading.Thread(target=self._filter_loop, name="filter", daemon=True)
+        self._filter_thread.start()
+
+    def stop(self):
+        """Finish the queued files, then stop the filter thread."""
+        self.queue.put(None)
+        if self._filter_thread is not None:
+            self._filter_thread.join()
+
+    def _filter_loop(self):
+        if self.workers > 1:
+            pool = start_pool(self.enriched, self.workers, name_index=self.name_index, columns=self.columns)
+            submit = lambda path: submit_file(pool, path)
+            result = collect
+        else:
+            # One thread with one matcher; the same future-based loop as the process pool
+            pool = ThreadPoolExecutor(max_workers=1)
+            matcher = KeywordMatcher(self.enriched, self.name_index)
+            submit = lambda path: pool.submit(aggregate_file, path, matcher, columns=self.columns)
+            result = lambda future: future.result()
+
+        in_flight = {}
+        draining = False
+        dirty = False
+        with pool:
+            while not draining or in_flight:
+                while not draining and len(in_flight) < self.workers:
+                    try:
+                        item = self.queue.get(timeout=IDLE_SECONDS if not in_flight else 0)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        draining = True
+                        break
+                    in_flight[submit(item[1])] = item
+                if not in_flight:
+                    continue
+                done, _ = wait(in_flight, timeout=IDLE_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._commit(*in_flight.pop(future), future, result)
+                    dirty = True
+                METRICS.set('daemon_queue_depth', self.queue.qsize())
+                if dirty and not in_flight and self.queue.empty():
+                    self._checkpoint()
+                    dirty = False
+        self._checkpoint()
+
+    def _checkpoint(self):
+        if self.checkpoint is not None:
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"Checkpoint failed: {e}")
+
+    def _commit(self, day, file_name, future, result):
+        try:
+            partials = result(future)
+            if not partials.empty:
+                tickers = self.store.upsert(partials)
+                print(f"Processed {os.path.basename(file_name)}: updated {len(tickers)} tickers")
+            self.state.mark(day, PROCESSED)
+        except Exception as e:
+            print(f"Error processing {file_name}: {e}")
+            self.state.mark(day, FAILED, error=str(e))
+
+    # ---------- Main loop ----------
+    def run(self, poll_seconds=POLL_SECONDS, once=False):
+        """Poll every poll_seconds until stopping is set (or a single time), then drain the queue."""
+        self.start()
+        try:
+            with make_session(self.download_workers) as session:
+                while not self.stopping.is_set():
+                    self.poll(session)
+                    if once:
+                        break
+                    self.stopping.wait(poll_seconds)
+        finally:
+            self.stop()
@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from pipeline.cache import EventCache
+from pipeline.matcher import KeywordMatcher
+from pipeline.metrics import METRICS
+from pipeline.weekly import COLUMNS_TO_KEEP, combine_partials, match_export, partial_aggregates
+
+# Set in each worker process by _init_worker, so the automaton is built once per worker
+_matcher = None
+_cache = None
+_columns = COLUMNS_TO_KEEP
+
+
+def _init_worker(enriched, cache_directory=None, name_index=None, columns=COLUMNS_TO_KEEP):
+    global _matcher, _cache, _columns
+    # A forked worker starts with a copy of the parent's metrics; only its own work is reported back
+    METRICS.reset()
+    _matcher = KeywordMatcher(enriched, name_index)
+    _cache = EventCache(cache_directory) if cache_directory else None
+    _columns = columns
+
+
+def aggregate_file(file_path, matcher=None, cache=None, columns=None):
+    """
+    Match one export and reduce it to partial (Ticker, Week) aggregates.
+    This is what a worker sends back to the parent: a few hundred rows per
+    file instead of the matched events. columns are the export columns kept
+    for aggregation (see pipeline.weekly.aggregation_columns).
+    """
+    matcher = matcher or _matcher
+    cache = cache or _cache
+    columns = columns or _columns
+    partials = [partial_aggregates(pairs) for pairs in match_export(file_path, matcher, columns, cache)
+                if not pairs.empty]
+    if not partials:
+        return pd.DataFrame()
+    return combine_partials(pd.concat(partials, ignore_index=True))
+
+
+def _aggregate_in_worker(file_path):
+    """aggregate_file plus the metrics the worker recorded for it."""
+    try:
+        return aggregate_file(file_path), METRICS.drain()
+    except Exception:
+        METRICS.reset()
+        raise
+
+
+def start_pool(enriched, workers=None, cache_directory=None, name_index=None, columns=COLUMNS_TO_KEEP):
+    """A ProcessPoolExecutor whose workers each build their matcher (and cache) once."""
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                               initargs=(enriched, cache_directory, name_index, columns))
+
+
+def submit_file(pool, file_path):
+    """Aggregate file_path in a start_pool() worker; pass the future to collect()."""
+    return pool.submit(_aggregate_in_worker, file_path)
+
+
+def collect(future):
+    """The partials of a submit_file() future, merging the worker's metrics into this process."""
+    partials, metrics = future.result()
+    METRICS.merge(metrics)
+    return partials
+
+
+def aggregate_files(file_paths, enriched, workers=None, cache_directory=None, name_index=None,
+                    columns=COLUMNS_TO_KEEP):
+    """
+    Fan the exports out to a ProcessPoolExecutor and yield (file_path, partials,
+    error) as each one finishes, in completion order. error is None on success.
+    With cache_directory, workers read the exports from that EventCache.
+    A name_index is copied into every worker as its starting NameIndex;
+    names the workers add are not sent back. The workers' stage metrics are
+    merged into this process's METRICS.
+    """
+    with start_pool(enriched, workers, cache_directory, name_index, columns) as pool:
+        futures = {submit_file(pool, path): path for path in file_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                partials = collect(future)
+            except Exception as e:
+                yield path, None, e
+                continue
+            yield path, partials, None
+
+
+def contiguous_prefix(file_paths, finished):
+    """
+    Return the leading files of file_paths (in order) that are all in finished.
+    Only these may be committed: anything after a gap is redone next run.
+    """
+    prefix = []
+    for path in file_paths:
+        if path not in finished:
+            break
+        prefix.append(path)
+    return prefix
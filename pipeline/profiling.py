@@ -0,0 +1,60 @@
+import cProfile
+import io
+import os
+import pstats
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import pyinstrument
+except ImportError:  # optional; only needed for --profile pyinstrument
+    pyinstrument = None
+
+# Scripts without command-line flags take the profiler from here ("cprofile" or "pyinstrument")
+PROFILE_ENV = "GDELT_PROFILE"
+PROFILERS = ("cprofile", "pyinstrument")
+TOP_FUNCTIONS = 25
+
+
+@contextmanager
+def profiled(job, mode=None, profile_directory="profiles"):
+    """
+    Profile the block when mode (or $GDELT_PROFILE) names a profiler; a no-op
+    otherwise. cProfile stats are saved as {job}-{timestamp}.prof (open with
+    pstats or snakeviz) and the top functions printed; pyinstrument writes an
+    HTML call tree next to it.
+    """
+    mode = mode or os.environ.get(PROFILE_ENV)
+    if not mode:
+        yield
+        return
+    if mode not in PROFILERS:
+        raise ValueError(f"Unknown profiler {mode!r}, expected one of {', '.join(PROFILERS)}")
+    if mode == "pyinstrument" and pyinstrument is None:
+        raise ImportError("--profile pyinstrument requires the pyinstrument package")
+
+    os.makedirs(profile_directory, exist_ok=True)
+    stem = os.path.join(profile_directory, f"{job}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{stem}.prof")
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            print(out.getvalue())
+            print(f"Profile saved to {stem}.prof")
+    else:
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(f"{stem}.html", "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            print(profiler.output_text(unicode=True))
+            print(f"Profile saved to {stem}.html")
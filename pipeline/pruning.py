@@ -0,0 +1,136 @@
+import os
+
+import pandas as pd
+
+from pipeline.matcher import KeywordMatcher
+from pipeline.name_index import normalize_name
+from pipeline.reader import read_export_chunks
+from pipeline.weekly import ACTOR_COLUMNS
+
+# Keywords shorter than this match inside unrelated names ("A.", "3m")
+MIN_LENGTH = 3
+# Keywords matching more than this share of all sampled actor names are too generic
+MAX_SHARE = 0.001
+# Keywords listed under more tickers than this cannot tell the companies apart
+MAX_TICKERS = 2
+# Keywords with fewer sampled hits than this are dropped as unseen (0 keeps them all)
+MIN_HITS = 0
+# The same for multi-word aliases: Wikidata lists rare ones ("Faculty of Mechanical Engineering",
+# "ditrigonal pyramidal") that never name the company in the news
+MIN_ALIAS_HITS = 1
+
+REPORT_COLUMNS = ['Ticker', 'Keyword', 'Hits', 'Share', 'Tickers', 'Action', 'Reason']
+
+
+def sample_name_counts(file_paths, columns=ACTOR_COLUMNS):
+    """
+    Count the actor names of the sampled exports: a Series of mentions per
+    normalized name, and the total number of (non-empty) mentions.
+    """
+    counts = []
+    for file_path in file_paths:
+        for df in read_export_chunks(file_path, columns):
+            for col in columns:
+                names = df[col].dropna().astype(str).map(normalize_name)
+                counts.append(names[names != ''].value_counts())
+    if not counts:
+        return pd.Series(dtype='int64'), 0
+    counts = pd.concat(counts).groupby(level=0).sum()
+    return counts, int(counts.sum())
+
+
+def keyword_hits(keywords, name_counts):
+    """Mentions in name_counts containing each keyword (case-insensitive), as {keyword: hits}."""
+    keywords = list(keywords)
+    # One automaton entry per keyword, so a single pass over each name scores them all
+    matcher = KeywordMatcher({i: [kw] for i, kw in enumerate(keywords)})
+    hits = [0] * len(keywords)
+    for name, count in name_counts.items():
+        for i in matcher.match_indices(name):
+            hits[i] += int(count)
+    return dict(zip(keywords, hits))
+
+
+def matched_mentions(enriched, name_counts):
+    """Sampled actor-name mentions the keyword set matches, and (mention, ticker) pairs it produces."""
+    matcher = KeywordMatcher(enriched)
+    mentions = pairs = 0
+    for name, count in name_counts.items():
+        found = len(matcher.match_indices(name))
+        if found:
+            mentions += int(count)
+            pairs += int(count) * found
+    return mentions, pairs
+
+
+def prune_keywords(enriched, name_counts, total, min_length=MIN_LENGTH, max_share=MAX_SHARE,
+                   max_tickers=MAX_TICKERS, min_hits=MIN_HITS, min_alias_hits=MIN_ALIAS_HITS):
+    """
+    Score every keyword of enriched (see load_enriched_keywords) against the
+    sampled name counts and drop the ones that are too short, too frequent,
+    shared by too many tickers or seen fewer than min_hits times
+    (min_alias_hits for multi-word aliases). The company name itself is only
+    flagged, as are the unseen keywords that are kept.
+    Case-insensitive duplicates, and keywords containing another kept keyword
+    of the same ticker (they cannot add a match), are dropped as well.
+    Returns the pruned {ticker: {'company', 'keywords'}} and a report
+    DataFrame with one row per keyword.
+    """
+    owners = {}
+    for ticker, info in enriched.items():
+        for kw in {kw.lower() for kw in info['keywords']}:
+            owners.setdefault(kw, set()).add(ticker)
+    hits = keyword_hits(owners, name_counts)
+
+    pruned, report = {}, []
+    for ticker, info in enriched.items():
+        company = info['company'].lower()
+        kept, seen = [], set()
+        for kw in info['keywords']:
+            key = kw.lower()
+            share = hits[key] / total if total else 0.0
+            row = [ticker, kw, hits[key], share, len(owners[key])]
+            if key in seen:
+                report.append(row + ['drop', 'duplicate'])
+                continue
+            seen.add(key)
+            if len(key.strip()) < min_length:
+                reason = 'too short'
+            elif len(owners[key]) > max_tickers:
+                reason = 'ambiguous'
+            elif share > max_share:
+                reason = 'too frequent'
+            elif hits[key] < (min_alias_hits if ' ' in key.strip() else min_hits):
+                reason = 'unseen'
+            else:
+                reason = None
+            if reason is not None and key != company:
+                report.append(row + ['drop', reason])
+                continue
+            if reason is None and hits[key] == 0:
+                reason = 'unseen'
+            kept.append((kw, row + ['flag' if reason else 'keep', reason or '']))
+
+        # Within one ticker, a keyword containing another kept keyword only repeats its matches
+        keys = [kw.lower() for kw, _ in kept]
+        keywords = []
+        for kw, row in kept:
+            key = kw.lower()
+            if any(other != key and other in key for other in keys):
+                row[-2:] = ['drop', 'redundant']
+            else:
+                keywords.append(kw)
+            report.append(row)
+        pruned[ticker] = {'company': info['company'], 'keywords': keywords}
+
+    report = pd.DataFrame(report, columns=REPORT_COLUMNS)
+    return pruned, report.sort_values(['Action', 'Hits'], ascending=[True, False], kind='stable')
+
+
+def write_keywords(enriched, file_path):
+    """Write enriched in the keyword file format (Company:TICKER:kw1:kw2:...), atomically."""
+    tmp_file = f"{file_path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for ticker, info in enriched.items():
+            f.write(":".join([info['company'], ticker] + info['keywords']) + "\n")
+    os.replace(tmp_file, file_path)
@@ -0,0 +1,210 @@
+import io
+import itertools
+import os
+import zipfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+from pipeline.metrics import METRICS, timed_chunks
+from pipeline.schema import HEADERS, dtypes_for, headers_for
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; fall back to the pandas C parser
+    pa = None
+    pa_csv = None
+
+# Rows per chunk handed to the filters; peak memory is roughly one chunk
+CHUNK_SIZE = 100_000
+
+# Lines checked per block by the pandas engine's field-count filter
+FILTER_LINES = 10_000
+
+# 'pyarrow' when installed, else pandas' own 'c' parser
+DEFAULT_ENGINE = 'pyarrow' if pa is not None else 'c'
+
+
+def list_export_files(directory):
+    """
+    List GDELT exports in directory, both extracted (*.CSV) and as downloaded
+    (*.CSV.zip), sorted by name. When a day is present in both forms only the
+    extracted CSV is returned.
+    """
+    names = set(os.listdir(directory))
+    files = []
+    for name in names:
+        if name.endswith(".CSV"):
+            files.append(name)
+        elif name.endswith(".CSV.zip") and name[:-len(".zip")] not in names:
+            files.append(name)
+    return sorted(files)
+
+
+@contextmanager
+def open_export(file_path):
+    """Open an export for binary reading; zipped exports yield their first member."""
+    if file_path.endswith(".zip"):
+        with zipfile.ZipFile(file_path) as zf:
+            members = [m for m in zf.namelist() if not m.endswith("/")]
+            if not members:
+                raise ValueError(f"{file_path} is an empty archive")
+            with zf.open(members[0]) as fh:
+                yield fh
+    else:
+        with open(file_path, "rb") as fh:
+            yield fh
+
+
+def export_headers(file_path):
+    """
+    Column names of an export, told apart by the number of fields on its
+    first line: V1_HEADERS for a 1.0 daily export, HEADERS for 2.0. None for
+    an empty export; ValueError for any other width.
+    """
+    with open_export(file_path) as fh:
+        line = fh.readline().rstrip(b"\r\n")
+    if not line.strip():
+        return None
+    return headers_for(line.count(b"\t") + 1)
+
+
+def read_export_chunks(file_path, columns=None, chunksize=CHUNK_SIZE, engine=None):
+    """
+    Yield DataFrames of at most chunksize rows from a tab-separated GDELT export.
+
+    The layout (1.0 or 2.0) is detected from the first line. Only the
+    projected columns are parsed (all of them if columns is None), with the
+    explicit dtypes from pipeline.schema. Zipped exports are decompressed on
+    the fly from the archive member, so the extracted CSV is never written
+    to disk. Lines with a different number of fields are skipped and counted
+    (rows_rejected_total); ValueError if that leaves nothing of the file.
+    Time spent parsing is recorded as the 'parse' stage (see pipeline.metrics).
+    """
+    METRICS.inc('stage_bytes_total', os.path.getsize(file_path), stage='parse')
+    yield from timed_chunks(_read_chunks(file_path, columns, chunksize, engine), 'parse')
+
+
+def _read_chunks(file_path, columns, chunksize, engine):
+    headers = export_headers(file_path)
+    if headers is None:
+        return
+    columns = list(columns) if columns is not None else list(headers)
+    missing = [c for c in columns if c not in headers]
+    if missing:
+        raise ValueError(f"{file_path} is a {len(headers)}-column export without {missing}")
+    engine = engine or DEFAULT_ENGINE
+    counts = {'rows': 0, 'rejected': 0}
+    with open_export(file_path) as fh:
+        if engine == 'pyarrow':
+            chunks = _read_arrow_chunks(fh, headers, columns, chunksize, counts)
+        else:
+            chunks = _read_pandas_chunks(fh, headers, columns, chunksize, engine, counts)
+        for chunk in chunks:
+            counts['rows'] += len(chunk)
+            yield chunk
+    if counts['rejected']:
+        METRICS.inc('rows_rejected_total', counts['rejected'])
+        if not counts['rows']:
+            raise ValueError(f"{file_path}: all {counts['rejected']} lines rejected, "
+                             f"expected {len(headers)} fields per line")
+        print(f"Skipped {counts['rejected']} lines of {file_path} without {len(headers)} fields")
+
+
+def load_export(file_path, columns=None, engine=None):
+    """Read a whole export (with the same projection and dtypes) into one DataFrame."""
+    chunks = list(read_export_chunks(file_path, columns, engine=engine))
+    if not chunks:
+        return pd.DataFrame(columns=columns if columns is not None else export_headers(file_path) or HEADERS)
+    return pd.concat(chunks, ignore_index=True)
+
+
+# ---------- pandas engine ----------
+
+class _FieldCountFilter(io.RawIOBase):
+    """
+    The lines of fh that have exactly `fields` tab-separated fields. The C
+    parser pads short lines and ignores extra fields instead of rejecting
+    them, so wrong-width lines are dropped (and counted) before it sees them.
+    """
+
+    def __init__(self, fh, fields, counts):
+        self._lines = iter(fh)
+        self._tabs = fields - 1
+        self._counts = counts
+        self._buffer = b""
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._offset == len(self._buffer):
+            block = list(itertools.islice(self._lines, FILTER_LINES))
+            if not block:
+                return 0
+            kept = [line for line in block if line.count(b"\t") == self._tabs]
+            self._counts['rejected'] += sum(1 for line in block if line.strip()) - len(kept)
+            self._buffer, self._offset = b"".join(kept), 0
+        n = min(len(b), len(self._buffer) - self._offset)
+        b[:n] = self._buffer[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+
+def _read_pandas_chunks(fh, headers, columns, chunksize, engine, counts):
+    lines = io.BufferedReader(_FieldCountFilter(fh, len(headers), counts))
+    with pd.read_csv(lines, sep='\t', names=headers, usecols=columns, dtype=dtypes_for(columns),
+                     chunksize=chunksize, on_bad_lines='skip', encoding='utf-8', engine=engine) as reader:
+        for chunk in reader:
+            yield chunk[columns]
+
+
+# ---------- pyarrow engine ----------
+
+def _arrow_type(dtype):
+    return {
+        'Int8': pa.int8(), 'Int32': pa.int32(), 'Int64': pa.int64(),
+        'float32': pa.float32(), 'float64': pa.float64(),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'object': pa.string(),
+    }[dtype]
+
+
+def _pandas_type(arrow_type):
+    # Keep nullable integers as integers instead of widening them to float64
+    return {
+        pa.int8(): pd.Int8Dtype(), pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype(),
+    }.get(arrow_type)
+
+
+def _read_arrow_chunks(fh, headers, columns, chunksize, counts):
+    """Stream record batches through pyarrow's multithreaded CSV reader."""
+    def reject(row):
+        counts['rejected'] += 1
+        return 'skip'
+
+    reader = pa_csv.open_csv(
+        fh,
+        read_options=pa_csv.ReadOptions(column_names=headers, block_size=1 << 24),
+        parse_options=pa_csv.ParseOptions(delimiter='\t', invalid_row_handler=reject),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={c: _arrow_type(t) for c, t in dtypes_for(columns).items()},
+            strings_can_be_null=True,
+        ),
+    )
+    pending = []
+    pending_rows = 0
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunksize).to_pandas(types_mapper=_pandas_type)
+            rest = table.slice(chunksize)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending).to_pandas(types_mapper=_pandas_type)
@@ -0,0 +1,66 @@
+"""
+Column layouts and types of GDELT event exports: 58 columns in a 1.0 daily
+export, 61 in a 2.0 export (which adds the three *_ADM2Code fields).
+"""
+
+# Field kinds, translated to pandas dtypes below and to Arrow types in reader.py
+DATE = 'Int32'        # YYYYMMDD
+INT8 = 'Int8'
+INT32 = 'Int32'
+INT64 = 'Int64'
+FLOAT32 = 'float32'
+FLOAT64 = 'float64'
+CODE = 'category'     # short, heavily repeated codes
+TEXT = 'object'
+
+# The 2.0 layout; a 1.0 export is the same without the *_ADM2Code fields
+SCHEMA = [
+    ('GLOBALEVENTID', INT64), ('SQLDATE', DATE), ('MonthYear', INT32), ('Year', INT32),
+    ('FractionDate', FLOAT64), ('Actor1Code', CODE), ('Actor1Name', TEXT),
+    ('Actor1CountryCode', CODE), ('Actor1KnownGroupCode', CODE), ('Actor1EthnicCode', CODE),
+    ('Actor1Religion1Code', CODE), ('Actor1Religion2Code', CODE), ('Actor1Type1Code', CODE),
+    ('Actor1Type2Code', CODE), ('Actor1Type3Code', CODE), ('Actor2Code', CODE),
+    ('Actor2Name', TEXT), ('Actor2CountryCode', CODE), ('Actor2KnownGroupCode', CODE),
+    ('Actor2EthnicCode', CODE), ('Actor2Religion1Code', CODE), ('Actor2Religion2Code', CODE),
+    ('Actor2Type1Code', CODE), ('Actor2Type2Code', CODE), ('Actor2Type3Code', CODE),
+    ('IsRootEvent', INT8), ('EventCode', CODE), ('EventBaseCode', CODE), ('EventRootCode', CODE),
+    ('QuadClass', INT8), ('GoldsteinScale', FLOAT32), ('NumMentions', INT32),
+    ('NumSources', INT32), ('NumArticles', INT32), ('AvgTone', FLOAT32),
+    ('Actor1Geo_Type', INT8), ('Actor1Geo_FullName', TEXT), ('Actor1Geo_CountryCode', CODE),
+    ('Actor1Geo_ADM1Code', CODE), ('Actor1Geo_ADM2Code', CODE), ('Actor1Geo_Lat', FLOAT32),
+    ('Actor1Geo_Long', FLOAT32), ('Actor1Geo_FeatureID', TEXT), ('Actor2Geo_Type', INT8),
+    ('Actor2Geo_FullName', TEXT), ('Actor2Geo_CountryCode', CODE), ('Actor2Geo_ADM1Code', CODE),
+    ('Actor2Geo_ADM2Code', CODE), ('Actor2Geo_Lat', FLOAT32), ('Actor2Geo_Long', FLOAT32),
+    ('Actor2Geo_FeatureID', TEXT), ('ActionGeo_Type', INT8), ('ActionGeo_FullName', TEXT),
+    ('ActionGeo_CountryCode', CODE), ('ActionGeo_ADM1Code', CODE), ('ActionGeo_ADM2Code', CODE),
+    ('ActionGeo_Lat', FLOAT32), ('ActionGeo_Long', FLOAT32), ('ActionGeo_FeatureID', TEXT),
+    # YYYYMMDD in 1.0, YYYYMMDDHHMMSS in 2.0
+    ('DATEADDED', INT64), ('SOURCEURL', TEXT),
+]
+
+# The 61 column names of a 2.0 export, in file order (GDELT files have no header row)
+HEADERS = [name for name, _ in SCHEMA]
+# The 58 column names of a 1.0 daily export
+V1_HEADERS = [name for name in HEADERS if not name.endswith('_ADM2Code')]
+
+# Column names by the number of fields in a line
+LAYOUTS = {len(V1_HEADERS): V1_HEADERS, len(HEADERS): HEADERS}
+
+# Explicit pandas dtypes for pd.read_csv
+DTYPES = dict(SCHEMA)
+
+
+def dtypes_for(columns):
+    """Return the DTYPES entries for the given columns, rejecting unknown names."""
+    unknown = [c for c in columns if c not in DTYPES]
+    if unknown:
+        raise ValueError(f"Unknown GDELT columns: {unknown}")
+    return {c: DTYPES[c] for c in columns}
+
+
+def headers_for(field_count):
+    """Return the column names of an export whose lines have field_count fields."""
+    if field_count not in LAYOUTS:
+        raise ValueError(f"Not a GDELT event export: {field_count} fields per line, "
+                         f"expected one of {sorted(LAYOUTS)}")
+    return LAYOUTS[field_count]
@@ -0,0 +1,113 @@
+import bisect
+import math
+import threading
+
+import pandas as pd
+
+
+def normalize_date(value):
+    """Accept YYYY-MM-DD or YYYYMMDD and return YYYY-MM-DD; raises ValueError otherwise."""
+    return pd.to_datetime(value, format='ISO8601' if '-' in value else '%Y%m%d').strftime('%Y-%m-%d')
+
+
+class _TickerRows:
+    """The weekly rows of one ticker, pre-converted for slicing by date and JSON output."""
+
+    def __init__(self, ticker, df):
+        df = df.sort_values('SQLDATE', kind='stable').reset_index(drop=True)
+        if 'Ticker' not in df.columns:
+            df.insert(1, 'Ticker', ticker)
+        df['SQLDATE'] = pd.to_datetime(df['SQLDATE']).dt.strftime('%Y-%m-%d')
+        self.frame = df
+        self.columns = list(df.columns)
+        self.dates = df['SQLDATE'].tolist()
+        # NaN is not valid JSON; None serializes as null
+        self.records = [{k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in row.items()}
+                        for row in df.to_dict('records')]
+
+    def bounds(self, start=None, end=None):
+        lo = bisect.bisect_left(self.dates, start) if start else 0
+        hi = bisect.bisect_right(self.dates, end) if end else len(self.dates)
+        return lo, hi
+
+
+class SentimentIndex:
+    """
+    In-memory copy of every weekly_{ticker}_news.csv listed in an
+    OutputCatalog, queried by ticker and date range without touching the disk.
+
+    Files are loaded once and re-read only when the catalog reports that
+    their size or mtime changed.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._tickers = {}
+        self._stamps = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Reload new or changed files and drop deleted ones."""
+        with self._lock:
+            version = self.catalog.version
+            if version == self._version:
+                return
+            seen = dict(self.catalog.stamps())
+            tickers = {t: rows for t, rows in self._tickers.items() if t in seen}
+            for ticker, stamp in seen.items():
+                if self._stamps.get(ticker) == stamp and ticker in tickers:
+                    continue
+                try:
+                    tickers[ticker] = _TickerRows(ticker, pd.read_csv(stamp[0]))
+                except (OSError, ValueError, KeyError) as e:
+                    # Half-written or malformed file: keep serving the old rows
+                    print(f"Could not load {stamp[0]}: {e}")
+                    seen[ticker] = self._stamps.get(ticker)
+            self._stamps = seen
+            self._version = version
+            # One assignment, so readers see either the old or the new dict
+            self._tickers = tickers
+
+    def maybe_refresh(self):
+        self.catalog.maybe_refresh()
+        if self.catalog.version != self._version:
+            self.refresh()
+
+    def tickers(self):
+        self.maybe_refresh()
+        return sorted(self._tickers)
+
+    def get(self, ticker):
+        """The _TickerRows of ticker, or None."""
+        self.maybe_refresh()
+        return self._tickers.get(ticker)
+
+    def has_ticker(self, ticker):
+        return self.get(ticker) is not None
+
+    def records(self, ticker, start=None, end=None, fields=None):
+        """JSON-ready rows of ticker between start and end (YYYY-MM-DD, inclusive), or None."""
+        rows = self.get(ticker)
+        if rows is None:
+            return None
+        lo, hi = rows.bounds(start, end)
+        selected = rows.records[lo:hi]
+        if fields:
+            selected = [{k: r.get(k) for k in fields} for r in selected]
+        return selected
+
+    def frame(self, tickers, start=None, end=None, fields=None):
+        """The same rows as one DataFrame (for CSV/Arrow output); unknown tickers are skipped."""
+        frames = []
+        for ticker in tickers:
+            rows = self.get(ticker)
+            if rows is None:
+                continue
+            lo, hi = rows.bounds(start, end)
+            frame = rows.frame.iloc[lo:hi]
+            frames.append(frame[[c for c in fields if c in frame.columns]] if fields else frame)
+        if not frames:
+            return pd.DataFrame(columns=fields or [])
+        return pd.concat(frames, ignore_index=True)
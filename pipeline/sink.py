@@ -0,0 +1,336 @@
+import glob
+import os
+import shutil
+import sqlite3
+import uuid
+
+import pandas as pd
+
+from pipeline.metrics import METRICS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for the Parquet sink
+    pa = None
+    pq = None
+
+# Bytes read per step when looking for the start of a CSV's tail
+TAIL_BLOCK = 1 << 16
+# Database file of the SQLite sink; each dataset is one table in it (see pipeline.database)
+SQLITE_FILE = "gdelt.db"
+
+
+class _BufferedSink:
+    """Per-ticker row buffers shared by the sinks; subclasses implement flush()."""
+
+    def __init__(self):
+        self._append = {}
+        self._replace = {}
+
+    def append(self, ticker, df):
+        if not df.empty:
+            self._append.setdefault(ticker, []).append(df)
+
+    def append_grouped(self, df, column='Ticker'):
+        """Append every row of df to the output of the ticker in df[column]."""
+        for ticker, rows in df.groupby(column, sort=False):
+            self.append(ticker, rows)
+
+    def replace(self, ticker, df):
+        self._replace[ticker] = (None, df)
+        self._append.pop(ticker, None)
+
+    def replace_from(self, ticker, df, start):
+        """
+        Replace the rows of ticker from the week start on (SQLDATE >= start)
+        with df, keeping the earlier ones; df holds every row from start on.
+        """
+        if ticker in self._replace:
+            earlier, old = self._replace[ticker]
+            if earlier is None or earlier <= start:
+                df = pd.concat([old[old['SQLDATE'] < start], df], ignore_index=True)
+                start = earlier
+        self._replace[ticker] = (start, df)
+
+    def _drain(self):
+        """
+        Hand the buffered rows to flush() and reset the buffers: replace maps
+        a ticker to (start, rows), start being None for a whole replacement.
+        """
+        replace = self._replace
+        append = {ticker: pd.concat(frames, ignore_index=True) for ticker, frames in self._append.items()}
+        self._append = {}
+        self._replace = {}
+        return replace, append
+
+    def clear(self):
+        """Drop the buffered rows and everything written so far."""
+        self._drain()
+
+
+class CsvSink(_BufferedSink):
+    """
+    Buffers output rows per ticker and writes each ticker's CSV once per
+    flush, instead of opening the file for every row or chunk.
+
+    file_pattern names the file of a ticker, e.g. "weekly_{ticker}_news.csv";
+    a pattern without {ticker} sends every ticker to the same file.
+    append() rows are added to the end of the file (with a header if the file
+    is new), replace() rows overwrite it atomically. replace_from() cuts the
+    file where the replaced weeks begin and appends the new rows there, so
+    only the tail of the file is written.
+    """
+
+    def __init__(self, output_directory, file_pattern):
+        super().__init__()
+        self.output_directory = output_directory
+        self.file_pattern = file_pattern
+        os.makedirs(output_directory, exist_ok=True)
+
+    def path(self, ticker):
+        return os.path.join(self.output_directory, self.file_pattern.format(ticker=ticker))
+
+    def clear(self):
+        super().clear()
+        for path in glob.glob(os.path.join(glob.escape(self.output_directory), self.file_pattern.format(ticker="*"))):
+            os.remove(path)
+
+    def flush(self):
+        """Write all buffered rows. Returns {ticker: rows written}."""
+        replace, append = self._drain()
+        written = {}
+        with METRICS.stage('write') as record:
+            size = 0
+            for ticker, (start, df) in replace.items():
+                path = self.path(ticker)
+                if start is not None and os.path.exists(path):
+                    size += self._replace_tail(path, df, start)
+                else:
+                    self._write(path, df)
+                    size += os.path.getsize(path)
+                written[ticker] = len(df)
+            for ticker, df in append.items():
+                path = self.path(ticker)
+                exists = os.path.exists(path)
+                before = os.path.getsize(path) if exists else 0
+                df.to_csv(path, mode='a', index=False, header=not exists)
+                size += os.path.getsize(path) - before
+                written[ticker] = written.get(ticker, 0) + len(df)
+            record.rows_in, record.bytes = sum(written.values()), size
+        return written
+
+
+    @staticmethod
+    def _write(path, df):
+        tmp_path = f"{path}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def _replace_tail(self, path, df, start):
+        """
+        Swap the lines of path from the week start on for df. The file is cut
+        where those lines begin and df appended, so only the tail is written;
+        a file with other columns is rewritten whole. Returns the bytes written.
+        """
+        with open(path, "rb") as f:
+            header = f.readline().rstrip(b"\r\n").decode("utf-8")
+        if header != ",".join(df.columns):
+            old = pd.read_csv(path, parse_dates=['SQLDATE'])
+            self._write(path, pd.concat([old[old['SQLDATE'] < start], df], ignore_index=True))
+            return os.path.getsize(path)
+        tail = df.to_csv(index=False, header=False).encode("utf-8")
+        offset = _offset_from(path, start.strftime('%Y-%m-%d'))
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(tail)
+        return len(tail)
+
+
+def _offset_from(path, key, block=TAIL_BLOCK):
+    """
+    Byte offset of the first data line of a CSV sorted by its first field
+    whose first field is >= key (the end of the file if none is), reading
+    backwards from the end in blocks.
+    """
+    key = key.encode("utf-8")
+    with open(path, "rb") as f:
+        header_end = len(f.readline())
+        end = position = f.seek(0, os.SEEK_END)
+        data = b""
+        while position > header_end:
+            step = min(block, position - header_end)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+            # The first line in data is cut off unless data starts right after the header
+            skip = 0 if position == header_end else data.find(b"\n") + 1
+            if position > header_end and (skip in (0, len(data)) or data[skip:].split(b",", 1)[0] >= key):
+                continue  # no whole line yet, or they all belong to the replaced tail
+            offset = position + skip
+            for line in data[skip:].splitlines(keepends=True):
+                if line.split(b",", 1)[0] >= key:
+                    return offset
+                offset += len(line)
+            return end
+        return end
+
+
+class ParquetSink(_BufferedSink):
+    """
+    Same interface as CsvSink, writing one Parquet dataset partitioned by
+    ticker: {output_directory}/{dataset}/Ticker={ticker}/part-*.parquet.
+    Each flush adds one file per appended ticker; replace() and
+    replace_from() (which keeps the earlier rows) rewrite the
+    ticker's partition.
+    """
+
+    def __init__(self, output_directory, dataset):
+        if pq is None:
+            raise ImportError("ParquetSink requires pyarrow")
+        super().__init__()
+        self.root = os.path.join(output_directory, dataset)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, ticker):
+        return os.path.join(self.root, f"Ticker={ticker}")
+
+    def clear(self):
+        super().clear()
+        shutil.rmtree(self.root)
+        os.makedirs(self.root)
+
+    def _write(self, ticker, df, clear):
+        partition = self.path(ticker)
+        if clear and os.path.exists(partition):
+            shutil.rmtree(partition)
+        os.makedirs(partition, exist_ok=True)
+        # The ticker lives in the partition path, not in the file
+        table = pa.Table.from_pandas(df.drop(columns=['Ticker'], errors='ignore'), preserve_index=False)
+        path = os.path.join(partition, f"part-{uuid.uuid4().hex}.parquet")
+        pq.write_table(table, path)
+        return os.path.getsize(path)
+
+    def flush(self):
+        """Write all buffered rows. Returns {ticker: rows written}."""
+        replace, append = self._drain()
+        written = {}
+        with METRICS.stage('write') as record:
+            size = 0
+            for ticker, (start, df) in replace.items():
+                written[ticker] = len(df)
+                if start is not None and os.path.exists(self.path(ticker)):
+                    old = pq.read_table(self.path(ticker)).to_pandas()
+                    df = pd.concat([old[old['SQLDATE'] < start], df.drop(columns=['Ticker'], errors='ignore')],
+                                   ignore_index=True)
+                size += self._write(ticker, df, clear=True)
+            for ticker, df in append.items():
+                size += self._write(ticker, df, clear=False)
+                written[ticker] = written.get(ticker, 0) + len(df)
+            record.rows_in, record.bytes = sum(written.values()), size
+        return written
+
+
+class SqliteSink(_BufferedSink):
+    """
+    Same interface as CsvSink, writing all tickers into one table (named
+    dataset) of an embedded SQLite database, {output_directory}/gdelt.db,
+    indexed by (Ticker, SQLDATE) and by SQLDATE so the API can look up a
+    ticker's weeks or rank every ticker for one week (see pipeline.database).
+    Each flush is one transaction; replace() deletes the ticker's rows first,
+    replace_from() only those from its start week on.
+    Dates are stored as YYYY-MM-DD; columns that appear later are added to
+    the table.
+    """
+
+    def __init__(self, output_directory, dataset):
+        super().__init__()
+        os.makedirs(output_directory, exist_ok=True)
+        self.database_path = os.path.join(output_directory, SQLITE_FILE)
+        self.table = dataset
+        # Flushed from whichever thread runs the upserts (e.g. the daemon's filter thread)
+        self._db = sqlite3.connect(self.database_path, check_same_thread=False, isolation_level=None)
+        # Readers (the API) are not blocked while a flush is written
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._columns = [row[1] for row in self._db.execute(f'PRAGMA table_info("{self.table}")')]
+
+    def path(self, ticker):
+        """Where a ticker's rows end up, for log messages."""
+        return f"{self.database_path} (table {self.table}, Ticker={ticker})"
+
+    def clear(self):
+        super().clear()
+        if self._columns:
+            self._db.execute(f'DELETE FROM "{self.table}"')
+
+    def _ensure_columns(self, df):
+        def sql_type(dtype):
+            if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+                return "INTEGER"
+            return "REAL" if pd.api.types.is_float_dtype(dtype) else "TEXT"
+
+        if not self._columns:
+            definitions = ", ".join(f'"{c}" {sql_type(t)}' for c, t in df.dtypes.items())
+            self._db.execute(f'CREATE TABLE "{self.table}" ({definitions})')
+            if 'SQLDATE' in df.columns:
+                self._db.execute(f'CREATE INDEX "{self.table}_ticker_date" ON "{self.table}" (Ticker, SQLDATE)')
+                self._db.execute(f'CREATE INDEX "{self.table}_date" ON "{self.table}" (SQLDATE)')
+            else:
+                self._db.execute(f'CREATE INDEX "{self.table}_ticker" ON "{self.table}" (Ticker)')
+            self._columns = list(df.columns)
+            return
+        for column, dtype in df.dtypes.items():
+            if column not in self._columns:
+                self._db.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{column}" {sql_type(dtype)}')
+                self._columns.append(column)
+
+    def _insert(self, ticker, df):
+        if 'Ticker' not in df.columns:
+            df = df.assign(Ticker=ticker)
+        df = df.assign(**{c: df[c].dt.strftime('%Y-%m-%d')
+                          for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c])})
+        self._ensure_columns(df)
+        names = ", ".join(f'"{c}"' for c in df.columns)
+        placeholders = ", ".join("?" * len(df.columns))
+        # Plain Python values, with None for NaN/NA (sqlite3 cannot bind NumPy scalars)
+        rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+        self._db.executemany(f'INSERT INTO "{self.table}" ({names}) VALUES ({placeholders})', rows)
+
+    def flush(self):
+        """Write all buffered rows. Returns {ticker: rows written}."""
+        replace, append = self._drain()
+        written = {}
+        with METRICS.stage('write') as record:
+            self._db.execute("BEGIN")
+            try:
+                for ticker, (start, df) in replace.items():
+                    if self._columns and start is None:
+                        self._db.execute(f'DELETE FROM "{self.table}" WHERE Ticker = ?', (ticker,))
+                    elif self._columns:
+                        self._db.execute(f'DELETE FROM "{self.table}" WHERE Ticker = ? AND SQLDATE >= ?',
+                                         (ticker, start.strftime('%Y-%m-%d')))
+                    self._insert(ticker, df)
+                    written[ticker] = len(df)
+                for ticker, df in append.items():
+                    self._insert(ticker, df)
+                    written[ticker] = written.get(ticker, 0) + len(df)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                # The table may not have been created after all
+                self._columns = [row[1] for row in self._db.execute(f'PRAGMA table_info("{self.table}")')]
+                raise
+            record.rows_in = sum(written.values())
+        return written
+
+
+def make_sink(output_format, output_directory, file_pattern, dataset):
+    """Build a CsvSink ("csv"), ParquetSink ("parquet") or SqliteSink ("sqlite") for a script's outputs."""
+    if output_format == "csv":
+        return CsvSink(output_directory, file_pattern)
+    if output_format == "parquet":
+        return ParquetSink(output_directory, dataset)
+    if output_format == "sqlite":
+        return SqliteSink(output_directory, dataset)
+    raise ValueError(f"Unknown output format: {output_format}")
@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+# Lifecycle of one daily export in the daemon
+MISSING = 'missing'          # not published yet (404); retried on the next poll
+FAILED = 'failed'            # download or filtering raised; retried on the next poll
+DOWNLOADED = 'downloaded'    # on disk, not yet folded into the weekly store
+PROCESSED = 'processed'      # folded into the weekly store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    day TEXT PRIMARY KEY,          -- YYYYMMDD
+    status TEXT NOT NULL,
+    file_name TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_status ON files (status);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class PipelineState:
+    """
+    Recovery state of the pipeline daemon in a small SQLite database: one
+    row per daily export with its status (see the constants above), plus
+    a few key/value settings. Safe to share between the daemon's threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def is_empty(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0] == 0
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def mark(self, day, status, file_name=None, error=None):
+        """Record the new status of day; file_name is kept from earlier rows when not given."""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self._db.execute(
+                """INSERT INTO files (day, status, file_name, attempts, error, updated)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (day) DO UPDATE SET
+                       status = excluded.status,
+                       file_name = COALESCE(excluded.file_name, files.file_name),
+                       attempts = files.attempts + excluded.attempts,
+                       error = excluded.error,
+                       updated = excluded.updated""",
+                (day, status, file_name, int(status in (MISSING, FAILED)), error, now))
+
+    def mark_many(self, rows):
+        """Insert (day, status, file_name) rows in one transaction, e.g. when importing old state."""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (day, status, file_name, updated) VALUES (?, ?, ?, ?)",
+                [(day, status, file_name, now) for day, status, file_name in rows])
+            self._db.execute("COMMIT")
+
+    def statuses(self):
+        """{day: status} of every known export."""
+        with self._lock:
+            return dict(self._db.execute("SELECT day, status FROM files"))
+
+    def with_status(self, status):
+        """(day, file_name) of the exports in status, oldest first."""
+        with self._lock:
+            return self._db.execute("SELECT day, file_name FROM files WHERE status = ? ORDER BY day",
+                                    (status,)).fetchall()
+
+    def counts(self):
+        """{status: number of exports}."""
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM files GROUP BY status"))
@@ -0,0 +1,252 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from pipeline.database import DEFAULT_MIN_COUNT
+
+# Weeks of history behind a z-score / rolling statistic by default, and the fewest that count
+DEFAULT_WINDOW = 12
+MIN_WEEKS = 4
+# Spare rows/columns allocated when the matrix grows, so most updates never copy it
+GROW_TICKERS = 64
+GROW_WEEKS = 52
+
+
+def _day(week):
+    """YYYY-MM-DD (or anything NumPy parses as a date) to days since 1970-01-01."""
+    return int(np.datetime64(str(week)[:10], 'D').astype('int64'))
+
+
+def _none(value):
+    return None if value != value else value  # NaN -> None (null in JSON)
+
+
+class ToneMatrix:
+    """
+    Dense (ticker x week) matrices of the weekly AvgTone (NaN where a ticker
+    has no row) and Count (0), for cross-sectional queries over all tickers
+    at once: rankings, week-over-week changes, rolling mean/std and z-scores
+    against each ticker's own recent history.
+
+    Columns are consecutive weeks starting at origin (a week-ending Sunday,
+    as WeeklyStore labels them). load() builds the matrices from the weekly
+    outputs; apply() folds in the (ticker, week) events of an EventLog as
+    they arrive, growing the matrices when a new ticker or week shows up.
+    Events carry the full aggregate of their week, so applying one twice is
+    harmless. Thread-safe; queries return the week they describe and plain
+    lists of dicts, ready for JSON.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.tickers = []
+        self._rows = {}
+        self.origin = None  # day number of column 0
+        self.weeks = 0      # columns in use
+        self.tone = np.full((0, 0), np.nan)
+        self.count = np.zeros((0, 0), dtype='int64')
+
+    # ---------- Building ----------
+    def load(self, frame):
+        """Replace the contents with the rows of frame (Ticker, SQLDATE, AvgTone, Count)."""
+        frame = frame.dropna(subset=['Ticker', 'SQLDATE', 'AvgTone'])
+        codes, tickers = pd.factorize(frame['Ticker'], sort=True)
+        days = pd.to_datetime(frame['SQLDATE']).to_numpy().astype('datetime64[D]').astype('int64')
+        with self._lock:
+            self._reset()
+            if not len(frame):
+                return
+            self.origin = int(days.min())
+            columns = (days - self.origin) // 7
+            self.tickers = list(tickers)
+            self._rows = {ticker: row for row, ticker in enumerate(self.tickers)}
+            self.weeks = int(columns.max()) + 1
+            self._resize(len(self.tickers) + GROW_TICKERS, self.weeks + GROW_WEEKS)
+            self.tone[codes, columns] = frame['AvgTone'].to_numpy(dtype='float64')
+            if 'Count' in frame.columns:
+                self.count[codes, columns] = frame['Count'].fillna(0).to_numpy(dtype='int64')
+
+    def _resize(self, rows, columns, shift=0):
+        """Reallocate to rows x columns, moving the current weeks right by shift columns."""
+        tone = np.full((rows, columns), np.nan)
+        count = np.zeros((rows, columns), dtype='int64')
+        used_rows, used_columns = min(len(self.tickers), self.tone.shape[0]), self.tone.shape[1]
+        tone[:used_rows, shift:shift + used_columns] = self.tone[:used_rows]
+        count[:used_rows, shift:shift + used_columns] = self.count[:used_rows]
+        self.tone, self.count = tone, count
+
+    def _row(self, ticker):
+        row = self._rows.get(ticker)
+        if row is None:
+            row = len(self.tickers)
+            if row >= self.tone.shape[0]:
+                self._resize(row + GROW_TICKERS, self.tone.shape[1])
+            self.tickers.append(ticker)
+            self._rows[ticker] = row
+        return row
+
+    def _column(self, day):
+        if self.origin is None:
+            self.origin = day
+        if day < self.origin:
+            shift = -((day - self.origin) // 7)
+            self._resize(self.tone.shape[0], self.tone.shape[1] + shift, shift)
+            self.origin -= 7 * shift
+            self.weeks += shift
+        column = (day - self.origin) // 7
+        if column >= self.tone.shape[1]:
+            self._resize(self.tone.shape[0], column + GROW_WEEKS)
+        self.weeks = max(self.weeks, column + 1)
+        return column
+
+    def update(self, ticker, week, avg_tone, count):
+        with self._lock:
+            row = self._row(ticker)
+            column = self._column(_day(week))
+            self.tone[row, column] = np.nan if avg_tone is None else avg_tone
+            self.count[row, column] = count or 0
+
+    def apply(self, events):
+        """Fold in EventLog events ({'ticker', 'week', 'AvgTone', 'Count', ...})."""
+        for event in events:
+            if 'ticker' in event and 'week' in event:
+                self.update(event['ticker'], event['week'], event.get('AvgTone'), event.get('Count'))
+
+    # ---------- Queries ----------
+    def week_labels(self):
+        with self._lock:
+            if self.origin is None:
+                return []
+            days = self.origin + 7 * np.arange(self.weeks)
+        return np.datetime_as_string(days.astype('datetime64[D]')).tolist()
+
+    def _week_column(self, week):
+        """Column of week (default the latest); ValueError if there is no such week."""
+        if self.origin is None:
+            raise ValueError("No weekly data loaded")
+        if week is None:
+            return self.weeks - 1
+        day = _day(week)
+        column = (day - self.origin) // 7
+        if (day - self.origin) % 7 or not 0 <= column < self.weeks:
+            raise ValueError(f"No week ending {week}")
+        return column
+
+    def _label(self, column):
+        return str(np.datetime64(self.origin + 7 * column, 'D'))
+
+    def ranking(self, week=None, limit=20, descending=False, min_count=DEFAULT_MIN_COUNT):
+        """
+        Tickers ordered by their AvgTone in week (lowest first unless
+        descending, ties by ticker), among those with at least min_count
+        events; with the change from the week before. The same floor and
+        order as WeeklyDatabase.ranking.
+        """
+        with self._lock:
+            column = self._week_column(week)
+            n = len(self.tickers)
+            tone = self.tone[:n, column].copy()
+            count = self.count[:n, column].copy()
+            previous = self.tone[:n, column - 1].copy() if column else np.full(n, np.nan)
+            tickers = self.tickers[:n]
+        candidates = np.flatnonzero((count >= min_count) & ~np.isnan(tone))
+        names = np.asarray(tickers, dtype=object)[candidates]
+        order = candidates[np.lexsort((names, -tone[candidates] if descending else tone[candidates]))][:limit]
+        delta = tone[order] - previous[order]
+        return self._label(column), [
+            {'rank': rank, 'ticker': tickers[i], 'AvgTone': t, 'Count': c, 'Delta': _none(d)}
+            for rank, (i, t, c, d) in enumerate(zip(order.tolist(), tone[order].tolist(),
+                                                    count[order].tolist(), delta.tolist()), start=1)]
+
+    def zscores(self, week=None, window=DEFAULT_WINDOW, min_count=1, min_weeks=MIN_WEEKS):
+        """
+        Every ticker's AvgTone in week against its own previous `window`
+        weeks: their mean and standard deviation, the z-score of this week,
+        and the change from the week before. Weeks with fewer than min_count
+        events are left out, and the statistics need min_weeks of history.
+        Returns (week label, arrays by name, tickers).
+        """
+        with self._lock:
+            column = self._week_column(week)
+            n = len(self.tickers)
+            start = max(0, column - window)
+            history = self.tone[:n, start:column + 1].copy()
+            counts = self.count[:n, start:column + 1].copy()
+            tickers = self.tickers[:n]
+        history[counts < min_count] = np.nan
+        tone, base = history[:, -1], history[:, :-1]
+        valid = ~np.isnan(base)
+        weeks = valid.sum(axis=1)
+        filled = np.where(valid, base, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = filled.sum(axis=1) / weeks
+            var = ((filled ** 2).sum(axis=1) - weeks * mean ** 2) / (weeks - 1)
+            std = np.sqrt(np.clip(var, 0, None))
+            enough = weeks >= max(min_weeks, 2)
+            mean[~enough] = np.nan
+            std[~enough] = np.nan
+            z = (tone - mean) / np.where(std > 0, std, np.nan)
+        delta = tone - base[:, -1] if base.shape[1] else np.full(n, np.nan)
+        return self._label(column), {
+            'AvgTone': tone, 'Count': counts[:, -1], 'Delta': delta,
+            'Mean': mean, 'Std': std, 'Weeks': weeks, 'ZScore': z,
+        }, tickers
+
+    @staticmethod
+    def _records(tickers, columns, order):
+        names = list(columns)
+        values = [columns[name][order].tolist() for name in names]
+        return [dict(ticker=tickers[i], **{name: _none(v) for name, v in zip(names, row)})
+                for i, row in zip(order.tolist(), zip(*values))]
+
+    def cross_section(self, week=None, window=DEFAULT_WINDOW, min_count=1, min_weeks=MIN_WEEKS):
+        """zscores() of every ticker with data in week, as rows sorted by ticker."""
+        label, columns, tickers = self.zscores(week, window, min_count, min_weeks)
+        present = np.flatnonzero(~np.isnan(columns['AvgTone']))
+        order = np.array(sorted(present.tolist(), key=tickers.__getitem__), dtype='int64')
+        return label, self._records(tickers, columns, order)
+
+    def anomalies(self, week=None, window=DEFAULT_WINDOW, threshold=2.0, min_count=1, min_weeks=MIN_WEEKS):
+        """Tickers whose |z-score| in week is at least threshold, largest first."""
+        label, columns, tickers = self.zscores(week, window, min_count, min_weeks)
+        z = np.abs(columns['ZScore'])
+        flagged = np.flatnonzero(z >= threshold)  # NaN compares False
+        order = flagged[np.argsort(-z[flagged], kind='stable')]
+        return label, self._records(tickers, columns, order)
+
+    def rolling(self, ticker, window=DEFAULT_WINDOW, min_weeks=MIN_WEEKS):
+        """
+        The weekly AvgTone of one ticker with its rolling mean and standard
+        deviation over the `window` weeks ending at each week (weeks without
+        data skipped); None for an unknown ticker.
+        """
+        with self._lock:
+            row = self._rows.get(ticker)
+            if row is None:
+                return None
+            tone = self.tone[row, :self.weeks].copy()
+            count = self.count[row, :self.weeks].copy()
+            origin = self.origin
+        valid = ~np.isnan(tone)
+        filled = np.where(valid, tone, 0.0)
+        # Window sums from cumulative sums: one pass for every week
+        sums, squares, weeks = (np.concatenate(([0], np.cumsum(a))) for a in (filled, filled ** 2, valid))
+        end = np.arange(1, len(tone) + 1)
+        start = np.maximum(end - window, 0)
+        k = (weeks[end] - weeks[start]).astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (sums[end] - sums[start]) / k
+            var = ((squares[end] - squares[start]) - k * mean ** 2) / (k - 1)
+            std = np.sqrt(np.clip(var, 0, None))
+        enough = k >= max(min_weeks, 2)
+        mean[~enough] = np.nan
+        std[~enough] = np.nan
+        keep = np.flatnonzero(valid)
+        labels = np.datetime_as_string((origin + 7 * keep).astype('datetime64[D]')).tolist()
+        return [{'week': w, 'AvgTone': t, 'Count': c, 'RollingMean': _none(m), 'RollingStd': _none(s)}
+                for w, t, c, m, s in zip(labels, tone[keep].tolist(), count[keep].tolist(),
+                                         mean[keep].tolist(), std[keep].tolist())]
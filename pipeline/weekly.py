@@ -0,0 +1,367 @@
+import glob
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from pipeline.metrics import METRICS
+from pipeline.reader import read_export_chunks
+from pipeline.sink import CsvSink
+
+ACTOR_COLUMNS = ['Actor1Name', 'Actor2Name']
+
+# Aggregation modes and the export columns they read. 'event' (every matched
+# event counts once) is always on; the others weight the tone by the event's
+# coverage or add GoldsteinScale statistics, from the same parsed chunk
+AGGREGATIONS = {
+    'event': ['AvgTone'],
+    'mention': ['AvgTone', 'NumMentions'],
+    'article': ['AvgTone', 'NumArticles', 'NumSources'],
+    'goldstein': ['GoldsteinScale'],
+}
+
+# File name of a ticker's weekly view in the output directory
+VIEW_PATTERN = "weekly_{ticker}_news.csv"
+# Database of the weekly state in the state directory, and its table
+STATE_FILE = "state.db"
+STATE_TABLE = "weekly_state"
+# Which exports a store aggregates: the daily files (V3 filter, daemon) or the 15-minute
+# slices (fetcher --incremental). They cover the same events, so one store takes one kind
+SOURCES = ("daily", "slices")
+
+# Mergeable per-(ticker, week) state: sums combine by addition, extremes by min/max
+STATE_COLUMNS = ['Week', 'Count', 'ToneSum', 'ToneSumSq', 'ToneMin', 'ToneMax']
+VIEW_COLUMNS = ['SQLDATE', 'Ticker', 'AvgTone', 'Count', 'ToneStd', 'ToneMin', 'ToneMax']
+# State of the optional modes, only present when they were aggregated
+MODE_STATE_COLUMNS = ['Mentions', 'ToneMentionSum', 'Articles', 'Sources', 'ToneArticleSum',
+                      'GoldsteinCount', 'GoldsteinSum', 'GoldsteinSumSq']
+
+
+def aggregation_columns(modes=()):
+    """The export columns to keep (besides the actor names) for the event mode plus modes."""
+    unknown = [m for m in modes if m not in AGGREGATIONS]
+    if unknown:
+        raise ValueError(f"Unknown aggregation modes: {unknown}; expected {', '.join(AGGREGATIONS)}")
+    columns = ['SQLDATE']
+    for mode in ['event'] + list(modes):
+        columns += [c for c in AGGREGATIONS[mode] if c not in columns]
+    return columns
+
+
+COLUMNS_TO_KEEP = aggregation_columns()
+
+
+def match_export(file_path, matcher, columns_to_keep=COLUMNS_TO_KEEP, cache=None):
+    """
+    Read one export chunk by chunk and yield its (row, ticker) pairs: the
+    columns_to_keep plus a 'Ticker' column, for every ticker whose keywords
+    appear in Actor1Name or Actor2Name.
+    With an EventCache (see pipeline.cache), the columns are read from the
+    export's cache file, which is built first if missing or stale.
+    """
+    columns_to_keep = list(columns_to_keep)
+    columns = columns_to_keep + ACTOR_COLUMNS
+    if cache is not None:
+        cache.ensure(file_path)
+        chunks = cache.read_chunks(file_path, columns)
+    else:
+        chunks = read_export_chunks(file_path, columns)
+    for df in chunks:
+        if df.empty:
+            continue
+        # Names are matched one distinct value at a time, through the matcher's NameIndex if it has one
+        yield matcher.all_matches(df, ACTOR_COLUMNS, columns=columns_to_keep)
+
+
+def week_ending(sqldate):
+    """Map YYYYMMDD values to the Sunday that closes their ISO week (as resample('W') labels them)."""
+    dates = pd.to_datetime(sqldate, format='%Y%m%d', errors='coerce')
+    return dates.dt.to_period('W-SUN').dt.end_time.dt.normalize()
+
+
+def reduce_matches(pairs, weeks):
+    """
+    Reduce (row, ticker) pairs to one mergeable row per (Ticker, Week), weeks
+    being the week label of each row: Count, ToneSum, ToneSumSq, ToneMin and
+    ToneMax, plus the state of every mode whose columns pairs has (see
+    AGGREGATIONS), all in one groupby. Rows with an invalid date or a missing
+    tone are dropped; missing weights count as 0.
+    """
+    frame = pd.DataFrame({
+        'Ticker': pairs['Ticker'].to_numpy(),
+        'Week': np.asarray(weeks),
+        'Tone': pairs['AvgTone'].to_numpy(dtype='float64', na_value=np.nan),
+    })
+    aggregations = dict(Count=('Tone', 'size'), ToneSum=('Tone', 'sum'), ToneSumSq=('ToneSq', 'sum'),
+                        ToneMin=('Tone', 'min'), ToneMax=('Tone', 'max'))
+    weights = {'NumMentions': ('Mentions', 'ToneMentionSum'), 'NumArticles': ('Articles', 'ToneArticleSum')}
+    for column, (total, tone_sum) in weights.items():
+        if column in pairs.columns:
+            frame[total] = pairs[column].to_numpy(dtype='float64', na_value=0.0)
+            frame[f'Weighted{total}'] = frame['Tone'] * frame[total]
+            aggregations[total] = (total, 'sum')
+            aggregations[tone_sum] = (f'Weighted{total}', 'sum')
+    if 'NumSources' in pairs.columns:
+        frame['Sources'] = pairs['NumSources'].to_numpy(dtype='float64', na_value=0.0)
+        aggregations['Sources'] = ('Sources', 'sum')
+    if 'GoldsteinScale' in pairs.columns:
+        frame['Goldstein'] = pairs['GoldsteinScale'].to_numpy(dtype='float64', na_value=np.nan)
+        frame['GoldsteinSq'] = frame['Goldstein'] ** 2
+        aggregations.update(GoldsteinCount=('Goldstein', 'count'), GoldsteinSum=('Goldstein', 'sum'),
+                            GoldsteinSumSq=('GoldsteinSq', 'sum'))
+    frame = frame.dropna(subset=['Week', 'Tone'])
+    frame['ToneSq'] = frame['Tone'] ** 2
+    return frame.groupby(['Ticker', 'Week'], sort=False).agg(**aggregations).reset_index()
+
+
+def partial_aggregates(pairs):
+    """Reduce (row, ticker) pairs to mergeable rows per (Ticker, Week), weeks ending on Sunday."""
+    with METRICS.stage('aggregate') as record:
+        result = reduce_matches(pairs, week_ending(pairs['SQLDATE']))
+        record.rows_in, record.rows_out = len(pairs), len(result)
+    return result
+
+
+# How each state column merges. All but Count are strict: a piece without a value (seeded
+# from an old view, or aggregated before a mode was enabled) makes the merged value unknown
+MERGE = {
+    'Count': 'sum', 'ToneSum': 'sum', 'ToneSumSq': 'sum', 'ToneMin': 'min', 'ToneMax': 'max',
+    **{column: 'sum' for column in MODE_STATE_COLUMNS},
+}
+
+
+def combine_partials(partials):
+    """Fold partial aggregates that share a (Ticker, Week) key into one row each."""
+    columns = [c for c in MERGE if c in partials.columns]
+    keys = [partials['Ticker'], partials['Week']]
+    result = partials.groupby(keys, sort=False).agg({c: MERGE[c] for c in columns})
+    strict = columns[1:]
+    missing = partials[strict].isna().groupby(keys, sort=False).any()
+    result[strict] = result[strict].mask(missing)
+    return result.reset_index()
+
+
+def mode_views(state):
+    """
+    The published columns of the optional modes present in state:
+    MentionTone and ArticleTone (tone averaged with NumMentions / NumArticles
+    as weights) with their weight totals, and the mean and standard
+    deviation of GoldsteinScale.
+    """
+    views = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if 'Mentions' in state.columns:
+            views['MentionTone'] = state['ToneMentionSum'] / state['Mentions'].where(state['Mentions'] > 0)
+            views['Mentions'] = state['Mentions'].astype('Int64')
+        if 'Articles' in state.columns:
+            views['ArticleTone'] = state['ToneArticleSum'] / state['Articles'].where(state['Articles'] > 0)
+            views['Articles'] = state['Articles'].astype('Int64')
+        if 'Sources' in state.columns:
+            views['Sources'] = state['Sources'].astype('Int64')
+        if 'GoldsteinCount' in state.columns:
+            count = state['GoldsteinCount'].astype('float64')
+            mean = state['GoldsteinSum'] / count.where(count > 0)
+            var = (state['GoldsteinSumSq'] - state['GoldsteinSum'] ** 2 / count) / (count - 1)
+            views['Goldstein'] = mean
+            views['GoldsteinStd'] = np.sqrt(var.clip(lower=0).where(count > 1))
+    return pd.DataFrame(views, index=state.index)
+
+
+class WeeklyStore:
+    """
+    Per-ticker weekly aggregates kept as mergeable state in one SQLite table
+    ({state_directory}/state.db, one row per (Ticker, Week)). upsert merges
+    new partial aggregates into their rows in place (INSERT ... ON CONFLICT),
+    so its cost follows the new rows, not the history. The published
+    weekly_{ticker}_news.csv in output_directory is only a materialized view
+    of the state: each upsert rebuilds a ticker's view from its earliest
+    touched week on, which is normally just the current week.
+    Views are written through sink (a CsvSink by default; see pipeline.sink).
+    With an EventLog (see pipeline.events), every upserted week is also
+    published there for the API's live feed. With a source (see SOURCES),
+    the store refuses to open when it holds the aggregates of the other one.
+    """
+
+    def __init__(self, state_directory, output_directory, sink=None, events=None, source=None):
+        self.state_directory = state_directory
+        self.output_directory = output_directory
+        self.events = events
+        os.makedirs(state_directory, exist_ok=True)
+        os.makedirs(output_directory, exist_ok=True)
+        self.sink = sink or CsvSink(output_directory, VIEW_PATTERN)
+        # Upserted from whichever thread runs the filter (e.g. the daemon's)
+        self._db = sqlite3.connect(os.path.join(state_directory, STATE_FILE), check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f'CREATE TABLE IF NOT EXISTS {STATE_TABLE} ('
+                         'Ticker TEXT NOT NULL, Week TEXT NOT NULL, Count INTEGER NOT NULL, '
+                         'ToneSum REAL, ToneSumSq REAL, ToneMin REAL, ToneMax REAL, '
+                         'PRIMARY KEY (Ticker, Week))')
+        self._db.execute('CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._columns = [row[1] for row in self._db.execute(f'PRAGMA table_info({STATE_TABLE})')]
+        self._import_state_files()
+        if source is not None:
+            self._claim(source)
+
+    def view_path(self, ticker):
+        return os.path.join(self.output_directory, VIEW_PATTERN.format(ticker=ticker))
+
+    def _import_state_files(self):
+        """Move the per-ticker state files of earlier versions ({ticker}.csv) into the table."""
+        names = [n for n in os.listdir(self.state_directory) if n.endswith(".csv")]
+        if not names:
+            return
+        state = pd.concat([pd.read_csv(os.path.join(self.state_directory, n), parse_dates=['Week'])
+                           .assign(Ticker=n[:-len(".csv")]) for n in names], ignore_index=True)
+        self._merge(state)
+        for name in names:
+            os.remove(os.path.join(self.state_directory, name))
+        print(f"Imported the state of {len(names)} tickers into {STATE_FILE}")
+
+    def _claim(self, source):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source {source!r}, expected one of {', '.join(SOURCES)}")
+        row = self._db.execute("SELECT value FROM store_meta WHERE key = 'source'").fetchone()
+        if row is not None and row[0] != source:
+            raise ValueError(f"{self.state_directory} aggregates the {row[0]} exports; adding the {source} "
+                             f"ones would count their events twice. Use another store, or clear it first")
+        self._db.execute("INSERT OR IGNORE INTO store_meta VALUES ('source', ?)", (source,))
+
+    def _merge(self, partials):
+        """Fold partials into their (Ticker, Week) rows in one transaction; see MERGE."""
+        columns = ['Ticker', 'Week'] + [c for c in MERGE if c in partials.columns]
+        for column in columns:
+            if column not in self._columns:
+                self._db.execute(f'ALTER TABLE {STATE_TABLE} ADD COLUMN "{column}" REAL')
+                self._columns.append(column)
+        # Every column merges, so one a piece lacks becomes unknown (NULL), as in combine_partials
+        updates = ", ".join(f'"{c}" = "{c}" + excluded."{c}"' if MERGE[c] == 'sum'
+                            else f'"{c}" = {MERGE[c]}("{c}", excluded."{c}")'
+                            for c in self._columns if c in MERGE)
+        frame = partials[columns].assign(Week=partials['Week'].dt.strftime('%Y-%m-%d'))
+        rows = frame.astype(object).where(frame.notna(), None).to_numpy().tolist()
+        names = ", ".join(f'"{c}"' for c in columns)
+        self._db.execute("BEGIN")
+        try:
+            self._db.executemany(
+                f'INSERT INTO {STATE_TABLE} ({names}) VALUES ({", ".join("?" * len(columns))}) '
+                f'ON CONFLICT (Ticker, Week) DO UPDATE SET {updates}', rows)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def has_ticker(self, ticker):
+        row = self._db.execute(f'SELECT 1 FROM {STATE_TABLE} WHERE Ticker = ? LIMIT 1', (ticker,)).fetchone()
+        return row is not None
+
+    def load(self, ticker, start=None):
+        """Return the state rows of a ticker from the week start on (all of them by default), oldest first."""
+        return self._load({ticker: start}).drop(columns=['Ticker'])
+
+    def _load(self, starts):
+        """State rows of the tickers in starts ({ticker: first week, or None for all}), by ticker and week."""
+        self._db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (Ticker TEXT PRIMARY KEY, Start TEXT)')
+        self._db.execute('DELETE FROM wanted')
+        self._db.executemany('INSERT INTO wanted VALUES (?, ?)',
+                             [(t, w.strftime('%Y-%m-%d') if w is not None else "") for t, w in starts.items()])
+        names = ", ".join(f's."{c}"' for c in self._columns)
+        state = pd.read_sql_query(
+            f'SELECT {names} FROM {STATE_TABLE} s JOIN wanted w ON s.Ticker = w.Ticker AND s.Week >= w.Start '
+            f'ORDER BY s.Ticker, s.Week', self._db)
+        state['Week'] = pd.to_datetime(state['Week'])
+        return state.astype({c: 'float64' for c in self._columns if c not in ('Ticker', 'Week', 'Count')})
+
+    def _seed_from_view(self, ticker, view):
+        # Outputs written before the store existed only carry mean and count;
+        # the spread of those weeks is unknown and stays NaN
+        old = pd.read_csv(view, parse_dates=['SQLDATE'])
+        old = old[old['Count'] > 0]
+        state = pd.DataFrame({
+            'Ticker': ticker,
+            'Week': old['SQLDATE'],
+            'Count': old['Count'],
+            'ToneSum': old['AvgTone'] * old['Count'],
+            'ToneSumSq': np.nan, 'ToneMin': np.nan, 'ToneMax': np.nan,
+        })
+        return combine_partials(state)[['Ticker'] + STATE_COLUMNS]
+
+    def clear(self):
+        """
+        Drop all state and all published output, e.g. before re-aggregating
+        the full history. Every CSV view goes, including those of tickers
+        without state (written before the store existed), since upsert would
+        otherwise read them back as seed state; the sink's own output
+        (Parquet dataset, SQLite table) is emptied as well. The emptied
+        store may then take either source.
+        """
+        self._db.execute(f'DELETE FROM {STATE_TABLE}')
+        self._db.execute("DELETE FROM store_meta WHERE key = 'source'")
+        for name in os.listdir(self.state_directory):
+            if name.endswith(".csv"):
+                os.remove(os.path.join(self.state_directory, name))
+        for path in glob.glob(os.path.join(glob.escape(self.output_directory), VIEW_PATTERN.format(ticker="*"))):
+            os.remove(path)
+        self.sink.clear()
+
+    def upsert(self, partials):
+        """
+        Merge partial aggregates (see partial_aggregates) into the store.
+        Only the weeks present in partials are merged, and only the tickers
+        present are republished. Returns the list of updated tickers.
+        """
+        if partials.empty:
+            return []
+        with METRICS.stage('upsert') as record:
+            record.rows_in = len(partials)
+            partials = combine_partials(partials)
+            record.rows_out = len(partials)  # distinct (ticker, week) rows
+            return self._upsert(partials)
+
+    def _upsert(self, partials):
+        # View rows are rebuilt from the earliest touched week on; None rebuilds the whole view
+        starts = partials.groupby('Ticker', sort=False)['Week'].min().to_dict()
+        seeds = []
+        for ticker in starts:
+            if not self.has_ticker(ticker) and os.path.exists(self.view_path(ticker)):
+                seeds.append(self._seed_from_view(ticker, self.view_path(ticker)))
+                starts[ticker] = None
+        self._merge(pd.concat(seeds + [partials], ignore_index=True))
+
+        # One query and one vectorized view for every touched ticker
+        state = self._load(starts)
+        views = self.view(state['Ticker'], state)
+        touched = state.set_index(['Ticker', 'Week']).index.isin(partials.set_index(['Ticker', 'Week']).index)
+        updated = []
+        for ticker, rows in views.groupby('Ticker', sort=False):
+            if starts[ticker] is None:
+                self.sink.replace(ticker, rows)
+            else:
+                self.sink.replace_from(ticker, rows, starts[ticker])
+            if self.events is not None:
+                self.events.publish(ticker, rows[touched[rows.index]])
+            updated.append(ticker)
+        self.sink.flush()
+        return updated
+
+    @staticmethod
+    def view(ticker, state):
+        """
+        Derive the published weekly rows (mean, count, std, min, max, then the
+        columns of any optional modes; see mode_views) from state. ticker is
+        one name or a Series aligned with state.
+        """
+        count = state['Count'].astype('float64')
+        mean = state['ToneSum'] / count
+        var = (state['ToneSumSq'] - state['ToneSum'] ** 2 / count) / (count - 1)
+        view = pd.DataFrame({
+            'SQLDATE': state['Week'],
+            'Ticker': ticker,
+            'AvgTone': mean,
+            'Count': state['Count'].astype('int64'),
+            'ToneStd': np.sqrt(var.clip(lower=0).where(count > 1)),
+            'ToneMin': state['ToneMin'],
+            'ToneMax': state['ToneMax'],
+        })[VIEW_COLUMNS]
+        return pd.concat([view, mode_views(state)], axis=1)
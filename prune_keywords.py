@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from pipeline.keywords import load_enriched_keywords
+from pipeline.pruning import (MAX_SHARE, MAX_TICKERS, MIN_ALIAS_HITS, MIN_HITS, MIN_LENGTH, matched_mentions,
+                              prune_keywords, sample_name_counts, write_keywords)
+from pipeline.reader import list_export_files
+
+csv_directory = os.path.join(SCRIPT_DIR, "zips")
+enriched_keywords_file = os.path.join(SCRIPT_DIR, "enriched_keywords.txt")
+# Used by the filters instead of enriched_keywords.txt while it is the newer of the two
+pruned_keywords_file = os.path.join(SCRIPT_DIR, "pruned_keywords.txt")
+# Every keyword with its hits, ambiguity and what happened to it
+report_file = os.path.join(SCRIPT_DIR, "keyword_report.csv")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drop junk keywords from enriched_keywords.txt, scored against recent exports.")
+    parser.add_argument("--sample", type=int, default=7, help="number of most recent exports to score against")
+    parser.add_argument("--min-length", type=int, default=MIN_LENGTH, help="shortest keyword kept")
+    parser.add_argument("--max-share", type=float, default=MAX_SHARE,
+                        help="largest share of sampled actor names a keyword may match")
+    parser.add_argument("--max-tickers", type=int, default=MAX_TICKERS,
+                        help="most tickers that may list the same keyword")
+    parser.add_argument("--min-hits", type=int, default=MIN_HITS,
+                        help="fewest sampled hits a single-word keyword needs (default keeps unseen ones, flagged)")
+    parser.add_argument("--min-alias-hits", type=int, default=MIN_ALIAS_HITS,
+                        help="fewest sampled hits a multi-word alias needs")
+    args = parser.parse_args()
+
+    enriched = load_enriched_keywords(enriched_keywords_file)
+    sample = [os.path.join(csv_directory, f) for f in list_export_files(csv_directory)[-args.sample:]]
+    if not sample:
+        print(f"No exports in {csv_directory} to score keywords against")
+        return
+    print(f"Scoring keywords against {len(sample)} exports ({os.path.basename(sample[0])} .. "
+          f"{os.path.basename(sample[-1])})")
+    name_counts, total = sample_name_counts(sample)
+
+    pruned, report = prune_keywords(enriched, name_counts, total, args.min_length, args.max_share,
+                                    args.max_tickers, args.min_hits, args.min_alias_hits)
+    write_keywords(pruned, pruned_keywords_file)
+    report.to_csv(report_file, index=False)
+
+    actions = report['Action'].value_counts()
+    print(f"{len(report)} keywords: {actions.get('keep', 0)} kept, {actions.get('flag', 0)} flagged, "
+          f"{actions.get('drop', 0)} dropped")
+    print(report[report['Action'] == 'drop']['Reason'].value_counts().to_string())
+    for label, keywords in (("before", enriched), ("after", pruned)):
+        mentions, pairs = matched_mentions(keywords, name_counts)
+        print(f"Matched {label}: {mentions} of {total} actor mentions, {pairs} (mention, ticker) pairs")
+    print(f"Pruned keywords saved to {pruned_keywords_file}, report in {report_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, REPO_ROOT)
+
+
+class StaticServer:
+    """Local HTTP server for the download tests: serves files (path -> bytes), 404 for anything else."""
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                body = server.files.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/"
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def http_server():
+    server = StaticServer()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def repo_copy(tmp_path):
+    """The pipeline package and the filter scripts copied into tmp_path, so scripts write their files there."""
+    ignore = shutil.ignore_patterns("__pycache__")
+    for name in ("pipeline", "filters"):
+        shutil.copytree(os.path.join(REPO_ROOT, name), tmp_path / name, ignore=ignore)
+    (tmp_path / "zips").mkdir()
+    return tmp_path
+
+
+def run_script(root, script, *args):
+    """Run one of the copied scripts; returns its output (raises if it exits with an error)."""
+    result = subprocess.run([sys.executable, str(root / script), *args], capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return result.stdout
@@ -0,0 +1,124 @@
+import importlib.util
+import io
+import json
+import os
+import shutil
+import zipfile
+
+import pandas as pd
+import pytest
+
+from conftest import REPO_ROOT
+from pipeline.sink import make_sink
+from pipeline.weekly import VIEW_PATTERN, WeeklyStore, partial_aggregates
+
+# Needs fastapi and httpx
+TestClient = pytest.importorskip("fastapi.testclient").TestClient
+
+# (ticker, SQLDATE, AvgTone) events: AAPL has 6 events in the week ending 2025-01-12, MSFT 5, TSLA 2
+EVENTS = (
+    [('AAPL', 20250106, -3.0)] * 3 + [('AAPL', 20250107, -1.0)] * 3 + [('AAPL', 20250113, 1.0)] * 2 +
+    [('MSFT', 20250108, 2.0)] * 5 +
+    [('TSLA', 20250109, -8.0)] * 2
+)
+
+
+def load_api(root, output_format):
+    """Write the weekly outputs into root/company_outputs and import a copy of fastApi/main.py serving them."""
+    pairs = pd.DataFrame(EVENTS, columns=['Ticker', 'SQLDATE', 'AvgTone'])
+    pairs['AvgTone'] = pairs['AvgTone'].astype('float32')
+    output_directory = str(root / "company_outputs")
+    sink = make_sink(output_format, output_directory, VIEW_PATTERN, "weekly_news")
+    WeeklyStore(str(root / "aggregate_store"), output_directory, sink).upsert(partial_aggregates(pairs))
+
+    (root / "fastApi").mkdir()
+    shutil.copy(os.path.join(REPO_ROOT, "fastApi", "main.py"), root / "fastApi" / "main.py")
+    spec = importlib.util.spec_from_file_location(f"api_{output_format}", root / "fastApi" / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def client(request, tmp_path):
+    api = load_api(tmp_path, request.param)
+    with TestClient(api.app) as client:
+        client.output_format = request.param
+        yield client
+
+
+def test_sentiment_of_one_ticker(client):
+    body = client.get("/sentiment/AAPL").json()
+    assert body['ticker'] == 'AAPL'
+    assert [row['SQLDATE'] for row in body['rows']] == ['2025-01-12', '2025-01-19']
+    assert [row['Count'] for row in body['rows']] == [6, 2]
+    assert body['rows'][0]['AvgTone'] == pytest.approx(-2.0)
+
+    rows = client.get("/sentiment/AAPL", params={'start': '20250113', 'fields': 'SQLDATE,Count'}).json()['rows']
+    assert rows == [{'SQLDATE': '2025-01-19', 'Count': 2}]
+
+
+def test_sentiment_errors(client):
+    assert client.get("/sentiment/NOPE").status_code == 404
+    assert client.get("/sentiment/AAPL", params={'fields': 'Nope'}).status_code == 400
+    assert client.get("/sentiment/AAPL", params={'start': 'yesterday'}).status_code == 400
+    assert client.get("/sentiment", params={'tickers': 'AAPL,NOPE'}).status_code == 404
+
+
+def test_sentiment_of_several_tickers_as_csv(client):
+    response = client.get("/sentiment", params={'tickers': 'MSFT,AAPL', 'format': 'csv', 'fields': 'AvgTone'})
+    df = pd.read_csv(io.StringIO(response.text))
+    assert df.columns.tolist() == ['Ticker', 'AvgTone']
+    assert df['Ticker'].tolist() == ['MSFT', 'AAPL', 'AAPL']
+
+
+def test_bulk_ndjson_and_zip(client):
+    lines = client.get("/bulk", params={'format': 'ndjson', 'since': '2025-01-13'}).text.splitlines()
+    assert [json.loads(line)['Ticker'] for line in lines] == ['AAPL']
+
+    archive = zipfile.ZipFile(io.BytesIO(client.get("/bulk", params={'tickers': 'AAPL,TSLA'}).content))
+    assert archive.namelist() == ['weekly_AAPL_news.csv', 'weekly_TSLA_news.csv']
+    assert pd.read_csv(archive.open('weekly_AAPL_news.csv'))['Count'].tolist() == [6, 2]
+    assert client.get("/bulk", params={'tickers': 'NOPE'}).status_code == 404
+
+
+def test_file_download(client):
+    response = client.get("/file/AAPL")
+    assert response.status_code == 200
+    assert pd.read_csv(io.StringIO(response.text))['Count'].tolist() == [6, 2]
+    assert client.get("/file/NOPE").status_code == 404
+    if client.output_format == "csv":
+        again = client.get("/file/AAPL", headers={'If-None-Match': response.headers['ETag']})
+        assert again.status_code == 304
+
+
+def test_tone_rank_uses_the_same_floor_as_rank(client):
+    # TSLA has 2 events that week, below the default min_count of 5
+    rows = client.get("/tone/rank", params={'week': '2025-01-12'}).json()['rows']
+    assert [row['ticker'] for row in rows] == ['AAPL', 'MSFT']
+    rows = client.get("/tone/rank", params={'week': '2025-01-12', 'min_count': 1}).json()['rows']
+    assert [row['ticker'] for row in rows] == ['TSLA', 'AAPL', 'MSFT']
+
+    response = client.get("/rank", params={'week': '2025-01-12'})
+    if client.output_format == "csv":
+        assert response.status_code == 404  # /rank reads the SQLite output only
+    else:
+        assert [row['Ticker'] for row in response.json()['rows']] == ['AAPL', 'MSFT']
+
+
+def test_list_and_metrics(client):
+    listing = client.get("/list").json()
+    if client.output_format == "csv":
+        assert listing['total'] == 3
+    assert 'api_requests_total' in client.get("/metrics").text
+
+
+def test_week_and_weekly_read_the_database(client):
+    if client.output_format != "sqlite":
+        assert client.get("/week").status_code == 404
+        return
+    rows = client.get("/week", params={'week': '20250112'}).json()['rows']
+    assert [row['Ticker'] for row in rows] == ['AAPL', 'MSFT', 'TSLA']
+    rows = client.get("/weekly/AAPL").json()['rows']
+    assert [row['Count'] for row in rows] == [6, 2]
+    assert rows[0]['AvgTone'] == pytest.approx(-2.0)
@@ -0,0 +1,91 @@
+import hashlib
+import os
+
+import pytest
+
+from pipeline.downloader import (ChecksumError, DownloadState, download_many, download_to_file, load_manifest,
+                                 make_session)
+
+BODY = b"GLOBALEVENTID\tSQLDATE\n" * 1000
+
+
+def expected(body):
+    return {"size": len(body), "md5": hashlib.md5(body).hexdigest()}
+
+
+def serve_manifest(server, files):
+    """Publish md5sums and filesizes listings for files ({name: body}) like GDELT does."""
+    server.files["/md5sums"] = "".join(f"{hashlib.md5(b).hexdigest()} {n}\n" for n, b in files.items()).encode()
+    server.files["/filesizes"] = "".join(f"{len(b)} {n}\n" for n, b in files.items()).encode()
+
+
+@pytest.fixture
+def session():
+    with make_session(retries=0) as session:
+        yield session
+
+
+@pytest.mark.parametrize("served", [BODY[:-100], BODY[:-1] + b"x"], ids=["truncated", "corrupt"])
+def test_bad_download_is_rejected(http_server, session, tmp_path, served):
+    http_server.files["/20250101.export.CSV.zip"] = served
+    target = tmp_path / "20250101000000.export.CSV.zip"
+
+    with pytest.raises(ChecksumError):
+        download_to_file(session, http_server.base_url + "20250101.export.CSV.zip", str(target), expected(BODY))
+
+    assert not target.exists()
+    assert not os.path.exists(f"{target}.part")
+
+
+def test_stale_part_file_is_replaced(http_server, session, tmp_path):
+    http_server.files["/20250101.export.CSV.zip"] = BODY
+    target = tmp_path / "20250101000000.export.CSV.zip"
+    # Left behind by a run that was killed mid-download
+    (tmp_path / "20250101000000.export.CSV.zip.part").write_bytes(BODY[:10])
+
+    assert download_to_file(session, http_server.base_url + "20250101.export.CSV.zip", str(target), expected(BODY))
+
+    assert target.read_bytes() == BODY
+    assert not os.path.exists(f"{target}.part")
+
+
+def test_valid_file_is_not_downloaded_again(http_server, session, tmp_path):
+    target = tmp_path / "20250101000000.export.CSV.zip"
+    target.write_bytes(BODY)
+
+    assert download_to_file(session, http_server.base_url + "20250101.export.CSV.zip", str(target), expected(BODY))
+    assert http_server.requests == []
+
+
+def test_missing_file_is_reported_as_not_found(http_server, session, tmp_path):
+    target = tmp_path / "20250101000000.export.CSV.zip"
+    assert download_to_file(session, http_server.base_url + "20250101.export.CSV.zip", str(target)) is False
+    assert not target.exists()
+
+
+def test_backfill_resumes_after_a_rejected_file(http_server, session, tmp_path):
+    days = {f"2025010{d}.export.CSV.zip": BODY + str(d).encode() for d in range(1, 5)}
+    serve_manifest(http_server, days)
+    http_server.files.update({f"/{name}": body for name, body in days.items()})
+    http_server.files["/20250103.export.CSV.zip"] = days["20250103.export.CSV.zip"][:-5]
+    jobs = [(name[:8], http_server.base_url + name, str(tmp_path / name)) for name in days]
+    state = DownloadState(str(tmp_path / "downloaded_files.txt"))
+
+    manifest = load_manifest(session, http_server.base_url)
+    results = download_many(jobs, state, workers=2, session=session, manifest=manifest)
+
+    assert results == {"20250101": True, "20250102": True, "20250103": None, "20250104": True}
+    assert not (tmp_path / "20250103.export.CSV.zip").exists()
+
+    # The next run (with the server fixed) fetches only the rejected day
+    http_server.files["/20250103.export.CSV.zip"] = days["20250103.export.CSV.zip"]
+    http_server.requests.clear()
+    state = DownloadState(str(tmp_path / "downloaded_files.txt"))
+
+    manifest = load_manifest(session, http_server.base_url)
+    results = download_many(jobs, state, workers=2, session=session, manifest=manifest)
+
+    assert results == {"20250103": True}
+    assert [p for p in http_server.requests if p.endswith(".zip")] == ["/20250103.export.CSV.zip"]
+    for name, body in days.items():
+        assert (tmp_path / name).read_bytes() == body
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from pipeline.enrichment import RateLimiter, ResponseCache, WikidataClient, enrich, expand_keywords
+from wikidata_stub import start_stub
+
+
+@pytest.fixture
+def wikidata():
+    """The local Wikidata stand-in; yields (api_url, handler class counting the requests served)."""
+    server, api_url = start_stub(latency=0)
+    yield api_url, server.RequestHandlerClass
+    server.shutdown()
+    server.server_close()
+
+
+def test_cache_hit_makes_no_request(wikidata, tmp_path):
+    api_url, handler = wikidata
+    first = WikidataClient(api_url, ResponseCache(str(tmp_path)), rate=0).aliases("Apple Inc.")
+    assert handler.requests_served == 1
+
+    client = WikidataClient(api_url, ResponseCache(str(tmp_path)), rate=0)
+    assert client.aliases("Apple Inc.") == first
+    assert (client.requests_made, client.cache_hits) == (0, 1)
+    assert handler.requests_served == 1
+
+
+def test_expired_cache_entry_is_fetched_again(wikidata, tmp_path):
+    api_url, handler = wikidata
+    WikidataClient(api_url, ResponseCache(str(tmp_path)), rate=0).aliases("Apple Inc.")
+
+    client = WikidataClient(api_url, ResponseCache(str(tmp_path), ttl=-1), rate=0)
+    client.aliases("Apple Inc.")
+    assert (client.requests_made, client.cache_hits) == (1, 0)
+    assert handler.requests_served == 2
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    limiter = RateLimiter(rate=20)
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.wait) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Six calls are five intervals of 1/20 s apart
+    assert time.monotonic() - start >= 0.25 - 0.01
+
+
+def test_keywords_are_deduplicated_in_order():
+    line = expand_keywords("Apple Inc.", "AAPL", ["Apple Inc.", "Apple", "iPhone", "Apple Inc"])
+    assert line.split(":") == [
+        "Apple Inc.", "AAPL",
+        "Apple Inc.", "AAPL", "AppleInc.", "Apple", "apple inc.", "APPLE INC.",
+        "iPhone", "Apple Inc", "MacBook", "Tim Cook",
+    ]
+
+
+def test_enrich_reuses_existing_lines_and_keeps_order(wikidata, tmp_path):
+    api_url, handler = wikidata
+    companies = [("Microsoft", "MSFT"), ("Apple Inc.", "AAPL"), ("Tesla, Inc.", "TSLA")]
+    existing = {"AAPL": ("Apple Inc.", "Apple Inc.:AAPL:kept as is"),
+                "TSLA": ("Tesla Motors", "Tesla Motors:TSLA:renamed since")}
+    client = WikidataClient(api_url, ResponseCache(str(tmp_path)), rate=0)
+
+    lines, looked_up = enrich(companies, client, existing, workers=2)
+
+    assert looked_up == 2
+    assert handler.requests_served == 2
+    assert [line.split(":")[1] for line in lines] == ["MSFT", "AAPL", "TSLA"]
+    assert lines[1] == "Apple Inc.:AAPL:kept as is"
+    assert lines[2].startswith("Tesla, Inc.:TSLA:Tesla, Inc.:TSLA:")
@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.synthetic import export_name, synthetic_export, write_export
+from conftest import run_script
+
+SCRIPT = "filters/500_GDELT_fetcherV3.py"
+
+
+@pytest.fixture
+def exports(repo_copy):
+    (repo_copy / "enriched_keywords.txt").write_text("Apple Inc:AAPL:apple inc\n")
+    for day in (20250106, 20250108):
+        write_export(synthetic_export(500, ["APPLE INC"], company_share=0.2, day=day, seed=day),
+                     str(repo_copy / "zips" / export_name(day)))
+    return repo_copy
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_rejected_file_does_not_advance_last_processed_week(exports, workers):
+    with open(exports / "zips" / "20250107.export.CSV", "w") as f:
+        f.write("not\ta\tgdelt export\n")
+
+    output = run_script(exports, SCRIPT, "--workers", workers)
+
+    assert "Stopping before 20250107" in output
+    assert (exports / "last_processed_week.txt").read_text() == "20250106"
+    # Only the first day is in the outputs; the one after the gap waits for the next run
+    weekly = (exports / "company_outputs" / "weekly_AAPL_news.csv").read_text().splitlines()
+    assert len(weekly) == 2 and weekly[1].startswith("2025-01-12,AAPL,")
+    count_first_day = int(weekly[1].split(",")[3])
+
+    # Once the file is replaced, the next run picks up where the last one stopped
+    write_export(synthetic_export(500, ["APPLE INC"], day=20250107, seed=7),
+                 str(exports / "zips" / "20250107.export.CSV"))
+    run_script(exports, SCRIPT, "--workers", workers)
+    assert (exports / "last_processed_week.txt").read_text() == "20250108"
+    weekly = (exports / "company_outputs" / "weekly_AAPL_news.csv").read_text().splitlines()
+    assert int(weekly[1].split(",")[3]) > count_first_day
@@ -0,0 +1,92 @@
+import hashlib
+import importlib.util
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import REPO_ROOT
+from pipeline.downloader import TIMESTAMP_FORMAT, make_session
+
+
+@pytest.fixture(scope="module")
+def fetcher():
+    """fetcher/GDELT.py, which is a script rather than a package module."""
+    spec = importlib.util.spec_from_file_location("gdelt_fetcher", os.path.join(REPO_ROOT, "fetcher", "GDELT.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def slice_names(start, count):
+    return [(start + timedelta(minutes=15 * i)).strftime(TIMESTAMP_FORMAT) for i in range(count)]
+
+
+def publish(server, names, missing=()):
+    """Serve a slice for every name except those in missing, announcing the last one in lastupdate.txt."""
+    for name in names:
+        if name not in missing:
+            server.files[f"/{name}.export.CSV.zip"] = f"slice {name}".encode()
+    latest = server.files[f"/{names[-1]}.export.CSV.zip"]
+    server.files["/lastupdate.txt"] = (
+        f"{len(latest)} {hashlib.md5(latest).hexdigest()} {server.base_url}{names[-1]}.export.CSV.zip\n").encode()
+
+
+@pytest.fixture
+def slice_paths(tmp_path):
+    last_slice_file = tmp_path / "last_downloaded_slice.txt"
+    return str(last_slice_file), str(tmp_path / "zips_v2"), str(tmp_path / "missing_slices.txt")
+
+
+def run(fetcher, server, slice_paths):
+    last_slice_file, slice_folder, missing_file = slice_paths
+    with make_session() as session:
+        return fetcher.download_new_slices(session, server.base_url, last_slice_file, slice_folder, missing_file)
+
+
+def test_slices_come_back_in_time_order(fetcher, http_server, slice_paths):
+    names = slice_names(datetime(2025, 1, 1), 6)
+    publish(http_server, names)
+    with open(slice_paths[0], "w") as f:
+        f.write(names[0])
+
+    downloaded = run(fetcher, http_server, slice_paths)
+
+    assert [os.path.basename(p)[:14] for p in downloaded] == names[1:]
+    with open(slice_paths[0]) as f:
+        assert f.read() == names[-1]
+
+
+def test_unpublished_slice_in_the_middle_is_skipped(fetcher, http_server, slice_paths):
+    names = slice_names(datetime(2025, 1, 1), 6)
+    publish(http_server, names, missing={names[3]})
+    with open(slice_paths[0], "w") as f:
+        f.write(names[0])
+
+    downloaded = run(fetcher, http_server, slice_paths)
+
+    assert [os.path.basename(p)[:14] for p in downloaded] == [names[1], names[2], names[4], names[5]]
+    with open(slice_paths[0]) as f:
+        assert f.read() == names[-1]
+    with open(slice_paths[2]) as f:
+        assert f.read().split() == [names[3]]
+    # Nothing is fetched again on the next poll
+    assert run(fetcher, http_server, slice_paths) == []
+
+
+def test_latest_slice_not_served_yet_is_retried(fetcher, http_server, slice_paths):
+    names = slice_names(datetime(2025, 1, 1), 4)
+    publish(http_server, names)
+    del http_server.files[f"/{names[-1]}.export.CSV.zip"]
+    with open(slice_paths[0], "w") as f:
+        f.write(names[0])
+
+    downloaded = run(fetcher, http_server, slice_paths)
+
+    assert [os.path.basename(p)[:14] for p in downloaded] == names[1:3]
+    with open(slice_paths[0]) as f:
+        assert f.read() == names[2]
+    assert not os.path.exists(slice_paths[2])
+
+    publish(http_server, names)
+    assert [os.path.basename(p)[:14] for p in run(fetcher, http_server, slice_paths)] == [names[-1]]
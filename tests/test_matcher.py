@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.matcher import KeywordMatcher
+from pipeline.name_index import NameIndex
+
+ENRICHED = {
+    'AAPL': {'company': 'Apple', 'keywords': ['Apple', 'Tim Cook']},
+    'MSFT': {'company': 'Microsoft', 'keywords': ['Microsoft', 'Xbox']},
+    # Overlaps Apple: "apple" is a substring of "Pineapple"
+    'DOLE': {'company': 'Dole', 'keywords': ['Pineapple', 'Dole']},
+}
+ACTORS = ['Actor1Name', 'Actor2Name']
+
+
+def events():
+    return pd.DataFrame({
+        'Actor1Name': ['APPLE', 'POLICE', None, 'PINEAPPLE FARM', 'MICROSOFT', 'TIM COOK'],
+        'Actor2Name': ['MICROSOFT', None, 'xbox fans', 'POLICE', 'MICROSOFT', None],
+        'AvgTone': np.arange(6, dtype='float32'),
+    }, index=[10, 11, 12, 13, 14, 15])
+
+
+def expected_pairs(df, enriched):
+    """The original per-ticker rule: a keyword of the ticker is a substring of any actor column."""
+    pairs = set()
+    for label, row in df.iterrows():
+        for ticker, info in enriched.items():
+            texts = [str(row[c]).lower() for c in ACTORS if row[c] is not None]
+            if any(kw.lower() in text for kw in info['keywords'] for text in texts):
+                pairs.add((label, ticker))
+    return pairs
+
+
+def test_match_is_case_insensitive_and_in_keyword_file_order():
+    matcher = KeywordMatcher(ENRICHED)
+    assert matcher.match("The PINEAPPLE growers") == ('AAPL', 'DOLE')
+    assert matcher.match("nothing here") == ()
+
+
+def test_first_match_takes_the_first_ticker_of_any_column():
+    result = KeywordMatcher(ENRICHED).first_match(events(), ACTORS)
+
+    assert result.index.tolist() == events().index.tolist()
+    assert result.tolist() == ['AAPL', None, 'MSFT', 'AAPL', 'MSFT', 'AAPL']
+
+
+def test_all_matches_returns_each_event_ticker_pair_once():
+    df = events()
+    result = KeywordMatcher(ENRICHED).all_matches(df, ACTORS, columns=['AvgTone'])
+
+    assert list(result.columns) == ['AvgTone', 'Ticker']
+    assert set(zip(result.index, result['Ticker'])) == expected_pairs(df, ENRICHED)
+    # MICROSOFT in both columns of row 14 is still one pair
+    assert len(result) == len(expected_pairs(df, ENRICHED))
+    assert result.loc[14, 'AvgTone'] == 4.0
+
+
+def test_no_match_gives_empty_results():
+    df = events().iloc[[1]]
+    matcher = KeywordMatcher(ENRICHED)
+
+    assert matcher.first_match(df, ACTORS).isna().all()
+    assert matcher.all_matches(df, ACTORS).empty
+
+
+@pytest.mark.parametrize("method", ["first_match", "all_matches"])
+def test_name_index_gives_the_same_matches(method):
+    df = events()
+    plain = getattr(KeywordMatcher(ENRICHED), method)(df, ACTORS)
+    index = NameIndex("fingerprint")
+    first = getattr(KeywordMatcher(ENRICHED, index), method)(df, ACTORS)
+    again = getattr(KeywordMatcher(ENRICHED, index), method)(df, ACTORS)
+
+    assert first.equals(plain)
+    # Second pass answered from the index
+    assert again.equals(plain)
+    assert index.stats()['hits'] > 0
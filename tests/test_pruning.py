@@ -0,0 +1,31 @@
+import pandas as pd
+
+from pipeline.pruning import prune_keywords
+
+
+def report_row(report, keyword):
+    return report[report['Keyword'] == keyword].iloc[0]
+
+
+def test_default_run_drops_unseen_aliases_and_flags_unseen_words():
+    enriched = {'ASML': {'company': 'ASML Holding',
+                         'keywords': ['ASML Holding', 'ASML', 'Faculty of Mechanical Engineering',
+                                      'ditrigonal pyramidal', 'Veldhoven', 'lithography systems']}}
+    name_counts = pd.Series({'ASML': 40, 'ASML HOLDING NV': 3, 'LITHOGRAPHY SYSTEMS MAKER': 2, 'POLICE': 5000})
+    # Out of a million sampled mentions, so none of them is too frequent
+    pruned, report = prune_keywords(enriched, name_counts, 1_000_000)
+
+    assert pruned['ASML']['keywords'] == ['ASML', 'Veldhoven', 'lithography systems']
+    for junk in ['Faculty of Mechanical Engineering', 'ditrigonal pyramidal']:
+        assert report_row(report, junk)[['Action', 'Reason']].tolist() == ['drop', 'unseen']
+    # Single words are kept when unseen, but listed for review
+    assert report_row(report, 'Veldhoven')[['Action', 'Reason']].tolist() == ['flag', 'unseen']
+    assert report_row(report, 'lithography systems')['Action'] == 'keep'
+
+
+def test_thresholds_can_be_relaxed():
+    enriched = {'ASML': {'company': 'ASML Holding', 'keywords': ['ASML', 'ditrigonal pyramidal']}}
+    name_counts = pd.Series({'ASML': 40})
+    pruned, _ = prune_keywords(enriched, name_counts, 1_000_000, min_alias_hits=0)
+
+    assert pruned['ASML']['keywords'] == ['ASML', 'ditrigonal pyramidal']
@@ -0,0 +1,54 @@
+import pytest
+
+from benchmarks.synthetic import synthetic_export, write_export
+from pipeline.reader import export_headers, load_export
+from pipeline.schema import HEADERS, V1_HEADERS
+
+COLUMNS = ['SQLDATE', 'Actor1Name', 'AvgTone', 'SOURCEURL']
+ENGINES = ['pyarrow', 'c']
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("version, headers", [(1, V1_HEADERS), (2, HEADERS)], ids=["v1", "v2"])
+def test_layout_is_detected_from_the_first_line(tmp_path, engine, version, headers):
+    df = synthetic_export(200, ["APPLE INC"], version=version)
+    path = str(tmp_path / "20250101.export.CSV.zip")
+    write_export(df, path)
+
+    assert export_headers(path) == headers
+    loaded = load_export(path, COLUMNS, engine=engine)
+    assert len(loaded) == 200
+    assert loaded['SOURCEURL'].tolist() == df['SOURCEURL'].tolist()
+    assert loaded['AvgTone'].to_numpy().tolist() == pytest.approx(df['AvgTone'].tolist(), rel=1e-6)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_wrong_width_lines_are_skipped(tmp_path, engine, capsys):
+    v1 = synthetic_export(50, version=1).to_csv(sep='\t', header=False, index=False)
+    v2 = synthetic_export(3, version=2).to_csv(sep='\t', header=False, index=False)
+    path = tmp_path / "20250101.export.CSV"
+    path.write_text(v1 + v2)
+
+    assert len(load_export(str(path), COLUMNS, engine=engine)) == 50
+    assert "Skipped 3 lines" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_fully_rejected_file_raises(tmp_path, engine):
+    # One 58-field line sets the layout; everything after it has 61
+    v1 = synthetic_export(1, version=1).to_csv(sep='\t', header=False, index=False)
+    v2 = synthetic_export(20, version=2).to_csv(sep='\t', header=False, index=False)
+    path = tmp_path / "20250101.export.CSV"
+    path.write_text(v1 + v2)
+    assert len(load_export(str(path), COLUMNS, engine=engine)) == 1
+
+    path.write_text("a\tb\tc\n1\t2\t3\n")
+    with pytest.raises(ValueError):
+        load_export(str(path), COLUMNS, engine=engine)
+
+
+def test_missing_column_of_the_layout_raises(tmp_path):
+    path = str(tmp_path / "20250101.export.CSV")
+    write_export(synthetic_export(10, version=1), path)
+    with pytest.raises(ValueError):
+        load_export(path, ['SQLDATE', 'ActionGeo_ADM2Code'])
@@ -0,0 +1,125 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from pipeline.sink import make_sink
+
+PATTERN = "weekly_{ticker}_news.csv"
+
+
+def weeks(ticker, dates, tones):
+    return pd.DataFrame({'SQLDATE': pd.to_datetime(dates), 'Ticker': ticker, 'AvgTone': tones})
+
+
+def read(sink, output_format, ticker):
+    """What the sink has written for ticker, oldest week first (empty if nothing yet)."""
+    if output_format == "sqlite":
+        with sqlite3.connect(sink.database_path) as db:
+            if not db.execute("SELECT 1 FROM sqlite_master WHERE name = 'weekly_news'").fetchone():
+                return pd.DataFrame(columns=['SQLDATE', 'Ticker', 'AvgTone'])
+            df = pd.read_sql_query('SELECT SQLDATE, Ticker, AvgTone FROM weekly_news WHERE Ticker = ?', db,
+                                   params=(ticker,), parse_dates=['SQLDATE'])
+    elif not os.path.exists(sink.path(ticker)):
+        return pd.DataFrame(columns=['SQLDATE', 'Ticker', 'AvgTone'])
+    elif output_format == "csv":
+        df = pd.read_csv(sink.path(ticker), parse_dates=['SQLDATE'])
+    else:
+        df = pd.read_parquet(sink.path(ticker)).assign(Ticker=ticker)
+    return df[['SQLDATE', 'Ticker', 'AvgTone']].sort_values('SQLDATE').reset_index(drop=True)
+
+
+@pytest.fixture(params=["csv", "parquet", "sqlite"])
+def output_format(request):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    return request.param
+
+
+@pytest.fixture
+def sink(tmp_path, output_format):
+    return make_sink(output_format, str(tmp_path), PATTERN, "weekly_news")
+
+
+def test_nothing_is_written_before_flush(sink, output_format):
+    sink.append('AAPL', weeks('AAPL', ['2025-01-05'], [1.0]))
+    assert read(sink, output_format, 'AAPL').empty
+
+    assert sink.flush() == {'AAPL': 1}
+    assert read(sink, output_format, 'AAPL')['AvgTone'].tolist() == [1.0]
+    assert sink.flush() == {}
+
+
+def test_appends_accumulate(sink, output_format):
+    sink.append('AAPL', weeks('AAPL', ['2025-01-05'], [1.0]))
+    sink.append('AAPL', weeks('AAPL', ['2025-01-12'], [2.0]))
+    sink.flush()
+    sink.append('AAPL', weeks('AAPL', ['2025-01-19'], [3.0]))
+    sink.append('MSFT', weeks('MSFT', ['2025-01-19'], [9.0]))
+
+    assert sink.flush() == {'AAPL': 1, 'MSFT': 1}
+    assert read(sink, output_format, 'AAPL')['AvgTone'].tolist() == [1.0, 2.0, 3.0]
+    assert read(sink, output_format, 'MSFT')['AvgTone'].tolist() == [9.0]
+
+
+def test_replace_overwrites_a_ticker(sink, output_format):
+    sink.append('AAPL', weeks('AAPL', ['2025-01-05', '2025-01-12'], [1.0, 2.0]))
+    sink.append('MSFT', weeks('MSFT', ['2025-01-05'], [9.0]))
+    sink.flush()
+    sink.replace('AAPL', weeks('AAPL', ['2025-01-12'], [5.0]))
+    sink.flush()
+
+    assert read(sink, output_format, 'AAPL')['AvgTone'].tolist() == [5.0]
+    assert read(sink, output_format, 'MSFT')['AvgTone'].tolist() == [9.0]
+
+
+def test_replace_from_keeps_the_earlier_weeks(sink, output_format):
+    sink.replace('AAPL', weeks('AAPL', ['2025-01-05', '2025-01-12', '2025-01-19'], [1.0, 2.0, 3.0]))
+    sink.flush()
+    start = pd.Timestamp('2025-01-12')
+    sink.replace_from('AAPL', weeks('AAPL', ['2025-01-12', '2025-01-19', '2025-01-26'], [20.0, 30.0, 40.0]), start)
+    sink.flush()
+
+    result = read(sink, output_format, 'AAPL')
+    assert result['SQLDATE'].dt.strftime('%Y-%m-%d').tolist() == ['2025-01-05', '2025-01-12', '2025-01-19',
+                                                                   '2025-01-26']
+    assert result['AvgTone'].tolist() == [1.0, 20.0, 30.0, 40.0]
+
+
+def test_buffered_replace_from_calls_are_merged(sink, output_format):
+    sink.replace('AAPL', weeks('AAPL', ['2025-01-05', '2025-01-12'], [1.0, 2.0]))
+    sink.flush()
+    # Three upserts before one flush: the second starts earlier than the first, the third later
+    sink.replace_from('AAPL', weeks('AAPL', ['2025-01-12'], [20.0]), pd.Timestamp('2025-01-12'))
+    sink.replace_from('AAPL', weeks('AAPL', ['2025-01-05', '2025-01-12'], [10.0, 20.0]), pd.Timestamp('2025-01-05'))
+    sink.replace_from('AAPL', weeks('AAPL', ['2025-01-19'], [30.0]), pd.Timestamp('2025-01-19'))
+    sink.flush()
+
+    assert read(sink, output_format, 'AAPL')['AvgTone'].tolist() == [10.0, 20.0, 30.0]
+
+
+def test_clear_drops_buffers_and_output(sink, output_format):
+    sink.append('AAPL', weeks('AAPL', ['2025-01-05'], [1.0]))
+    sink.flush()
+    sink.append('MSFT', weeks('MSFT', ['2025-01-05'], [9.0]))
+    sink.clear()
+
+    assert sink.flush() == {}
+    assert read(sink, output_format, 'AAPL').empty
+    assert read(sink, output_format, 'MSFT').empty
+
+
+def test_csv_replace_from_with_other_columns_rewrites_the_file(tmp_path):
+    sink = make_sink("csv", str(tmp_path), PATTERN, "weekly_news")
+    sink.replace('AAPL', weeks('AAPL', ['2025-01-05', '2025-01-12'], [1.0, 2.0]))
+    sink.flush()
+    # A mode enabled later adds a column; the old rows get it empty
+    sink.replace_from('AAPL', weeks('AAPL', ['2025-01-12'], [20.0]).assign(GoldsteinMean=0.5),
+                      pd.Timestamp('2025-01-12'))
+    sink.flush()
+
+    result = pd.read_csv(sink.path('AAPL'))
+    assert result.columns.tolist() == ['SQLDATE', 'Ticker', 'AvgTone', 'GoldsteinMean']
+    assert result['AvgTone'].tolist() == [1.0, 20.0]
+    assert result['GoldsteinMean'].isna().tolist() == [True, False]
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.sink import _offset_from
+from pipeline.weekly import WeeklyStore, combine_partials, partial_aggregates
+
+
+def pairs(ticker, days, tones):
+    """(row, ticker) pairs as match_export yields them."""
+    return pd.DataFrame({'SQLDATE': days, 'AvgTone': np.array(tones, dtype='float32'), 'Ticker': ticker})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return WeeklyStore(str(tmp_path / "aggregate_store"), str(tmp_path / "company_outputs"))
+
+
+def read_view(store, ticker):
+    return pd.read_csv(store.view_path(ticker), parse_dates=['SQLDATE'])
+
+
+def test_partials_merge_like_one_pass():
+    days = [20250106, 20250107, 20250108, 20250113]
+    tones = [1.0, -2.0, 4.5, 3.0]
+    whole = partial_aggregates(pairs('AAPL', days, tones))
+    pieces = pd.concat([partial_aggregates(pairs('AAPL', days[:1], tones[:1])),
+                        partial_aggregates(pairs('AAPL', days[1:], tones[1:]))], ignore_index=True)
+    pd.testing.assert_frame_equal(combine_partials(pieces), combine_partials(whole))
+
+
+def test_upsert_merges_into_a_week_already_on_disk(store):
+    # Monday and Tuesday in one run, Wednesday of the same week in the next
+    store.upsert(partial_aggregates(pairs('AAPL', [20250106, 20250107], [1.0, -2.0])))
+    store.upsert(partial_aggregates(pairs('AAPL', [20250108], [4.0])))
+
+    view = read_view(store, 'AAPL')
+    assert view['SQLDATE'].dt.strftime('%Y-%m-%d').tolist() == ['2025-01-12']
+    assert view['Count'].tolist() == [3]
+    assert view['AvgTone'].iloc[0] == pytest.approx(1.0)
+    assert view['ToneStd'].iloc[0] == pytest.approx(np.std([1.0, -2.0, 4.0], ddof=1))
+    assert (view['ToneMin'].iloc[0], view['ToneMax'].iloc[0]) == (-2.0, 4.0)
+
+
+def test_upsert_rewrites_only_from_the_earliest_touched_week(store):
+    store.upsert(partial_aggregates(pairs('AAPL', [20250106, 20250113, 20250120], [1.0, 2.0, 3.0])))
+    store.upsert(partial_aggregates(pairs('AAPL', [20250114], [6.0])))
+
+    view = read_view(store, 'AAPL')
+    assert view['Count'].tolist() == [1, 2, 1]
+    assert view['AvgTone'].tolist() == pytest.approx([1.0, 4.0, 3.0])
+    # A later week arriving out of order lands in its place
+    store.upsert(partial_aggregates(pairs('AAPL', [20241230], [-1.0])))
+    assert read_view(store, 'AAPL')['Count'].tolist() == [1, 1, 2, 1]
+
+
+def test_view_written_before_the_store_seeds_its_weeks(store):
+    pd.DataFrame({'SQLDATE': ['2025-01-12', '2025-01-19'], 'Ticker': 'AAPL',
+                  'AvgTone': [2.0, -1.0], 'Count': [100, 50]}).to_csv(store.view_path('AAPL'), index=False)
+
+    store.upsert(partial_aggregates(pairs('AAPL', [20250108, 20250120], [5.0, 0.0])))
+
+    view = read_view(store, 'AAPL')
+    assert view['Count'].tolist() == [101, 50, 1]
+    assert view['AvgTone'].tolist() == pytest.approx([205.0 / 101, -1.0, 0.0])
+    # The spread of the seeded weeks is unknown
+    assert view['ToneStd'].isna().tolist() == [True, True, True]
+    assert view['ToneMin'].isna().tolist() == [True, True, False]
+
+
+def test_clear_drops_state_and_every_view(store):
+    store.upsert(partial_aggregates(pairs('AAPL', [20250106], [1.0])))
+    pd.DataFrame({'SQLDATE': ['2025-01-12'], 'Ticker': 'MSFT', 'AvgTone': [2.0], 'Count': [100]}).to_csv(
+        store.view_path('MSFT'), index=False)
+
+    store.clear()
+    assert not store.has_ticker('AAPL')
+
+    store.upsert(partial_aggregates(pairs('MSFT', [20250106], [1.0])))
+    assert read_view(store, 'MSFT')['Count'].tolist() == [1]
+    assert read_view(store, 'MSFT')['ToneMin'].tolist() == [1.0]
+
+
+def test_state_files_of_earlier_versions_are_imported(tmp_path):
+    state_directory = tmp_path / "aggregate_store"
+    state_directory.mkdir()
+    pd.DataFrame({'Week': ['2025-01-12'], 'Count': [2], 'ToneSum': [3.0], 'ToneSumSq': [5.0],
+                  'ToneMin': [1.0], 'ToneMax': [2.0]}).to_csv(state_directory / "AAPL.csv", index=False)
+
+    store = WeeklyStore(str(state_directory), str(tmp_path / "company_outputs"))
+    store.upsert(partial_aggregates(pairs('AAPL', [20250108], [3.0])))
+
+    assert not (state_directory / "AAPL.csv").exists()
+    state = store.load('AAPL')
+    assert state[['Count', 'ToneSum', 'ToneSumSq', 'ToneMax']].iloc[0].tolist() == [3, 6.0, 14.0, 3.0]
+
+
+@pytest.mark.parametrize("block", [7, 64, 1 << 16])
+def test_offset_from_finds_the_first_line_of_the_tail(tmp_path, block):
+    path = tmp_path / "weekly_AAPL_news.csv"
+    lines = ["SQLDATE,Ticker,AvgTone\n"] + [f"2025-01-{d:02d},AAPL,{d}.5\n" for d in (5, 12, 19, 26)]
+    path.write_text("".join(lines))
+    size = len("".join(lines))
+
+    def offset_of(line_number):
+        return len("".join(lines[:line_number]))
+
+    assert _offset_from(str(path), "2025-01-19", block) == offset_of(3)
+    assert _offset_from(str(path), "2025-01-13", block) == offset_of(3)
+    assert _offset_from(str(path), "2025-01-01", block) == offset_of(1)
+    assert _offset_from(str(path), "2025-02-02", block) == size
+
+
+def test_store_takes_one_source(tmp_path):
+    state_directory, output_directory = str(tmp_path / "aggregate_store"), str(tmp_path / "company_outputs")
+    WeeklyStore(state_directory, output_directory, source="daily")
+    WeeklyStore(state_directory, output_directory, source="daily")
+    with pytest.raises(ValueError, match="daily exports"):
+        WeeklyStore(state_directory, output_directory, source="slices")
+
+    WeeklyStore(state_directory, output_directory).clear()
+    WeeklyStore(state_directory, output_directory, source="slices")
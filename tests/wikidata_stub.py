@@ -0,0 +1,67 @@
+"""
+Local stand-in for the Wikidata wbsearchentities API, for exercising the
+keyword enricher without network access (tests/test_enrichment.py,
+benchmarks/bench_enrichment.py). Every search returns a few made-up
+labels derived from the search string, after an artificial delay.
+
+Usage: python tests/wikidata_stub.py [--port 8770] [--latency 0.2]
+Then: python enricher.py --api-url http://127.0.0.1:8770/w/api.php
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_handler(latency):
+    class WikidataStub(BaseHTTPRequestHandler):
+        requests_served = 0
+        lock = threading.Lock()
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            if query.get("action") != ["wbsearchentities"] or "search" not in query:
+                self.send_error(400, "unsupported request")
+                return
+            with self.lock:
+                type(self).requests_served += 1
+            time.sleep(latency)
+            search = query["search"][0]
+            body = json.dumps({"search": [
+                {"id": f"Q{abs(hash((search, i))) % 10 ** 8}",
+                 "display": {"label": {"value": label, "language": "en"}}}
+                for i, label in enumerate([search, f"{search} Group", f"{search.split()[0]} Holdings"])
+            ]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return WikidataStub
+
+
+def start_stub(port=0, latency=0.2):
+    """Serve the stub on a background thread; returns (server, api_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/w/api.php"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per response")
+    args = parser.parse_args()
+    server, api_url = start_stub(args.port, args.latency)
+    print(f"Serving {api_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()